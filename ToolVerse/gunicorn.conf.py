@@ -0,0 +1,167 @@
+"""
+Production server settings for ToolVerse (gunicorn, prefork).
+
+    gunicorn -c ToolVerse/gunicorn.conf.py
+
+- The master imports Django, the URLconf and with it every tool backend
+  (PyMuPDF, pdf2docx, ...) before forking, then freezes the GC, so
+  workers share those pages copy-on-write instead of each loading (and
+  dirtying) its own copy.
+- Workers are sized from the CPUs and memory the process may use:
+  one per CPU, but no more than fit in WORKER_MEMORY_MB each. Each
+  worker has a few threads, so progress streams and small requests
+  aren't stuck behind a conversion.
+- A worker is replaced after MAX_REQUESTS requests (with jitter, so they
+  don't all restart together), or as soon as its private memory passes
+  MAX_WORKER_RSS_MB: pdf2docx's memory growth is never given back.
+- Shutdown (SIGTERM) and recycling are graceful: a worker stops taking
+  requests and gets GRACEFUL_TIMEOUT seconds to finish the ones it has.
+
+Every value can be overridden with a TOOLVERSE_* environment variable
+(below), and gunicorn's own command-line options still win over this file.
+
+Job progress and cancels (pdfapp.progress) are kept in a SQLite file
+shared by the workers, so a job's /progress/ stream and its cancel may
+reach any worker. Metrics (pdfapp.metrics) live in each worker's memory:
+scrape every worker, or run with TOOLVERSE_WORKERS=1.
+"""
+
+import gc
+import importlib
+import os
+
+
+MB = 1024 * 1024
+
+
+def _env_int(name, default):
+    value = os.environ.get(name, "").strip()
+    return int(value) if value else default
+
+
+# Memory a worker may grow to during a large conversion
+WORKER_MEMORY_MB = _env_int("TOOLVERSE_WORKER_MEMORY_MB", 768)
+# Recycle a worker once its private memory (not counting pages shared
+# with the master) passes this
+MAX_WORKER_RSS_MB = _env_int("TOOLVERSE_MAX_WORKER_RSS_MB", 1024)
+MAX_REQUESTS = _env_int("TOOLVERSE_MAX_REQUESTS", 500)
+GRACEFUL_TIMEOUT = _env_int("TOOLVERSE_GRACEFUL_TIMEOUT", 300)
+
+# Imported in the master on top of what the URLconf pulls in; missing
+# optional ones are skipped
+PRELOAD_MODULES = ("fitz", "pdf2docx", "pikepdf", "numpy", "PIL.Image")
+
+
+def _cpu_count():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _memory_bytes():
+    """
+    Memory available to this process: physical RAM, or the cgroup (v2 or
+    v1) limit when a container sets a lower one. None if unknown.
+    """
+    limits = []
+    try:
+        limits.append(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"))
+    except (ValueError, OSError, AttributeError):
+        pass
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                limits.append(int(f.read().strip()))
+        except (OSError, ValueError):  # missing, or "max"
+            pass
+    return min(limits) if limits else None
+
+
+def default_workers():
+    by_cpu = _cpu_count()
+    memory = _memory_bytes()
+    by_memory = memory // (WORKER_MEMORY_MB * MB) if memory else by_cpu
+    return max(1, min(by_cpu, by_memory))
+
+
+def private_rss_bytes():
+    """
+    Resident memory of this process that isn't shared with other
+    processes (Private_Clean + Private_Dirty), falling back to the whole
+    RSS where smaps_rollup is unavailable.
+    """
+    try:
+        private = 0
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                    private += int(line.split()[1]) * 1024
+        return private
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # Peak, not current, RSS (KiB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+wsgi_app = "ToolVerse.wsgi:application"
+bind = os.environ.get("TOOLVERSE_BIND", "0.0.0.0:8000")
+
+preload_app = True
+workers = _env_int("TOOLVERSE_WORKERS", 0) or default_workers()
+worker_class = "gthread"
+threads = _env_int("TOOLVERSE_THREADS", 4)
+
+max_requests = MAX_REQUESTS
+max_requests_jitter = max(1, MAX_REQUESTS // 10)
+
+# Conversions of large files take minutes: the worker timeout only
+# fires when a worker stops responding altogether
+timeout = _env_int("TOOLVERSE_TIMEOUT", 900)
+graceful_timeout = GRACEFUL_TIMEOUT
+keepalive = 5
+
+# Objects created while loading stay where they are: no collections in
+# the master until the freeze in when_ready (see gc.freeze)
+gc.disable()
+
+
+def when_ready(server):
+    """
+    Master, before the first fork: import every tool backend, then move
+    all objects to the GC's permanent generation so workers never write
+    to (and so copy) their pages.
+    """
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns  # imports pdfapp.views and the tools
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    gc.collect()
+    gc.freeze()
+    server.log.info("Preloaded tool backends (%d objects frozen), %d workers x %d threads",
+                    gc.get_freeze_count(), workers, threads)
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+
+def post_request(worker, req, environ, resp):
+    """
+    Retire a worker whose private memory has grown past MAX_WORKER_RSS_MB.
+    It finishes its in-flight requests and exits; the master forks a
+    fresh one from the preloaded image.
+    """
+    rss = private_rss_bytes()
+    if rss > MAX_WORKER_RSS_MB * MB and worker.alive:
+        worker.log.info("Worker %s uses %d MB (limit %d MB): restarting it",
+                        worker.pid, rss // MB, MAX_WORKER_RSS_MB)
+        worker.alive = False
@@ -41,6 +41,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "pdfapp.middleware.RequestTimingMiddleware",
+    "pdfapp.middleware.ContentStoreUploadMiddleware",
+    "pdfapp.middleware.RequestFoldersMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -48,6 +51,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "pdfapp.middleware.ToolFailedMiddleware",
 ]
 
 ROOT_URLCONF = "ToolVerse.urls"
@@ -56,8 +60,15 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / 'templates'],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Templates are compiled once per process, also with DEBUG on
+            # (runserver's autoreloader resets them when a template changes)
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
@@ -117,6 +128,28 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# `manage.py collectstatic` builds the frontend assets into STATIC_ROOT:
+# fingerprinted, minified and precompressed (pdfapp.static_assets), served
+# by pdfapp.static_assets.serve when DEBUG is off.
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# "default" holds uploads and tool outputs shared between app nodes
+# (pdfapp.storage): MEDIA_ROOT on local disk, or for several nodes an
+# S3-compatible bucket, e.g.
+#     "default": {
+#         "BACKEND": "pdfapp.storage.S3Storage",
+#         "OPTIONS": {"bucket": "toolverse", "endpoint_url": "http://127.0.0.1:9000"},
+#     },
+# with AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY set.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "pdfapp.static_assets.PrecompressedManifestStaticFilesStorage",
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -126,4 +159,62 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 from pathlib import Path
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Merge accepts up to 200 PDFs per request (pdfapp.views.MAX_MERGE_FILES)
+DATA_UPLOAD_MAX_NUMBER_FILES = 200
+
+# Uploaded PDFs are hashed while they stream in and stored once per content
+# (pdfapp.content_store). Requests larger than UPLOAD_MAX_BODY_BYTES are
+# refused with 413.
+CONTENT_STORE_ROOT = MEDIA_ROOT / "store"
+UPLOAD_MAX_BODY_BYTES = 500 * 1024 * 1024
+
+# Full-text index of uploaded PDFs (pdfapp.search_index, searched on /search/)
+SEARCH_INDEX_PATH = MEDIA_ROOT / "search_index.sqlite3"
+
+# Progress and cancel state of running jobs, shared by the worker processes
+# (pdfapp.progress); keep it on a local disk
+PROGRESS_DB_PATH = MEDIA_ROOT / "progress.sqlite3"
+
+# Tools run in isolated child processes (pdfapp.isolation), at most
+# TOOL_WORKERS at once per server process. A call is stopped (422) when it
+# needs more than TOOL_MEMORY_LIMIT_MB of address space, TOOL_CPU_LIMIT_SECONDS
+# of CPU time or TOOL_TIMEOUT_SECONDS in all; 0 disables a limit.
+TOOL_WORKERS = 4
+TOOL_MEMORY_LIMIT_MB = 4096
+TOOL_CPU_LIMIT_SECONDS = 600
+TOOL_TIMEOUT_SECONDS = 900
+# A child is replaced after this many calls, or once it holds more than
+# TOOL_MAX_CHILD_RSS_MB (or half of TOOL_MEMORY_LIMIT_MB of address space)
+TOOL_MAX_CALLS_PER_CHILD = 100
+TOOL_MAX_CHILD_RSS_MB = 1024
+
+
+# Request timing / metrics (pdfapp.metrics, exposed on /metrics)
+# /metrics answers staff users and these client addresses (the Prometheus
+# server) only.
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+# Requests slower than this many seconds are logged to slow_requests.log,
+# SLOW_REQUEST_SAMPLE_RATE of the time (1.0 = every slow request).
+SLOW_REQUEST_SECONDS = 5.0
+SLOW_REQUEST_SAMPLE_RATE = 1.0
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "slow_requests": {
+            "class": "logging.FileHandler",
+            "filename": BASE_DIR / "slow_requests.log",
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "toolverse.slow": {
+            "handlers": ["slow_requests"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
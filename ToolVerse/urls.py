@@ -18,17 +18,36 @@ Including another URLconf
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 
-from pdfapp import views
+from pdfapp import metrics, progress, search_index, static_assets, views
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", views.home, name="home"),  # homepage
     path("pdf-to-word/", views.pdf_to_word_view, name="pdf_to_word"),
     path("merge-pdf/", views.merge_pdf_view, name="merge_pdf"),
+    # Page tools: the homepage does these in the browser for small files
+    # and posts the rest here
+    path("remove-pages/", views.remove_pages_view, name="remove_pages"),
+    path("extract-pages/", views.extract_pages_view, name="extract_pages"),
+    path("split-pdf/", views.split_pdf_view, name="split_pdf"),
+    path("images-to-pdf/", views.images_to_pdf_view, name="images_to_pdf"),
+    path("compress-pdf/", views.compress_pdf_view, name="compress_pdf"),
+    path("pdf-to-images/", views.pdf_to_images_view, name="pdf_to_images"),
+    path("extract-text/", views.extract_text_view, name="extract_text"),
+    path("password-protect/", views.password_protect_view, name="password_protect"),
+    path("unlock-pdf/", views.unlock_pdf_view, name="unlock_pdf"),
+    path("metrics", metrics.metrics_view, name="metrics"),
+    path("progress/<str:job_id>/", progress.progress_stream_view, name="progress"),
+    path("progress/<str:job_id>/cancel/", progress.cancel_job_view, name="cancel_job"),
+    path("search/", search_index.search_view, name="search"),
 ]
 
 # Optional: serve media in development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+else:
+    # Built assets (collectstatic), precompressed and with immutable caching
+    urlpatterns.append(re_path(rf"^{settings.STATIC_URL.strip('/')}/(?P<path>.+)$",
+                               static_assets.serve, name="static"))
@@ -0,0 +1,391 @@
+'''
+Benchmark every PDF tool on generated fixtures.
+
+1. Full run (10 / 100 / 1,000 / 10,000 pages, every kind, every tool)
+    python benchmarks/bench_tools.py -o benchmarks/results/latest.json
+
+2. Quick run on small fixtures only
+    python benchmarks/bench_tools.py --sizes 10 100 --tools split_pdf extract_pages
+
+3. Compare against a stored baseline (exit code 1 on regression)
+    python benchmarks/bench_tools.py --sizes 10 100 --baseline benchmarks/baseline.json
+
+4. Store the current numbers as the new baseline
+    python benchmarks/bench_tools.py --sizes 10 100 -o benchmarks/baseline.json
+
+Each measurement runs in a fresh child process so wall time, CPU time
+(including any worker processes the tool starts) and peak RSS belong to
+that one tool call only.
+'''
+
+import argparse
+import contextlib
+import json
+import logging
+import multiprocessing as mp
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+SIZES = [10, 100, 1000, 10000]
+KINDS = ["text", "image", "scanned"]
+
+# Distinct images per fixture. Pages reuse them by xref so 10,000-page
+# fixtures stay a sane size on disk.
+IMAGE_POOL = 16
+
+LOREM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim "
+    "veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea "
+    "commodo consequat. Duis aute irure dolor in reprehenderit in voluptate. "
+)
+
+
+# ---------- Fixtures ----------
+
+def _synthetic_image(seed: int, width: int = 640, height: int = 480):
+    """
+    Photo-like JPEG (gradients + stripes) so lossy recompression has real work.
+    """
+    samples = bytearray(width * height * 3)
+    i = 0
+    for y in range(height):
+        for x in range(width):
+            samples[i] = (x * 255 // width + seed * 17) & 255
+            samples[i + 1] = (y * 255 // height + seed * 31) & 255
+            samples[i + 2] = ((x ^ y) + seed * 7) & 255
+            i += 3
+    pix = fitz.Pixmap(fitz.csRGB, width, height, bytes(samples), 0)
+    return pix.tobytes("jpg", jpg_quality=95)
+
+
+def _scanned_image(seed: int):
+    """
+    Full-page 150 dpi grayscale scan of a text page (no text layer survives).
+    """
+    src = fitz.open()
+    page = src.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 545, 792), f"Scan {seed}\n" + LOREM * 12,
+                        fontsize=11)
+    pix = page.get_pixmap(dpi=150, colorspace=fitz.csGRAY)
+    src.close()
+    return pix.tobytes("jpg", jpg_quality=80)
+
+
+def make_pdf_fixture(kind: str, pages: int, path: Path):
+    """
+    Generate a synthetic PDF: 'text' (dense text), 'image' (text + photos)
+    or 'scanned' (one full-page image per page, no text layer).
+    """
+    doc = fitz.open()
+    if kind == "image":
+        pool = [_synthetic_image(i) for i in range(IMAGE_POOL)]
+    elif kind == "scanned":
+        pool = [_scanned_image(i) for i in range(IMAGE_POOL)]
+    else:
+        pool = []
+    xrefs = [0] * len(pool)
+
+    for pno in range(pages):
+        page = doc.new_page()
+        if kind == "text":
+            page.insert_textbox(fitz.Rect(50, 50, 545, 792),
+                                f"Page {pno + 1}\n" + LOREM * 12, fontsize=10)
+        elif kind == "image":
+            page.insert_textbox(fitz.Rect(50, 50, 545, 200),
+                                f"Page {pno + 1}\n" + LOREM * 3, fontsize=10)
+            for slot, rect in enumerate([fitz.Rect(50, 220, 290, 400),
+                                         fitz.Rect(305, 220, 545, 400),
+                                         fitz.Rect(50, 420, 545, 790)]):
+                k = (pno * 3 + slot) % len(pool)
+                if xrefs[k]:
+                    page.insert_image(rect, xref=xrefs[k])
+                else:
+                    xrefs[k] = page.insert_image(rect, stream=pool[k])
+        else:
+            k = pno % len(pool)
+            if xrefs[k]:
+                page.insert_image(page.rect, xref=xrefs[k])
+            else:
+                xrefs[k] = page.insert_image(page.rect, stream=pool[k])
+
+    doc.save(str(path), garbage=3, deflate=True)
+    doc.close()
+
+
+def make_docx_fixture(pages: int, path: Path):
+    """
+    Word document with one 20x6 table per 10 'pages', for docx_to_excel.
+    """
+    from docx import Document
+
+    document = Document()
+    for t in range(max(1, pages // 10)):
+        table = document.add_table(rows=20, cols=6)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = f"T{t} R{r} C{c}"
+        document.add_paragraph("")
+    document.save(str(path))
+
+
+def get_fixture(kind: str, pages: int):
+    """
+    Return a cached fixture path, generating it on first use.
+    """
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    if kind == "tables":
+        path = FIXTURES_DIR / f"tables_{pages}.docx"
+        if not path.exists():
+            make_docx_fixture(pages, path)
+    else:
+        path = FIXTURES_DIR / f"{kind}_{pages}.pdf"
+        if not path.exists():
+            make_pdf_fixture(kind, pages, path)
+    return path
+
+
+# ---------- Tool calls ----------
+
+def _cut_spec(pages: int):
+    """
+    Split into 10-page parts ('10,20,...'), or halves for tiny files.
+    """
+    cuts = list(range(10, pages, 10)) or [max(1, pages // 2)]
+    return ",".join(str(c) for c in cuts)
+
+
+def _run_tool(tool: str, fixture: Path, pages: int, work: Path):
+    """
+    Import and call one tool function. Runs inside the child process.
+    """
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+
+    half = f"1-{max(1, pages // 2)}"
+
+    if tool == "compress_pdf_lossy_with_level":
+        from pdfapp.compress_pdf_lossy import compress_pdf_lossy_with_level
+        compress_pdf_lossy_with_level(str(fixture), str(work / "out.pdf"), level=50)
+    elif tool == "split_pdf":
+        from pdfapp.split_pdf import split_pdf
+        split_pdf(str(fixture), _cut_spec(pages), str(work / "parts"))
+    elif tool == "extract_pages":
+        from pdfapp.extract_pages import extract_pages
+        extract_pages(str(fixture), half, str(work / "out.pdf"))
+    elif tool == "remove_pages":
+        from pdfapp.remove_pages import remove_pages
+        remove_pages(str(fixture), half, str(work / "out.pdf"))
+    elif tool == "pdf_to_images":
+        from pdfapp.pdf_2_img import pdf_to_images
+        pdf_to_images(str(fixture), output_folder=str(work / "images"), zoom=2.0)
+    elif tool == "extract_text":
+        from pdfapp.extract_text import extract_text
+        extract_text(str(fixture), str(work / "out.txt"))
+    elif tool == "merge_pdfs":
+        from pdfapp.merge_pdf import merge_pdfs
+        merge_pdfs(str(fixture), str(fixture), str(work / "out.pdf"))
+    elif tool == "pdf_to_word_exact":
+        from pdfapp.pdf_2_docx import pdf_to_word_exact
+        pdf_to_word_exact(fixture, work / "out.docx")
+    elif tool == "docx_to_excel":
+        from table_2_excel import docx_to_excel
+        docx_to_excel(str(fixture), str(work / "out.xlsx"))
+    else:
+        raise ValueError(f"Unknown tool '{tool}'")
+
+
+TOOLS = [
+    "compress_pdf_lossy_with_level",
+    "split_pdf",
+    "extract_pages",
+    "remove_pages",
+    "pdf_to_images",
+    "extract_text",
+    "merge_pdfs",
+    "pdf_to_word_exact",
+    "docx_to_excel",
+]
+
+
+def _maxrss_mb(usage):
+    # ru_maxrss is bytes on macOS, kilobytes everywhere else
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss / scale
+
+
+def _measure_child(tool: str, fixture: str, pages: int, queue):
+    """
+    Child-process body: time one tool call and report the numbers.
+    """
+    logging.disable(logging.CRITICAL)
+    work = Path(tempfile.mkdtemp(prefix="toolverse_bench_"))
+    try:
+        self_0 = resource.getrusage(resource.RUSAGE_SELF)
+        kids_0 = resource.getrusage(resource.RUSAGE_CHILDREN)
+        rss_before = _maxrss_mb(self_0)
+        t0 = time.perf_counter()
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            _run_tool(tool, Path(fixture), pages, work)
+
+        wall = time.perf_counter() - t0
+        self_1 = resource.getrusage(resource.RUSAGE_SELF)
+        kids_1 = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        cpu = ((self_1.ru_utime + self_1.ru_stime) - (self_0.ru_utime + self_0.ru_stime)
+               + (kids_1.ru_utime + kids_1.ru_stime) - (kids_0.ru_utime + kids_0.ru_stime))
+        out_bytes = sum(f.stat().st_size for f in work.rglob("*") if f.is_file())
+
+        queue.put({
+            "ok": True,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "peak_rss_mb": round(max(_maxrss_mb(self_1), _maxrss_mb(kids_1)), 1),
+            "rss_before_mb": round(rss_before, 1),
+            "output_bytes": out_bytes,
+        })
+    except Exception as e:
+        queue.put({"ok": False, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def measure(tool: str, fixture: Path, pages: int, timeout: float = None):
+    """
+    Run one tool call in a fresh process and return its measurements.
+    """
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure_child, args=(tool, str(fixture), pages, queue))
+    proc.start()
+    try:
+        result = queue.get(timeout=timeout)
+    except Exception:
+        proc.kill()
+        result = {"ok": False, "error": f"timed out after {timeout}s"}
+    proc.join()
+    return result
+
+
+# ---------- Runner ----------
+
+def run_benchmarks(sizes, kinds, tools, repeat: int = 1, timeout: float = None):
+    """
+    Benchmark every (tool, kind, size) combination and return a result dict.
+    """
+    results = []
+    for pages in sizes:
+        for tool in tools:
+            tool_kinds = ["tables"] if tool == "docx_to_excel" else kinds
+            for kind in tool_kinds:
+                fixture = get_fixture(kind, pages)
+                runs = [measure(tool, fixture, pages, timeout) for _ in range(repeat)]
+                ok_runs = [r for r in runs if r["ok"]]
+                if ok_runs:
+                    # Keep the fastest run: least disturbed by noise
+                    best = min(ok_runs, key=lambda r: r["wall_s"])
+                    entry = {k: v for k, v in best.items() if k != "ok"}
+                else:
+                    entry = {"error": runs[-1]["error"]}
+                entry.update({"tool": tool, "kind": kind, "pages": pages,
+                              "fixture_bytes": fixture.stat().st_size})
+                results.append(entry)
+                _print_row(entry)
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+
+
+def _key(entry):
+    return f"{entry['tool']}/{entry['kind']}/{entry['pages']}"
+
+
+def _print_row(entry):
+    if "error" in entry:
+        print(f"{_key(entry):<50} ERROR {entry['error']}")
+        return
+    print(f"{_key(entry):<50} wall {entry['wall_s']:>9.3f}s  "
+          f"cpu {entry['cpu_s']:>9.3f}s  rss {entry['peak_rss_mb']:>8.1f} MB")
+
+
+def compare_to_baseline(current: dict, baseline: dict, tolerance: float = 0.10):
+    """
+    Return a list of human-readable regressions (wall, cpu or rss grew by
+    more than `tolerance`, relative).
+    """
+    base = {_key(e): e for e in baseline.get("results", []) if "error" not in e}
+    regressions = []
+    for entry in current.get("results", []):
+        old = base.get(_key(entry))
+        if old is None or "error" in entry:
+            continue
+        for metric in ("wall_s", "cpu_s", "peak_rss_mb"):
+            if old[metric] > 0 and entry[metric] > old[metric] * (1 + tolerance):
+                change = (entry[metric] / old[metric] - 1) * 100
+                regressions.append(
+                    f"{_key(entry)} {metric}: {old[metric]} -> {entry[metric]} (+{change:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark ToolVerse PDF tools on generated fixtures."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="Page counts to generate (default: 10 100 1000 10000)")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=KINDS,
+                        help="Fixture kinds (default: all)")
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=TOOLS,
+                        help="Tools to benchmark (default: all)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs per case; the fastest is kept (default: 1)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Seconds before a single run is killed")
+    parser.add_argument("-o", "--output", help="Write results JSON to this path")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed relative slowdown vs baseline (default: 0.10)")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.sizes, args.kinds, args.tools,
+                             repeat=args.repeat, timeout=args.timeout)
+
+    if args.output:
+        out = Path(args.output)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(current, indent=2))
+        print(f"Results written to: {out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare_to_baseline(current, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions vs baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions vs baseline.")
+
+
+if __name__ == "__main__":
+    main()
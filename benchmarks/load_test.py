@@ -0,0 +1,486 @@
+'''
+Load-test the ToolVerse web app with a mixed workload.
+
+1. Default mix for 60 s with 4 concurrent clients (starts the app itself)
+    python benchmarks/load_test.py -o benchmarks/results/load.json
+
+2. Mostly compression, some conversions, 8 clients for 5 minutes
+    python benchmarks/load_test.py --mix compress_pdf=6 pdf_to_word=2 split_pdf=1 \
+        --concurrency 8 --duration 300
+
+3. Against a server that is already running (RSS sampled from its pid)
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --server-pid 4242
+
+The app is started on a free local port with gunicorn (ToolVerse/gunicorn.conf.py)
+when it is installed, otherwise with `manage.py runserver --noreload`,
+with MEDIA_ROOT and the database in a temporary folder that is removed
+afterwards, so a run leaves nothing in the working tree.
+Each client posts to the endpoints of ToolVerse/urls.py, picking one at
+random by the weights of the mix, and reads the whole response before
+sending the next request. Mix entries are URL names; a mix naming one the
+URLconf doesn't route is refused before the run starts, so the numbers
+are always for the whole mix. Uploads are generated fixtures (bench_tools), so
+repeated requests hit the content store and the DOCX cache the way
+repeated uploads of one file do in production.
+
+Reported, per endpoint and overall: requests, throughput, p50/p95/p99
+latency and error rate (status >= 400, or no response), and the resident
+memory of the server with all its child processes (workers, isolation
+children) sampled over the run.
+'''
+
+import argparse
+import json
+import os
+import platform
+import random
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+
+from bench_tools import BASE_DIR, get_fixture
+
+
+# What each endpoint is sent: a fixture (kind, pages), how many copies of
+# it go in 'pdf_files', and the other form fields. None = GET. (/search/
+# is left out: it is for staff users only.)
+ENDPOINTS = {
+    "home": None,
+    "pdf_to_word": {"fixture": ("text", 10), "files": 1, "fields": {}},
+    "merge_pdf": {"fixture": ("text", 10), "files": 2, "fields": {}},
+    "compress_pdf": {"fixture": ("image", 10), "files": 1, "fields": {"level": "50"}},
+    "pdf_to_images": {"fixture": ("text", 10), "files": 1,
+                      "fields": {"zoom": "1.0", "image_format": "jpg"}},
+    "split_pdf": {"fixture": ("text", 10), "files": 1, "fields": {"split_spec": "5"}},
+    "extract_pages": {"fixture": ("text", 10), "files": 1, "fields": {"pages_spec": "1-5"}},
+    "remove_pages": {"fixture": ("text", 10), "files": 1, "fields": {"remove_spec": "1-5"}},
+    "extract_text": {"fixture": ("text", 10), "files": 1, "fields": {}},
+}
+
+# Relative weights of the default mix
+DEFAULT_MIX = {
+    "compress_pdf": 4,
+    "pdf_to_word": 3,
+    "pdf_to_images": 2,
+    "split_pdf": 2,
+    "merge_pdf": 2,
+    "extract_pages": 1,
+    "remove_pages": 1,
+    "extract_text": 1,
+    "home": 1,
+}
+
+# Seconds to wait for a started server to answer
+STARTUP_TIMEOUT = 60
+
+# Settings of a started server: the project's, with every file it writes
+# under the run's temporary folder
+SERVER_SETTINGS = """\
+from pathlib import Path
+
+from ToolVerse.settings import *  # noqa: F401,F403
+
+RUN_DIR = Path({run_dir!r})
+MEDIA_ROOT = RUN_DIR / "media"
+CONTENT_STORE_ROOT = MEDIA_ROOT / "store"
+SEARCH_INDEX_PATH = MEDIA_ROOT / "search_index.sqlite3"
+PROGRESS_DB_PATH = MEDIA_ROOT / "progress.sqlite3"
+DATABASES["default"]["NAME"] = RUN_DIR / "db.sqlite3"
+"""
+
+# Seconds a single request may take before it counts as an error
+REQUEST_TIMEOUT = 600
+
+
+# ---------- Endpoints ----------
+
+def routed_endpoints():
+    """
+    {URL name: path} of the named routes in ToolVerse/urls.py.
+    """
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ToolVerse.settings")
+    import django
+    from django.urls import URLPattern, get_resolver
+
+    django.setup()
+    routes = {}
+    for pattern in get_resolver().url_patterns:
+        if isinstance(pattern, URLPattern) and pattern.name and "<" not in str(pattern.pattern):
+            routes[pattern.name] = "/" + str(pattern.pattern)
+    return routes
+
+
+def parse_mix(items):
+    """
+    ['compress_pdf=3', 'split_pdf'] -> {'compress_pdf': 3.0, 'split_pdf': 1.0}
+    """
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}' (known: {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+def _multipart(files, fields):
+    """
+    (body, content type) of a multipart/form-data request.
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for key, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n'
+                     f'{value}\r\n'.encode())
+    for name, data in files:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="pdf_files"; '
+                     f'filename="{name}"\r\nContent-Type: application/pdf\r\n\r\n'.encode())
+        parts.append(data)
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def build_requests(base_url, mix, routes):
+    """
+    {name: (method, url, body, content type)} for every endpoint of the
+    mix. Bodies are built once and reused.
+    """
+    unrouted = [name for name in mix if name not in routes]
+    if unrouted:
+        raise SystemExit(f"Not routed in ToolVerse/urls.py: {', '.join(unrouted)}")
+    built = {}
+    for name in mix:
+        url = base_url + routes[name]
+        spec = ENDPOINTS[name]
+        if spec is None:
+            built[name] = ("GET", url, None, None)
+            continue
+        kind, pages = spec["fixture"]
+        fixture = get_fixture(kind, pages)
+        data = fixture.read_bytes()
+        files = [(f"{fixture.stem}_{i}.pdf", data) for i in range(spec["files"])]
+        body, content_type = _multipart(files, spec["fields"])
+        built[name] = ("POST", url, body, content_type)
+    return built
+
+
+# ---------- Server ----------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _has_gunicorn():
+    try:
+        import gunicorn  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def start_server(server: str, port: int, log_path: Path, run_dir: Path):
+    """
+    Start the app on 127.0.0.1:`port` ('gunicorn' or 'runserver') with
+    its files in `run_dir` (see SERVER_SETTINGS) and return the process
+    once it answers.
+    """
+    (run_dir / "load_test_settings.py").write_text(SERVER_SETTINGS.format(run_dir=str(run_dir)))
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="load_test_settings",
+               PYTHONPATH=os.pathsep.join(filter(None, [str(run_dir), str(BASE_DIR),
+                                                        os.environ.get("PYTHONPATH")])))
+    if server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "ToolVerse/gunicorn.conf.py",
+               "--bind", f"127.0.0.1:{port}"]
+    else:
+        cmd = [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}", "--noreload"]
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log = open(log_path, "w")
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Server exited with code {proc.returncode}, see {log_path}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5):
+                return proc
+        except urllib.error.HTTPError:
+            return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.kill()
+    raise SystemExit(f"Server didn't answer within {STARTUP_TIMEOUT}s, see {log_path}")
+
+
+def _process_tree(root_pid: int):
+    """
+    `root_pid` and all its descendants.
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The name (field 2) may contain spaces; ppid follows it
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, todo = [], [root_pid]
+    while todo:
+        pid = todo.pop()
+        pids.append(pid)
+        todo.extend(children.get(pid, ()))
+    return pids
+
+
+def _rss_bytes(pid: int):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+class RssSampler(threading.Thread):
+    """
+    Samples the resident memory of a process tree every `interval`
+    seconds. Shared pages (e.g. of preforked workers) are counted once
+    per process, so the total is an upper bound.
+    """
+
+    def __init__(self, pid: int, interval: float, t0: float):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.t0 = t0
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            pids = _process_tree(self.pid)
+            total = sum(_rss_bytes(pid) for pid in pids)
+            self.samples.append({"t": round(time.monotonic() - self.t0, 2),
+                                 "rss_mb": round(total / (1024 * 1024), 1),
+                                 "processes": len(pids)})
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+# ---------- Clients ----------
+
+def send(request, headers):
+    """
+    Send one request and read the whole response. Returns (status, bytes),
+    status None if there was no response.
+    """
+    method, url, body, content_type = request
+    req = urllib.request.Request(url, data=body, method=method, headers=dict(headers))
+    if content_type:
+        req.add_header("Content-Type", content_type)
+    try:
+        with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
+            size = 0
+            while chunk := resp.read(1024 * 1024):
+                size += len(chunk)
+            return resp.status, size
+    except urllib.error.HTTPError as e:
+        return e.code, len(e.read())
+    except OSError:
+        return None, 0
+
+
+def _client(requests, weights, headers, deadline, t0, seed, results):
+    rng = random.Random(seed)
+    names = list(requests)
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights=[weights[n] for n in names])[0]
+        start = time.monotonic()
+        status, size = send(requests[name], headers)
+        end = time.monotonic()
+        results.append({"endpoint": name, "start": round(start - t0, 3),
+                        "latency_s": end - start, "status": status, "bytes": size})
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return round(sorted_values[k], 4)
+
+
+def summarize(records, elapsed):
+    latencies = sorted(r["latency_s"] for r in records)
+    errors = sum(1 for r in records if r["status"] is None or r["status"] >= 400)
+    return {
+        "requests": len(records),
+        "errors": errors,
+        "error_rate": round(errors / len(records), 4) if records else 0.0,
+        "throughput_rps": round(len(records) / elapsed, 3) if elapsed else 0.0,
+        "p50_s": _percentile(latencies, 50),
+        "p95_s": _percentile(latencies, 95),
+        "p99_s": _percentile(latencies, 99),
+        "max_s": round(latencies[-1], 4) if latencies else None,
+        "bytes_out": sum(r["bytes"] for r in records),
+    }
+
+
+def run_load(base_url, mix, routes, concurrency, duration, server_pid=None,
+             rss_interval=1.0, seed=0):
+    """
+    Replay the mix for `duration` seconds with `concurrency` clients and
+    return a result dict.
+    """
+    requests = build_requests(base_url, mix, routes)
+
+    # Any well-formed token passes the CSRF check when cookie and header agree
+    token = secrets.token_hex(16)
+    headers = {"Cookie": f"csrftoken={token}", "X-CSRFToken": token}
+
+    # Warm-up: one untimed request per endpoint (first imports, caches)
+    for name, request in requests.items():
+        status, _ = send(request, headers)
+        print(f"Warm-up {name:<16} {status}")
+
+    t0 = time.monotonic()
+    sampler = RssSampler(server_pid, rss_interval, t0) if server_pid else None
+    if sampler:
+        sampler.start()
+    records = []
+    deadline = t0 + duration
+    clients = [threading.Thread(target=_client,
+                                args=(requests, mix, headers, deadline, t0, seed + i, records))
+               for i in range(concurrency)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.monotonic() - t0
+    if sampler:
+        sampler.stop()
+
+    rss = sampler.samples if sampler else []
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "url": base_url,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "mix": {name: mix[name] for name in requests},
+        "overall": summarize(records, elapsed),
+        "endpoints": {name: summarize([r for r in records if r["endpoint"] == name], elapsed)
+                      for name in requests},
+        "peak_rss_mb": max((s["rss_mb"] for s in rss), default=None),
+        "rss": rss,
+        "requests": records,
+    }
+
+
+def _print_summary(result):
+    def row(name, s):
+        if not s["requests"]:
+            print(f"{name:<16} {0:>6}")
+            return
+        print(f"{name:<16} {s['requests']:>6} {s['throughput_rps']:>8.2f}/s  "
+              f"p50 {s['p50_s']:>7.3f}s  p95 {s['p95_s']:>7.3f}s  p99 {s['p99_s']:>7.3f}s  "
+              f"errors {s['error_rate'] * 100:>5.1f}%")
+
+    print()
+    for name, s in result["endpoints"].items():
+        row(name, s)
+    row("overall", result["overall"])
+    if result["peak_rss_mb"] is not None:
+        print(f"Server RSS: peak {result['peak_rss_mb']} MB "
+              f"({len(result['rss'])} samples)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a mixed workload against the ToolVerse web app."
+    )
+    parser.add_argument("--mix", nargs="+", metavar="NAME[=WEIGHT]",
+                        help=f"Endpoints (URL names) and weights (default: "
+                             f"{' '.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Concurrent clients (default: 4)")
+    parser.add_argument("--duration", type=float, default=60,
+                        help="Seconds of load after the warm-up (default: 60)")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "runserver"], default="auto",
+                        help="How to start the app (default: gunicorn if installed)")
+    parser.add_argument("--url", help="Use a running server instead of starting one")
+    parser.add_argument("--server-pid", type=int,
+                        help="Pid of the running server (--url), to sample its RSS")
+    parser.add_argument("--rss-interval", type=float, default=1.0,
+                        help="Seconds between RSS samples (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the request order")
+    parser.add_argument("-o", "--output", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+    routes = routed_endpoints()
+
+    proc = run_dir = None
+    if args.url:
+        base_url, server_pid = args.url.rstrip("/"), args.server_pid
+    else:
+        server = args.server
+        if server == "auto":
+            server = "gunicorn" if _has_gunicorn() else "runserver"
+        port = _free_port()
+        log_path = BASE_DIR / "benchmarks" / "results" / "load_server.log"
+        print(f"Starting {server} on port {port} (log: {log_path})")
+        run_dir = Path(tempfile.mkdtemp(prefix="load_test_"))
+        try:
+            proc = start_server(server, port, log_path, run_dir)
+        except BaseException:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            raise
+        base_url, server_pid = f"http://127.0.0.1:{port}", proc.pid
+
+    try:
+        result = run_load(base_url, mix, routes, args.concurrency, args.duration,
+                          server_pid=server_pid, rss_interval=args.rss_interval,
+                          seed=args.seed)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if run_dir is not None:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    _print_summary(result)
+
+    if args.output:
+        out = Path(args.output)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(result, indent=2))
+        print(f"Results written to: {out}")
+
+
+if __name__ == "__main__":
+    main()
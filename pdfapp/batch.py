@@ -0,0 +1,249 @@
+"""
+Run one tool over many uploaded PDFs and stream the results back as a ZIP.
+
+The tool views handle a single upload as before. When several files are
+posted they build a Batch instead: one tool call per file, each writing
+into the batch's own folder,
+
+    batch = Batch(outputs_dir)
+    for uploaded_file in uploaded_files:
+        name = batch.unique_name(uploaded_file.name)
+        ...save the upload to batch.inputs_dir / name...
+        batch.add(name, output_path,
+                  partial(compress_pdf_lossy_with_level, input_path, output_path, level=50))
+    return batch.response("compressed_pdfs.zip")
+
+The calls run in isolated child processes (pdfapp.isolation, with its
+memory, CPU and time limits), handed out by a thread pool shared by
+every batch request, so the server never runs more than BATCH_WORKERS of
+them at once. Results are added to the ZIP in the order they finish, and
+each entry is streamed to the client while it is being written: nothing
+is buffered whole in memory. A file that fails doesn't fail the batch; `manifest.json`, the
+last entry, lists every input with its status, its entries in the ZIP
+and, for failures, the error. Only ToolFailed / Cancelled messages (which
+pdfapp.isolation writes for the client) go into the manifest as they
+are; anything else is logged with its traceback, and the manifest just
+says the file could not be processed, so library messages quoting
+server paths don't reach the client.
+
+Inputs are saved in the batch folder too, not in the shared uploads
+folder: the calls only start when the response is streamed, and by then
+another request may have saved a different file under the same name.
+
+The batch folder (inputs and outputs) is removed once the ZIP is complete (or the client went
+away and the running calls have finished). A client that goes away, or
+a cancel of the batch's job (pdfapp.progress), stops the running calls
+at their next page and drops the queued ones.
+"""
+
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from django.http import StreamingHttpResponse
+
+from . import isolation, progress
+from .progress import Cancelled
+
+
+logger = logging.getLogger(__name__)
+
+# Tool calls running at once, across all batch requests
+BATCH_WORKERS = min(4, os.cpu_count() or 1)
+
+# Most files accepted by one batch request
+MAX_BATCH_FILES = 50
+
+MANIFEST_NAME = "manifest.json"
+
+# Outputs worth deflating; PDFs (deflated streams), DOCX (already a ZIP)
+# and images are stored as they are
+DEFLATE_SUFFIXES = {".txt", ".json"}
+
+# Bytes read from an output file per ZIP write (and streamed chunk)
+CHUNK_SIZE = 1024 * 1024
+
+# Manifest error for a file whose tool raised anything but ToolFailed /
+# Cancelled (the details are logged)
+GENERIC_ERROR = "Could not process this file."
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+        return _pool
+
+
+class _ZipSink(io.RawIOBase):
+    """
+    Unseekable file that keeps what ZipFile writes until it is taken, so
+    the archive can be streamed. ZipFile writes data descriptors after
+    each entry when it can't seek back.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _output_files(output: Path):
+    """
+    (path, arcname) of what one tool call wrote: the file itself, or the
+    files of an output folder under '<folder>/'.
+    """
+    if output.is_dir():
+        return [(p, f"{output.name}/{p.name}") for p in sorted(output.iterdir()) if p.is_file()]
+    return [(output, output.name)]
+
+
+def _manifest_error(name: str, error: BaseException) -> str:
+    """
+    What the manifest says about a failed file.
+    """
+    if isinstance(error, (isolation.ToolFailed, Cancelled)):
+        return str(error)
+    logger.error("Batch file %r failed", name, exc_info=error)
+    return GENERIC_ERROR
+
+
+def _zip_file(zf, sink, path: Path, arcname: str):
+    """
+    Add one file to the archive, yielding the bytes written so far after
+    every chunk.
+    """
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    zinfo.compress_type = (zipfile.ZIP_DEFLATED if path.suffix.lower() in DEFLATE_SUFFIXES
+                           else zipfile.ZIP_STORED)
+    with open(path, "rb") as src, zf.open(zinfo, "w") as dst:
+        while chunk := src.read(CHUNK_SIZE):
+            dst.write(chunk)
+            data = sink.take()
+            if data:
+                yield data
+    data = sink.take()
+    if data:
+        yield data
+
+
+class Batch:
+    """
+    Tool calls for the files of one request, and the folder they read
+    from (inputs_dir) and write to (outputs_dir).
+    """
+
+    def __init__(self, outputs_dir):
+        self.folder = Path(tempfile.mkdtemp(prefix="batch_", dir=outputs_dir))
+        self.inputs_dir = self.folder / "inputs"
+        self.outputs_dir = self.folder / "outputs"
+        self.inputs_dir.mkdir()
+        self.outputs_dir.mkdir()
+        self.jobs = []  # (name, output, call)
+        self._stems = set()
+
+    def unique_name(self, file_name: str) -> str:
+        """
+        `file_name`, or 'name (2).pdf' etc. if the batch already has a file
+        with that stem (case-insensitive, so outputs named after the stem
+        can't collide either). Save the upload under this name.
+        """
+        path = Path(file_name)
+        name, n = path.name, 1
+        while Path(name).stem.lower() in self._stems:
+            n += 1
+            name = f"{path.stem} ({n}){path.suffix}"
+        self._stems.add(Path(name).stem.lower())
+        return name
+
+    def add(self, name: str, output, call):
+        """
+        Queue `call` (a picklable callable, e.g. a functools.partial of a
+        tool function) for the upload `name`. `output` is the file or
+        folder the call writes; it is what goes into the ZIP.
+        """
+        self.jobs.append((name, Path(output), call))
+
+    def _remove_when_done(self, futures):
+        running = [f for f in futures if not f.done()]
+        if not running:
+            shutil.rmtree(self.folder, ignore_errors=True)
+            return
+
+        def remove():
+            wait(running)
+            shutil.rmtree(self.folder, ignore_errors=True)
+
+        threading.Thread(target=remove, daemon=True).start()
+
+    def stream(self, job_id: str = None):
+        """
+        Run the calls and yield the ZIP, entry by entry, as they finish.
+        """
+        pool = _get_pool()
+        cancel = progress.cancel_token(job_id) or progress.CancelToken()
+        futures = {}
+        for index, (name, output, call) in enumerate(self.jobs):
+            futures[pool.submit(isolation.run, call, cancel=cancel)] = index
+
+        results = [None] * len(self.jobs)
+        sink = _ZipSink()
+        try:
+            with progress.track(job_id) as report, zipfile.ZipFile(sink, "w") as zf:
+                pending = set(futures)
+                while pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        index = futures[future]
+                        name, output, _ = self.jobs[index]
+                        error = future.exception()
+                        if error is not None:
+                            results[index] = {"file": name, "status": "error",
+                                              "error": _manifest_error(name, error)}
+                            continue
+                        entries = []
+                        for path, arcname in _output_files(output):
+                            yield from _zip_file(zf, sink, path, arcname)
+                            entries.append(arcname)
+                        results[index] = {"file": name, "status": "ok", "outputs": entries}
+                    report(len(self.jobs) - len(pending), len(self.jobs))
+
+                failed = sum(1 for r in results if r["status"] == "error")
+                manifest = {"succeeded": len(results) - failed, "failed": failed, "files": results}
+                zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2),
+                            compress_type=zipfile.ZIP_DEFLATED)
+            yield sink.take()
+        finally:
+            # Closed early when the client disconnects
+            if not all(future.done() for future in futures):
+                cancel.cancel()
+            for future in futures:
+                future.cancel()
+            self._remove_when_done(futures)
+
+    def response(self, zip_name: str, job_id: str = None):
+        response = StreamingHttpResponse(self.stream(job_id), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="{zip_name}"'
+        return response
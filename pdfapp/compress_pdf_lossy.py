@@ -0,0 +1,745 @@
+# python -m pdfapp.compress_pdf_lossy Files\Final_Thesis.pdf --level 50
+
+
+import fitz  # PyMuPDF
+import os
+import argparse
+import math
+import re
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # scans are recompressed like any other image
+    np = None
+
+from .metrics import phase, record_pages
+from .pdf_writer import save_pdf
+
+
+def map_level_to_params(level: int):
+    """
+    Map a human-friendly 'compression level' (0-100)
+    to internal parameters for rewrite_images.
+
+    level = 0   -> very light compression (high quality, high DPI)
+    level = 100 -> strong compression (lower quality, lower DPI)
+    """
+    level = max(0, min(100, level))
+
+    # JPEG quality: 0 -> 85, 100 -> 50  (smooth, not extreme)
+    quality = int(85 - (35 * level / 100))
+
+    # First choose a threshold: 0 -> 220 dpi, 100 -> 150 dpi
+    dpi_threshold = int(220 - (70 * level / 100))
+
+    # Target must be LESS than threshold. Keep a 40 dpi gap.
+    dpi_target = max(72, dpi_threshold - 40)
+
+    return dpi_threshold, dpi_target, quality
+
+
+
+# Levels reported by analyze_compression() by default
+ANALYSIS_LEVELS = tuple(range(0, 101, 10))
+
+# Images decoded and test-encoded by analyze_compression()
+ANALYSIS_SAMPLES = 4
+
+# Sampled images up to WHOLE pixels (at output resolution) are test-encoded
+# whole; larger ones as a mosaic of GRID x GRID tiles of TILE x TILE pixels
+# spread over the image.
+_SAMPLE_WHOLE_PIXELS = 640 * 960
+_SAMPLE_GRID = 6
+_SAMPLE_TILE = 96
+
+# Uncompressed streams are deflate-estimated from this many leading bytes
+_DEFLATE_SAMPLE_BYTES = 1 << 20
+
+# Scan recoding (see _recode_scans). Smaller images (logos, icons) are
+# left alone: they gain little and classify poorly.
+_SCAN_MIN_PIXELS = 800 * 800
+# Pixels sampled per image to classify it
+_SCAN_SAMPLE_PIXELS = 256 * 256
+# After white balancing, a pixel is gray if its channels are at most
+# SPREAD apart; an image is near-gray if SHARE of its samples are.
+_SCAN_GRAY_SPREAD = 24
+_SCAN_GRAY_SHARE = 0.99
+# Paper (the 95th percentile of each channel) darker than this is not
+# white-balanced: the image is not a page on paper
+_SCAN_MIN_PAPER = 160
+# A near-gray image is near-bitonal (ink on paper, with anti-aliased
+# edges) if at most SHARE of its samples are mid-tones; photos have
+# far more.
+_SCAN_MIDTONES = (64, 192)
+_SCAN_MIDTONE_SHARE = 0.08
+# A DecodeParms / Decode entry set to null, in a compressed xref_object()
+_NULL_KEY_RE = re.compile(r"/(?:DecodeParms|Decode) null\b")
+
+# From this level on, near-bitonal scans are reduced to 1 bit per pixel;
+# below it they are only made gray
+BITONAL_MIN_LEVEL = 20
+
+
+def _subsample_factor(dpi, dpi_threshold: int, dpi_target: int):
+    """
+    Downsampling factor rewrite_images() applies to an image used at `dpi`:
+    MuPDF only subsamples above the threshold, by a power of two, and never
+    below the target.
+    """
+    if not dpi or dpi <= dpi_threshold:
+        return 1
+    return 2 ** max(0, int(math.log2(dpi / dpi_target)))
+
+
+def _stream_sizes(doc, xref):
+    """
+    (current bytes, bytes after ez_save) of a stream. ez_save deflates
+    streams that are stored uncompressed; everything else keeps its size.
+    """
+    filtered = doc.xref_get_key(xref, "Filter")[0] != "null"
+    length = doc.xref_get_key(xref, "Length")[1]
+    if filtered and length.isdigit():
+        return int(length), int(length)
+
+    raw = doc.xref_stream_raw(xref) or b""
+    if filtered or not raw:
+        return len(raw), len(raw)
+    head = raw[:_DEFLATE_SAMPLE_BYTES]
+    return len(raw), int(len(zlib.compress(head, 6)) * len(raw) / len(head))
+
+
+def _structure_bytes(doc, image_xrefs):
+    """
+    Estimated size of everything that is not an image after ez_save():
+    non-image streams (deflated if stored uncompressed) plus all other
+    objects, which ez_save packs into compressed object streams.
+    """
+    total = 0
+    objects = []
+    for xref in range(1, doc.xref_length()):
+        try:
+            source = doc.xref_object(xref, compressed=True)
+        except Exception:  # free / broken xref entry
+            continue
+        if doc.xref_is_stream(xref):
+            if doc.xref_get_key(xref, "Type")[1] in ("/ObjStm", "/XRef"):
+                continue  # rebuilt by ez_save
+            total += len(source) + 40  # dict + "n 0 obj stream ... endobj"
+            if xref not in image_xrefs:
+                total += _stream_sizes(doc, xref)[1]
+        else:
+            objects.append(f"{xref} 0 {source}\n")
+    packed = "".join(objects).encode("latin-1", "replace")
+    # object streams, plus ~5 bytes per xref stream entry and the trailer
+    return total + len(zlib.compress(packed, 6)) + 5 * doc.xref_length() + 200
+
+
+def _image_inventory(doc):
+    """
+    One entry per image xref: size, effective dpi (lowest over all places
+    it is drawn, like MuPDF), kind, filter and stored bytes.
+
+    Placements come from get_image_info() without xrefs, which would hash
+    every image. They are matched to the page's image xrefs by pixel
+    size; if several images on a page share a size, each gets the lowest
+    dpi among them.
+    """
+    images = {}
+    for page in doc:
+        placed = {}
+        for info in page.get_image_info():
+            a, b, c, d = info["transform"][:4]
+            scale_x, scale_y = math.hypot(a, b), math.hypot(c, d)
+            if not (scale_x and scale_y):
+                continue
+            dpi = min(info["width"] * 72 / scale_x, info["height"] * 72 / scale_y)
+            key = (info["width"], info["height"])
+            if key not in placed or dpi < placed[key][0]:
+                placed[key] = (dpi, info["colorspace"])
+
+        for item in page.get_images(full=True):
+            xref, width, height, bpc = item[0], item[2], item[3], item[4]
+            dpi, colorspace = placed.get((width, height), (None, None))
+
+            entry = images.get(xref)
+            if entry is None:
+                if bpc == 1:
+                    kind = "bitonal"
+                elif colorspace == 1 or item[5] in ("DeviceGray", "CalGray"):
+                    kind = "gray"
+                else:
+                    kind = "color"
+                current, saved = _stream_sizes(doc, xref)
+                filters = doc.xref_get_key(xref, "Filter")[1]
+                entry = images[xref] = {
+                    "xref": xref,
+                    "width": width,
+                    "height": height,
+                    "dpi": dpi,
+                    "kind": kind,
+                    "filter": filters.strip("[]/ ").replace(" /", ",") if filters != "null" else "none",
+                    "bytes": current,
+                    "_saved_bytes": saved,
+                }
+            elif dpi is not None and (entry["dpi"] is None or dpi < entry["dpi"]):
+                entry["dpi"] = dpi
+
+    for entry in images.values():
+        if entry["dpi"] is not None:
+            entry["dpi"] = round(entry["dpi"], 1)
+    return list(images.values())
+
+
+def _pixels(pix):
+    """
+    The samples of `pix` as a (height, width, n) array, without copying.
+    """
+    return np.frombuffer(pix.samples_mv, np.uint8).reshape(pix.height, pix.width, pix.n)
+
+
+def _luminance(pixels, white=None):
+    """
+    8-bit gray of an RGB (or gray) pixel array. `white` is the paper's
+    colour per channel: it is mapped to 255, so tinted paper comes out
+    white.
+    """
+    if pixels.shape[2] == 1:
+        return pixels[..., 0]
+    weights = np.array([0.299, 0.587, 0.114], np.float32)
+    if white is not None:
+        weights = weights * (255 / white)
+    return np.minimum(pixels @ weights + 0.5, 255).astype(np.uint8)
+
+
+def _otsu_threshold(gray) -> int:
+    """
+    Gray level from which a pixel counts as white: the split of the
+    histogram with the largest variance between the two classes (Otsu).
+    """
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    below = np.cumsum(hist)  # pixels <= t
+    mass = np.cumsum(hist * np.arange(256))
+    above = below[-1] - below
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = below * above * (mass / below - (mass[-1] - mass) / above) ** 2
+    return int(np.argmax(np.nan_to_num(between))) + 1
+
+
+def _classify_scan(pixels):
+    """
+    Classify an image from a strided sample of its pixels.
+
+    Returns (kind, white, threshold): kind is "bitonal", "gray" or None
+    (colour, keep it); white the paper colour used to white-balance an
+    RGB image (or None); threshold, for "bitonal", the gray level from
+    which a pixel is white.
+    """
+    height, width = pixels.shape[:2]
+    step = max(1, int(math.sqrt(height * width / _SCAN_SAMPLE_PIXELS)))
+    sample = pixels[::step, ::step]
+
+    white = None
+    if sample.shape[2] == 3:
+        paper = np.percentile(sample.reshape(-1, 3), 95, axis=0).astype(np.float32)
+        if paper.min() >= _SCAN_MIN_PAPER:
+            white = paper
+        balanced = sample * (255 / white) if white is not None else sample.astype(np.float32)
+        spread = balanced.max(axis=2) - balanced.min(axis=2)
+        if np.mean(spread <= _SCAN_GRAY_SPREAD) < _SCAN_GRAY_SHARE:
+            return None, None, None
+
+    gray = _luminance(sample, white)
+    low, high = _SCAN_MIDTONES
+    if np.mean((gray >= low) & (gray < high)) > _SCAN_MIDTONE_SHARE:
+        return "gray", white, None
+    return "bitonal", white, _otsu_threshold(gray)
+
+
+def _replace_image_stream(doc, xref: int, data: bytes, bpc: int):
+    """
+    Make image `xref` a DeviceGray image of `bpc` bits with samples `data`.
+    """
+    # update_stream() would deflate at MuPDF's slowest level. The stream
+    # may be final: rewrite_images() re-encodes it (JPEG, CCITT G4) only
+    # where that is smaller or it subsamples, and keeps it otherwise.
+    doc.update_stream(xref, zlib.compress(data, 9 if bpc == 1 else 6), compress=False)
+    for key, value in (("Filter", "/FlateDecode"), ("ColorSpace", "/DeviceGray"),
+                       ("BitsPerComponent", str(bpc))):
+        doc.xref_set_key(xref, key, value)
+    # The old DecodeParms / Decode don't apply to the new samples.
+    # xref_set_key() can't delete a key, only null it: null them, then cut
+    # them from the dictionary.
+    for key in ("DecodeParms", "Decode"):
+        doc.xref_set_key(xref, key, "null")
+    doc.update_object(xref, _NULL_KEY_RE.sub("", doc.xref_object(xref, compressed=True)))
+
+
+def _recode_scans(doc, bitonal: bool = True, check_cancel=None, page_done=None, originals=None):
+    """
+    Give scanned pages the encoding their content needs before
+    rewrite_images() runs: colour images that are near-gray become 8-bit
+    gray (JPEG-encoded by rewrite_images() as one channel instead of
+    three), and near-bitonal ones - black-and-white documents, in colour
+    or gray - become 1-bit images (deflated, or CCITT G4 where
+    rewrite_images() finds that smaller). With `bitonal` False those are
+    made gray too.
+
+    Images are classified by _classify_scan(); images below
+    _SCAN_MIN_PIXELS, with a colour-key mask or neither gray nor RGB are
+    skipped. Without NumPy nothing is recoded.
+
+    check_cancel() is called before every page and every image it
+    decodes, page_done(page_number) after every page. If `originals` is
+    a dict, it gets {xref: (object source, stream bytes, placements)} of
+    every image recoded, for _restore_originals(); placements are
+    (page number, bbox) pairs.
+
+    Returns {"gray": n, "bitonal": n}, the number of images recoded.
+    """
+    recoded = {"gray": 0, "bitonal": 0}
+    if np is None:
+        return recoded
+
+    seen = set()
+    for page in doc:
+        if check_cancel is not None:
+            check_cancel()
+        for item in page.get_images(full=True):
+            xref, width, height, bpc = item[0], item[2], item[3], item[4]
+            if xref in seen:
+                continue
+            seen.add(xref)
+            if bpc != 8 or width * height < _SCAN_MIN_PIXELS \
+                    or doc.xref_get_key(xref, "Mask")[0] != "null":
+                continue
+            if check_cancel is not None:
+                check_cancel()
+
+            pix = fitz.Pixmap(doc, xref)
+            if pix.alpha or pix.n not in (1, 3):
+                continue
+            pixels = _pixels(pix)
+            kind, white, threshold = _classify_scan(pixels)
+            if kind == "bitonal" and not bitonal:
+                kind = "gray"
+            if kind is None or (kind == "gray" and pix.n == 1):
+                continue
+
+            gray = _luminance(pixels, white)
+            if originals is not None:
+                originals[xref] = (doc.xref_object(xref, compressed=True),
+                                   len(doc.xref_stream_raw(xref)), [])
+            if kind == "bitonal":
+                _replace_image_stream(doc, xref, np.packbits(gray >= threshold, axis=1).tobytes(), 1)
+            else:
+                _replace_image_stream(doc, xref, gray.tobytes(), 8)
+            recoded[kind] += 1
+            pix = pixels = gray = None
+        if originals:
+            for item in page.get_images(full=True):
+                if item[0] in originals:
+                    originals[item[0]][2].append((page.number, _image_bbox(page, item)))
+        if page_done is not None:
+            page_done(page.number)
+    return recoded
+
+
+def _image_bbox(page, item):
+    """
+    Where image `item` (from get_images(full=True)) is drawn on `page`,
+    rounded, or None if that can't be told (e.g. inside a form XObject).
+    """
+    try:
+        rect = page.get_image_bbox(item)
+    except (ValueError, RuntimeError):
+        return None
+    if rect.is_infinite or rect.is_empty:
+        return None
+    return tuple(round(v, 1) for v in rect)
+
+
+def _restore_originals(doc, source_doc, originals) -> int:
+    """
+    Put back the original stream of every recoded image (`originals`, from
+    _recode_scans) that rewrite_images() did not make smaller than it was:
+    a near-gray JPEG recoded to lossless gray can come out larger. The
+    stream is read again from `source_doc`, the unmodified input.
+
+    rewrite_images() writes re-encoded images as new objects, under new
+    names, so the images are found again by where they are drawn.
+
+    Returns the number of images restored.
+    """
+    drawn = {}  # (page number, bbox) -> image xref now drawn there
+    for number in sorted({number for _, _, placements in originals.values()
+                          for number, _ in placements}):
+        page = doc[number]
+        for item in page.get_images(full=True):
+            bbox = _image_bbox(page, item)
+            if bbox is not None:
+                drawn[(number, bbox)] = item[0]
+
+    restored = 0
+    for xref, (source, original_bytes, placements) in originals.items():
+        current = {drawn.get(placement) for placement in placements if placement[1] is not None}
+        current.discard(None)
+        for target in current:
+            if len(doc.xref_stream_raw(target)) < original_bytes:
+                continue
+            # update_stream() drops the Filter, update_object() puts it back
+            doc.update_stream(target, source_doc.xref_stream_raw(xref), compress=False)
+            doc.update_object(target, source)
+            restored += 1
+    return restored
+
+
+def _jpeg_size(pix, quality: int):
+    return len(pix.tobytes("jpg", jpg_quality=quality))
+
+
+def _sample_mosaic(pix, factor: int):
+    """
+    GRID x GRID tiles spread over `pix`, each subsampled by `factor` the
+    way MuPDF does it (box average = Pixmap.shrink), in one pixmap.
+    Small images are subsampled whole instead.
+    """
+    shrink = int(math.log2(factor))
+    side = _SAMPLE_TILE * factor
+    if pix.width * pix.height <= _SAMPLE_WHOLE_PIXELS * factor * factor \
+            or min(pix.width, pix.height) < side:
+        whole = fitz.Pixmap(pix, 0)  # copy
+        if shrink:
+            whole.shrink(shrink)
+        return whole
+
+    w = min(side, pix.width - pix.width % factor)
+    h = min(side, pix.height - pix.height % factor)
+    tile_w, tile_h = w // factor, h // factor
+    mosaic = fitz.Pixmap(pix.colorspace, fitz.IRect(0, 0, tile_w * _SAMPLE_GRID, tile_h * _SAMPLE_GRID), False)
+    for row in range(_SAMPLE_GRID):
+        for col in range(_SAMPLE_GRID):
+            x0 = min(max(0, int((col + 0.5) * pix.width / _SAMPLE_GRID - w / 2)), pix.width - w)
+            y0 = min(max(0, int((row + 0.5) * pix.height / _SAMPLE_GRID - h / 2)), pix.height - h)
+            window = fitz.IRect(x0, y0, x0 + w, y0 + h)
+            # (Pixmap(pix, w, h, clip) would do this in one step, but
+            # scaling with a clip is unreliable in PyMuPDF.)
+            tile = fitz.Pixmap(pix.colorspace, window, False)
+            tile.copy(pix, window)
+            if shrink:
+                tile.shrink(shrink)
+            tile.set_origin(col * tile_w, row * tile_h)
+            mosaic.copy(tile, tile.irect)
+    return mosaic
+
+
+def _sample_bpp(doc, xref: int, settings, header: int):
+    """
+    Test-encode one image for each (factor, quality) in `settings`.
+    Returns {(factor, quality): JPEG bytes per output pixel}.
+
+    Only the lowest, highest and middle quality are encoded per factor;
+    the others are interpolated, since size grows smoothly with quality.
+    """
+    pix = fitz.Pixmap(doc, xref)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n != 3:
+        # MuPDF writes recompressed gray images as RGB JPEGs; CMYK is
+        # approximated the same way.
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+
+    bpp = {}
+    for factor in sorted({factor for factor, _quality in settings}):
+        mosaic = _sample_mosaic(pix, factor)
+        pixels = mosaic.width * mosaic.height
+        qualities = sorted({q for f, q in settings if f == factor})
+        anchors = sorted({qualities[0], qualities[len(qualities) // 2], qualities[-1]})
+        measured = [(q, max(0, _jpeg_size(mosaic, q) - header) / pixels) for q in anchors]
+        for quality in qualities:
+            for (q0, b0), (q1, b1) in zip(measured, measured[1:] or measured):
+                if q0 <= quality <= q1:
+                    t = (quality - q0) / (q1 - q0) if q1 != q0 else 0
+                    bpp[(factor, quality)] = b0 + t * (b1 - b0)
+                    break
+        mosaic = None
+    return bpp
+
+
+def analyze_compression(input_path, levels=ANALYSIS_LEVELS, max_samples: int = ANALYSIS_SAMPLES):
+    """
+    Predict the output size of compress_pdf_lossy_with_level() for each
+    level without compressing anything.
+
+    The image inventory is read once. The largest images (at least one
+    per kind) are decoded and a mosaic of tiles from each is JPEG-encoded
+    at every level's quality / subsampling; the resulting bytes-per-pixel
+    are then applied to all images of that kind. Like rewrite_images(), an
+    image keeps its original stream when the re-encode would be larger.
+    Bitonal images keep their size; text, fonts and structure are counted
+    as ez_save() would write them, without font subsetting. Scans that
+    _recode_scans() makes gray or 1-bit are predicted as they are stored,
+    so for those the estimate is an upper bound.
+
+    Returns a dict with the inventory and one row per level.
+    """
+    started = time.perf_counter()
+    file_bytes = os.path.getsize(input_path)
+
+    with phase("open"):
+        doc = fitz.open(input_path)
+
+    with phase("tool"):
+        images = _image_inventory(doc)
+        image_xrefs = {img["xref"] for img in images}
+
+        other_bytes = _structure_bytes(doc, image_xrefs)
+
+        params = {level: map_level_to_params(level) for level in levels}
+        factors = {
+            level: {img["xref"]: _subsample_factor(img["dpi"], threshold, target)
+                    for img in images}
+            for level, (threshold, target, _quality) in params.items()
+        }
+
+        # Pick the samples: the biggest image of each kind first, then the
+        # biggest of the rest.
+        candidates = sorted((img for img in images if img["kind"] != "bitonal"),
+                            key=lambda img: img["width"] * img["height"], reverse=True)
+        samples = []
+        for kind in ("color", "gray"):
+            first = next((img for img in candidates if img["kind"] == kind), None)
+            if first is not None:
+                samples.append(first)
+        samples += [img for img in candidates if img not in samples][:max(0, max_samples - len(samples))]
+
+        blank = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+        blank.clear_with(255)
+        header = _jpeg_size(blank, 75)
+
+        # Pixel-weighted bytes-per-pixel per (kind, factor, quality)
+        totals = {}
+        for img in samples:
+            settings = {(factors[level][img["xref"]], params[level][2]) for level in levels}
+            weight = img["width"] * img["height"]
+            for (factor, quality), value in _sample_bpp(doc, img["xref"], settings, header).items():
+                acc = totals.setdefault((img["kind"], factor, quality), [0.0, 0])
+                acc[0] += value * weight
+                acc[1] += weight
+
+        def predicted_bpp(kind, factor, quality):
+            acc = totals.get((kind, factor, quality))
+            if acc is None:
+                # No sample at this factor: use the closest one measured
+                options = [(abs(math.log2(f / factor)), key) for key in totals
+                           for k, f, q in [key] if k == kind and q == quality]
+                if not options:
+                    return None
+                acc = totals[min(options)[1]]
+            return acc[0] / acc[1]
+
+        rows = []
+        for level in levels:
+            threshold, target, quality = params[level]
+            estimate = other_bytes
+            for img in images:
+                factor = factors[level][img["xref"]]
+                bpp = None
+                if img["kind"] != "bitonal":
+                    bpp = predicted_bpp(img["kind"], factor, quality)
+                if bpp is None:
+                    estimate += img["_saved_bytes"]
+                    continue
+                pixels = max(1, img["width"] // factor) * max(1, img["height"] // factor)
+                encoded = int(header + bpp * pixels)
+                # MuPDF compares against the stream as stored (even when
+                # that is uncompressed) and keeps whichever is smaller.
+                estimate += encoded if encoded < img["bytes"] else img["_saved_bytes"]
+            rows.append({
+                "level": level,
+                "dpi_threshold": threshold,
+                "dpi_target": target,
+                "quality": quality,
+                "estimated_bytes": estimate,
+                "estimated_saving_percent": round(100 * (1 - estimate / file_bytes), 1) if file_bytes else 0.0,
+            })
+
+    for img in images:
+        del img["_saved_bytes"]
+    result = {
+        "file": os.path.basename(input_path),
+        "pages": doc.page_count,
+        "file_bytes": file_bytes,
+        "image_bytes": sum(img["bytes"] for img in images),
+        "other_bytes": other_bytes,
+        "images": images,
+        "sampled_images": len(samples),
+        "levels": rows,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    doc.close()
+    return result
+
+
+def print_analysis(result: dict):
+    print(f"{result['file']}: {result['pages']} pages, {result['file_bytes']:,} bytes "
+          f"({len(result['images'])} images = {result['image_bytes']:,} bytes)")
+    print(f"{'level':>5}  {'dpi':>9}  {'quality':>7}  {'estimated':>12}  {'saving':>6}")
+    for row in result["levels"]:
+        print(f"{row['level']:>5}  {row['dpi_threshold']:>4}>{row['dpi_target']:<4}  "
+              f"{row['quality']:>7}  {row['estimated_bytes']:>12,}  "
+              f"{row['estimated_saving_percent']:>5}%")
+    print(f"({result['sampled_images']} images sampled in {result['seconds']} s)")
+
+
+def _no_progress(done, total, bytes_written=0):
+    pass
+
+
+def compress_pdf_lossy_with_level(input_path, output_path, level=50, progress=None, profile=None,
+                                  cancel=None):
+    """
+    Compress a single PDF with a percentage-like 'level' (0-100).
+    Higher level => stronger compression.
+
+    progress: optional callback(steps_done, total_steps, bytes_written).
+    The scan recoding goes page by page and reports every page; after it
+    the engine works on the whole document at once (images, fonts, save),
+    one step each: total_steps is the page count + 3.
+    profile: output profile, see pdf_writer.PROFILES (None = default).
+    cancel: optional token (pdfapp.progress.CancelToken), checked before
+    every page (and every scan decoded) of the recoding and between the
+    engine steps; cancel.check() raises once it is cancelled, before
+    anything is written. An engine step can't stop halfway: a cancel
+    that arrives during one is handled by pdfapp.isolation, which kills
+    the call if it doesn't return within its grace period.
+
+    Before the lossy pass, scans that are really gray or black-and-white
+    are recoded as 8-bit gray or 1-bit images (see _recode_scans); the
+    1-bit step starts at BITONAL_MIN_LEVEL.
+    """
+    if progress is None:
+        progress = _no_progress
+
+    def check_cancel():
+        if cancel is not None:
+            cancel.check()
+
+    dpi_threshold, dpi_target, quality = map_level_to_params(level)
+
+    print(f"Using level={level} -> dpi_threshold={dpi_threshold}, "
+          f"dpi_target={dpi_target}, quality={quality}")
+
+    with phase("open"):
+        doc = fitz.open(input_path)
+    try:
+        record_pages("compress_pdf_lossy_with_level", doc.page_count)
+        pages = doc.page_count
+        total = pages + 3
+        progress(0, total)
+        check_cancel()
+
+        # 1) lossy recompression of images, after recoding gray and
+        #    black-and-white scans
+        with phase("tool"):
+            originals = {}
+            recoded = _recode_scans(doc, bitonal=level >= BITONAL_MIN_LEVEL,
+                                    check_cancel=check_cancel,
+                                    page_done=lambda number: progress(number + 1, total),
+                                    originals=originals)
+            if recoded["gray"] or recoded["bitonal"]:
+                print(f"Recoded scans: {recoded['gray']} to gray, "
+                      f"{recoded['bitonal']} to 1-bit")
+            check_cancel()
+
+            doc.rewrite_images(
+                dpi_threshold=dpi_threshold,
+                dpi_target=dpi_target,
+                quality=quality,
+                lossy=True,
+                lossless=True,
+                bitonal=True,
+                color=True,
+                gray=True,
+                set_to_gray=False,
+            )
+            if originals:
+                with fitz.open(input_path) as source_doc:
+                    restored = _restore_originals(doc, source_doc, originals)
+                if restored:
+                    print(f"Kept the original of {restored} recoded scans (not smaller)")
+
+            progress(pages + 1, total)
+            check_cancel()
+
+            # 2) still do font subsetting (lossless for text)
+            doc.subset_fonts()
+            progress(pages + 2, total)
+            check_cancel()
+
+        # 3) save with structural optimization
+        with phase("save"):
+            save_pdf(doc, output_path, profile)
+    finally:
+        doc.close()
+    progress(total, total, os.path.getsize(output_path))
+
+    print(f"Compressed (level {level}) '{input_path}' -> '{output_path}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Lossy PDF compression with a 0-100 'level' knob."
+    )
+    parser.add_argument("input", help="Input PDF file or directory")
+    parser.add_argument("output", nargs="?", help="Output PDF file or output directory (for batch)")
+    parser.add_argument("--level", type=int, default=50,
+                        help="Compression level 0-100 (higher = more compression, default: 50)")
+    parser.add_argument("--analyze", action="store_true",
+                        help="Only predict the output size at each level; write nothing")
+    args = parser.parse_args()
+
+    input_path = args.input
+    output_path = args.output
+    level = args.level
+
+    if args.analyze:
+        if not os.path.isfile(input_path):
+            parser.error("--analyze expects a single PDF file.")
+        print_analysis(analyze_compression(input_path))
+        return
+
+    # Single file
+    if os.path.isfile(input_path):
+        if output_path:
+            if os.path.isdir(output_path):
+                os.makedirs(output_path, exist_ok=True)
+                base = os.path.basename(input_path)
+                out_file = os.path.join(output_path, base)
+            else:
+                out_file = output_path
+        else:
+            base, ext = os.path.splitext(input_path)
+            out_file = f"{base}_lossy{ext or '.pdf'}"
+
+        compress_pdf_lossy_with_level(input_path, out_file, level=level)
+
+    # Batch: directory
+    elif os.path.isdir(input_path):
+        if not output_path:
+            parser.error("Batch mode requires an output directory as the second argument.")
+        os.makedirs(output_path, exist_ok=True)
+
+        for fname in os.listdir(input_path):
+            if not fname.lower().endswith(".pdf"):
+                continue
+            in_file = os.path.join(input_path, fname)
+            out_file = os.path.join(output_path, fname)
+            compress_pdf_lossy_with_level(in_file, out_file, level=level)
+    else:
+        parser.error(f"Input path '{input_path}' is not a file or directory.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Content-addressed store for uploaded PDFs, filled while the upload streams in.
+
+Django's default handlers spool every upload to a temp file, then the
+views copied it into media/uploads/ and the search index read it a third
+time to hash it. ContentStoreUploadHandler does it in one pass instead:
+each chunk of a 'pdf_files' upload is hashed (SHA-256) and written to a
+temp file in the store, which is renamed to
+
+    <CONTENT_STORE_ROOT>/<sha256[:2]>/<sha256>.pdf
+
+when the file is complete. If that object already exists the upload is a
+duplicate: the temp file is dropped and `uploaded_file.duplicate` is True.
+
+While streaming, the handler also
+  - rejects files that don't start with a %PDF header (checked within the
+    first KB, as PDF readers do) before storing more than one chunk, and
+  - rejects the request as soon as it exceeds UPLOAD_MAX_BODY_BYTES (from
+    Content-Length before reading anything, or while counting bytes when
+    the length is unknown).
+
+pdfapp.middleware.ContentStoreUploadMiddleware installs the handler and
+turns a rejection into a 400 / 413 response. Views then call
+`save_upload()` to give the stored object its upload name: a hard link,
+not a copy. Store objects must never be written to; `save_upload()`
+replaces upload paths instead of overwriting them.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+
+
+# Multipart fields streamed into the store
+PDF_FIELDS = ("pdf_files",)
+
+DEFAULT_MAX_BODY_BYTES = 500 * 1024 * 1024
+
+# PDF readers accept the %PDF- header anywhere in the first KB
+_HEADER_WINDOW = 1024
+
+
+class UploadRejected(Exception):
+    """
+    The upload was refused while streaming in; `status` is the HTTP status
+    to answer with.
+    """
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def store_root() -> Path:
+    return Path(getattr(settings, "CONTENT_STORE_ROOT", Path(settings.MEDIA_ROOT) / "store"))
+
+
+def max_body_bytes() -> int:
+    return getattr(settings, "UPLOAD_MAX_BODY_BYTES", DEFAULT_MAX_BODY_BYTES)
+
+
+def object_path(sha256: str) -> Path:
+    return store_root() / sha256[:2] / f"{sha256}.pdf"
+
+
+class StoredUploadedFile(UploadedFile):
+    """
+    An upload that lives in the content store.
+    """
+
+    def __init__(self, path: Path, sha256: str, duplicate: bool, name, content_type,
+                 size, charset, content_type_extra=None):
+        super().__init__(open(path, "rb"), name, content_type, size, charset, content_type_extra)
+        self.store_path = path
+        self.sha256 = sha256
+        self.duplicate = duplicate
+
+    def temporary_file_path(self):
+        return str(self.store_path)
+
+
+class _StoreWriter:
+    """
+    Temp file in the store that hashes what is written to it.
+    """
+
+    def __init__(self):
+        tmp_dir = store_root() / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(suffix=".part", dir=tmp_dir)
+        self._fh = os.fdopen(fd, "wb")
+        self._digest = hashlib.sha256()
+
+    def write(self, data: bytes):
+        self._digest.update(data)
+        self._fh.write(data)
+
+    def commit(self):
+        """
+        Move the temp file to its content address.
+        Returns (path, sha256, duplicate).
+        """
+        self._fh.close()
+        sha256 = self._digest.hexdigest()
+        path = object_path(sha256)
+        if path.exists():
+            os.remove(self.tmp_path)
+            return path, sha256, True
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.tmp_path, path)
+        return path, sha256, False
+
+    def discard(self):
+        self._fh.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class ContentStoreUploadHandler(FileUploadHandler):
+    """
+    Stream PDF_FIELDS uploads into the content store, hashing them on the
+    way. Other file fields are left to the next handlers.
+    """
+
+    def __init__(self, request=None, max_body: int = None):
+        super().__init__(request)
+        self.max_body = max_body_bytes() if max_body is None else max_body
+        self.received = 0
+        self.writer = None
+        self.head = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > self.max_body:
+            raise UploadRejected(self._too_large_message(), status=413)
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if field_name not in PDF_FIELDS:
+            self.writer = None
+            return
+        self.writer = _StoreWriter()
+        self.head = b""
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.writer is None:
+            return raw_data
+
+        self.received += len(raw_data)
+        if self.received > self.max_body:
+            self._discard()
+            raise UploadRejected(self._too_large_message(), status=413)
+
+        if self.head is not None:
+            self.head += raw_data[:_HEADER_WINDOW]
+            self._check_header(final=False)
+
+        self.writer.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.writer is None:
+            return None
+        if self.head is not None:
+            self._check_header(final=True)
+        path, sha256, duplicate = self.writer.commit()
+        self.writer = None
+        return StoredUploadedFile(path, sha256, duplicate, self.file_name, self.content_type,
+                                  file_size, self.charset, self.content_type_extra)
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def _check_header(self, final: bool):
+        if b"%PDF-" in self.head[:_HEADER_WINDOW]:
+            self.head = None
+        elif final or len(self.head) >= _HEADER_WINDOW:
+            self._discard()
+            raise UploadRejected(f"'{self.file_name}' is not a PDF file.")
+
+    def _discard(self):
+        if self.writer is not None:
+            self.writer.discard()
+            self.writer = None
+
+    def _too_large_message(self):
+        return f"Upload is larger than {self.max_body // (1024 * 1024)} MB."
+
+
+def save_upload(uploaded_file, dest) -> Path:
+    """
+    Make `uploaded_file` available at `dest`. Stored uploads are hard-linked
+    (copied where links are not supported); anything else is written out.
+    `dest` is always replaced, never written through, so a store object
+    linked there earlier can't be modified.
+    """
+    dest = Path(dest)
+    fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=dest.parent)
+    try:
+        store_path = getattr(uploaded_file, "store_path", None)
+        if store_path is not None:
+            os.close(fd)
+            os.remove(tmp_path)
+            try:
+                os.link(store_path, tmp_path)
+            except OSError:
+                with open(store_path, "rb") as src, open(tmp_path, "wb") as out:
+                    while chunk := src.read(1024 * 1024):
+                        out.write(chunk)
+        else:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in uploaded_file.chunks():
+                    out.write(chunk)
+        os.replace(tmp_path, dest)
+        # rename() does nothing when both names are links to one file (the
+        # same upload saved here before), leaving the temp name behind
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return dest
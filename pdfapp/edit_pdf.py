@@ -0,0 +1,185 @@
+# python -m pdfapp.edit_pdf Files\Final_Thesis.pdf --rotate 90 --pages "2-3" --title "Final Thesis"
+
+import fitz  # PyMuPDF
+import os
+import re
+import argparse
+
+from .metrics import phase, record_pages
+from .pdf_writer import copy_for_update, save_incremental, save_pdf
+
+
+# Metadata keys that can be set (fitz metadata names)
+METADATA_KEYS = ("title", "author", "subject", "keywords")
+
+
+def parse_page_list(spec: str, num_pages: int, ordered: bool = False):
+    """
+    Parse a string like "3,1,2" or "1-2,5,7-9" into 0-based page indices.
+
+    With ordered=True the pages are returned in the order given (repeats
+    allowed), otherwise as a sorted list without duplicates.
+    """
+    spec = spec.strip()
+    if not spec:
+        raise ValueError("No page specification given.")
+
+    pages = []
+    for token in spec.split(","):
+        token = token.strip()
+        if not token:
+            continue
+
+        if "-" in token:
+            s, e = token.split("-", 1)
+            start = int(s.strip())
+            end = int(e.strip())
+        else:
+            start = end = int(token)
+
+        if start < 1 or end > num_pages or start > end:
+            raise ValueError(f"Invalid page / range '{token}' for PDF with {num_pages} pages.")
+
+        pages.extend(range(start - 1, end))
+
+    return pages if ordered else sorted(set(pages))
+
+
+def _reorder_kids(doc, order) -> bool:
+    """
+    Reorder the pages by rewriting the /Kids array of a flat page tree, so
+    only that one object changes. Returns False (nothing done) when the
+    tree is nested or `order` is not a permutation of all pages.
+    """
+    if sorted(order) != list(range(doc.page_count)):
+        return False
+    kind, pages_ref = doc.xref_get_key(doc.pdf_catalog(), "Pages")
+    if kind != "xref":
+        return False
+    pages_xref = int(pages_ref.split()[0])
+    kind, kids = doc.xref_get_key(pages_xref, "Kids")
+    if kind != "array":
+        return False
+    refs = re.findall(r"\d+ \d+ R", kids)
+    if len(refs) != doc.page_count:
+        return False
+    if any(doc.xref_get_key(int(ref.split()[0]), "Type")[1] != "/Page" for ref in refs):
+        return False
+    doc.xref_set_key(pages_xref, "Kids", "[" + " ".join(refs[i] for i in order) + "]")
+    return True
+
+
+def edit_pdf(input_path: str, output_path: str = None, order: str = None, rotate: int = 0,
+             rotate_pages: str = None, metadata: dict = None, incremental: bool = True,
+             profile=None):
+    """
+    Apply structural edits to a PDF:
+      - order:     new page order, e.g. "3,1,2,4-10" (pages left out are
+                   dropped, repeated pages are copied)
+      - rotate:    degrees (multiple of 90) added to the rotation of
+                   rotate_pages (default: all pages)
+      - metadata:  {key: value} for METADATA_KEYS; other keys are kept
+
+    By default the edit is appended to a copy of the input (or to the
+    input itself when output_path is the same file) as an incremental
+    update, which writes only the changed objects. Passing a profile asks
+    for a compacted file and rewrites it instead (incremental=False does
+    that with the default profile).
+    """
+    if rotate % 90:
+        raise ValueError("Rotation must be a multiple of 90 degrees.")
+    metadata = metadata or {}
+    unknown = set(metadata) - set(METADATA_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown metadata key(s): {', '.join(sorted(unknown))}.")
+
+    with phase("open"):
+        doc = fitz.open(input_path)
+    if doc.needs_pass:
+        doc.close()
+        raise ValueError("PDF is password protected. Unlock it first.")
+    num_pages = doc.page_count
+    record_pages("edit_pdf", num_pages)
+
+    # Validate before any file is copied
+    new_order = parse_page_list(order, num_pages, ordered=True) if order else None
+    if order is not None and not new_order:
+        doc.close()
+        raise ValueError("The new page order contains no pages.")
+    rotated = parse_page_list(rotate_pages, num_pages) if rotate_pages else range(num_pages)
+
+    if output_path is None:
+        base_dir = os.path.dirname(os.path.abspath(input_path)) or "."
+        base_name, ext = os.path.splitext(os.path.basename(input_path))
+        output_path = os.path.join(base_dir, f"{base_name}_edited{ext or '.pdf'}")
+
+    incremental = incremental and profile is None
+    in_place = os.path.exists(output_path) and os.path.samefile(input_path, output_path)
+    if incremental:
+        doc.close()
+        if not in_place:
+            with phase("copy"):
+                copy_for_update(input_path, output_path)
+    elif in_place:
+        doc.close()
+        raise ValueError("A rewritten PDF can't replace its input; choose another output path.")
+
+    try:
+        if incremental:
+            doc = fitz.open(output_path)
+        try:
+            with phase("tool"):
+                # Pages are numbered as in the input, so rotate first. Look
+                # all pages up before changing any: each change makes MuPDF
+                # rebuild its page map on the next lookup.
+                if rotate:
+                    current = [(doc.page_xref(pno), doc[pno].rotation) for pno in rotated]
+                    for xref, rotation in current:
+                        doc.xref_set_key(xref, "Rotate", str((rotation + rotate) % 360))
+                if new_order is not None and not _reorder_kids(doc, new_order):
+                    doc.select(new_order)
+                if metadata:
+                    doc.set_metadata({**doc.metadata, **metadata})
+            with phase("save"):
+                if incremental:
+                    save_incremental(doc)
+                else:
+                    save_pdf(doc, output_path, profile)
+        finally:
+            doc.close()
+    except BaseException:
+        if not in_place and os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    print(f"{'Updated' if incremental else 'Created'}: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reorder, rotate or retitle a PDF, saving only the change by default."
+    )
+    parser.add_argument("input", help="Input PDF file path")
+    parser.add_argument(
+        "-o", "--output",
+        help="Output PDF file path (default: <input>_edited.pdf in same folder)"
+    )
+    parser.add_argument("--in-place", action="store_true", help="Update the input file itself")
+    parser.add_argument("--order", help="New page order, e.g. '3,1,2,4-10'")
+    parser.add_argument("--rotate", type=int, default=0, help="Degrees to rotate by (90, 180, 270)")
+    parser.add_argument("--pages", help="Pages to rotate, e.g. '1-2,5' (default: all)")
+    for key in METADATA_KEYS:
+        parser.add_argument(f"--{key}", help=f"Set the document {key}")
+    parser.add_argument(
+        "--rewrite", action="store_true",
+        help="Write a compacted file instead of appending the change"
+    )
+    args = parser.parse_args()
+
+    metadata = {key: getattr(args, key) for key in METADATA_KEYS if getattr(args, key) is not None}
+    output = args.input if args.in_place else args.output
+    edit_pdf(args.input, output, order=args.order, rotate=args.rotate, rotate_pages=args.pages,
+             metadata=metadata, incremental=not args.rewrite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# python -m pdfapp.extract_pages Files\Final_Thesis.pdf "1,3-5,7-8"
+
+import fitz  # PyMuPDF
+import os
+import argparse
+
+from .metrics import phase, record_pages
+from .pdf_writer import copy_for_update, save_incremental, save_pdf
+
+
+def parse_extract_spec(spec: str, num_pages: int):
+    """
+    Parse string like:
+      "5"
+      "3-7"
+      "1-2,5,7-9"
+    -> list of 0-based page indices to keep.
+    """
+    spec = spec.strip()
+    if not spec:
+        raise ValueError("No page specification given.")
+
+    keep_pages = set()
+
+    tokens = spec.split(",")
+    for token in tokens:
+        token = token.strip()
+        if not token:
+            continue
+
+        if "-" in token:
+            s, e = token.split("-", 1)
+            start = int(s.strip())
+            end = int(e.strip())
+        else:
+            start = end = int(token.strip())
+
+        if start < 1 or end > num_pages or start > end:
+            raise ValueError(f"Invalid range '{token}' for PDF with {num_pages} pages.")
+
+        for p in range(start, end + 1):
+            keep_pages.add(p - 1)  # convert to 0-based
+
+    return sorted(keep_pages)
+
+
+def extract_pages(input_path: str, extract_spec: str, output_path: str = None, profile=None,
+                  incremental: bool = False):
+    """
+    Write the pages of extract_spec from input_path to a new PDF at
+    output_path.
+
+    With incremental=True and no profile, the input is copied to
+    output_path and the other pages are deleted from it by an incremental
+    update (see remove_pages). That suits keeping most pages of a large
+    file; the deleted pages' data stays in it, and deleting many pages
+    one by one takes MuPDF longer than copying a few into a new file.
+    Passing a profile asks for a compacted file and always rewrites it.
+    """
+    with phase("open"):
+        doc = fitz.open(input_path)
+    if doc.needs_pass:
+        doc.close()
+        raise ValueError("PDF is password protected. Unlock it first.")
+    num_pages = doc.page_count
+
+    keep = parse_extract_spec(extract_spec, num_pages)
+    print(f"Total pages: {num_pages}")
+    print(f"Pages to extract (0-based): {keep}")
+
+    if not keep:
+        raise ValueError("No valid pages to extract.")
+
+    record_pages("extract_pages", len(keep))
+
+    # Default output name
+    if output_path is None:
+        base_dir = os.path.dirname(os.path.abspath(input_path)) or "."
+        base_name, ext = os.path.splitext(os.path.basename(input_path))
+        output_path = os.path.join(base_dir, f"{base_name}_extracted{ext or '.pdf'}")
+
+    if incremental and profile is None:
+        doc.close()
+        in_place = os.path.exists(output_path) and os.path.samefile(input_path, output_path)
+        if not in_place:
+            with phase("copy"):
+                copy_for_update(input_path, output_path)
+        kept = set(keep)
+        try:
+            doc = fitz.open(output_path)
+            try:
+                with phase("tool"):
+                    doc.delete_pages([i for i in range(num_pages) if i not in kept])
+                with phase("save"):
+                    save_incremental(doc)
+            finally:
+                doc.close()
+        except BaseException:
+            if not in_place and os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        print(f"Updated: {output_path}")
+        return
+
+    with phase("tool"):
+        new_doc = fitz.open()
+        for pno in keep:
+            new_doc.insert_pdf(doc, from_page=pno, to_page=pno)
+
+    with phase("save"):
+        save_pdf(new_doc, output_path, profile)
+    new_doc.close()
+    doc.close()
+    print(f"Created: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract specific pages or ranges from a PDF into a new file."
+    )
+    parser.add_argument("input", help="Input PDF file path")
+    parser.add_argument("spec", help="Pages/ranges to extract, e.g. '5' or '3-7' or '1-2,5,7-9'")
+    parser.add_argument(
+        "-o", "--output",
+        help="Output PDF file path (default: <input>_extracted.pdf in same folder)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Delete the other pages from a copy of the input by appending the change "
+             "(fast on large files, but their data stays in the file)"
+    )
+    args = parser.parse_args()
+
+    extract_pages(args.input, args.spec, args.output, incremental=args.incremental)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# python -m pdfapp.extract_text Files\Final_Thesis.pdf -o thesis.txt
+
+import argparse
+import os
+
+import fitz  # PyMuPDF
+
+from .metrics import phase, record_pages
+
+
+# Join words hyphenated across line breaks and keep text outside the
+# visible page area out of the result.
+TEXT_FLAGS = fitz.TEXT_DEHYPHENATE | fitz.TEXT_MEDIABOX_CLIP
+
+# Written between pages in .txt output
+PAGE_SEPARATOR = "\f"
+
+
+def iter_page_text(pdf_path: str, sort: bool = False):
+    """
+    Yield (page_number, text) for every page of a PDF, page_number 1-based.
+
+    Pages are loaded one at a time and released before the next one, so
+    memory stays flat however many pages the document has. `sort` orders
+    text blocks top-left to bottom-right instead of content-stream order
+    (slower, but better for multi-column layouts).
+
+    Raises ValueError for password-protected PDFs.
+    """
+    with phase("open"):
+        doc = fitz.open(pdf_path)
+    try:
+        if doc.needs_pass:
+            raise ValueError(f"PDF is password protected: {pdf_path}")
+        for page_index in range(doc.page_count):
+            page = doc.load_page(page_index)
+            text = page.get_text("text", flags=TEXT_FLAGS, sort=sort)
+            page = None
+            yield page_index + 1, text
+    finally:
+        doc.close()
+
+
+def extract_text(input_path: str, output_path: str = None, sort: bool = False):
+    """
+    Write the text of every page to a UTF-8 .txt file, pages separated by
+    PAGE_SEPARATOR. Returns the number of pages written.
+    """
+    if output_path is None:
+        base_name, _ = os.path.splitext(os.path.abspath(input_path))
+        output_path = base_name + ".txt"
+
+    pages = 0
+    with phase("tool"):
+        with open(output_path, "w", encoding="utf-8") as out:
+            for page_number, text in iter_page_text(input_path, sort=sort):
+                if page_number > 1:
+                    out.write(PAGE_SEPARATOR)
+                out.write(text)
+                pages += 1
+
+    record_pages("extract_text", pages)
+    print(f"Created: {output_path} ({pages} pages)")
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract the text of a PDF, page by page, into a .txt file."
+    )
+    parser.add_argument("input", help="Input PDF file path")
+    parser.add_argument(
+        "-o", "--output",
+        help="Output text file path (default: <input>.txt in same folder)"
+    )
+    parser.add_argument(
+        "--sort", action="store_true",
+        help="Order text in reading order (better for multi-column pages)"
+    )
+    args = parser.parse_args()
+
+    extract_text(args.input, args.output, sort=args.sort)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,521 @@
+'''
+Hot-folder daemon: watches folders and runs each PDF dropped into them
+through a pipeline of the PDF tools, with no one at the keyboard.
+
+    python -m pdfapp.hot_folder hot_folders.json
+
+Config (JSON, relative paths are relative to the config file):
+
+    {
+        "poll_seconds": 1.0,
+        "settle_seconds": 2.0,
+        "workers": 4,
+        "journal": "hot_folder_journal.jsonl",
+        "folders": [
+            {
+                "name": "compress",
+                "watch": "Files/To compress",
+                "output": "Files/Compressed",
+                "pipeline": [{"tool": "compress", "level": 60}]
+            },
+            {
+                "name": "unlock",
+                "watch": "LockedPDFs",
+                "output": "UnlockedPDFs",
+                "after": "keep",
+                "pipeline": [
+                    {"tool": "unlock", "password": "commonPassword"},
+                    {"tool": "compress", "level": 30, "profile": "web"}
+                ]
+            }
+        ]
+    }
+
+Tools and their options (see STEPS):
+    compress   level (0-100, default 50), profile
+    unlock     password, profile
+    protect    user_password / owner_password, no_print, no_copy, no_annot, profile
+    extract    pages ('1-3,5'), profile
+    remove     pages ('2,4-6'), profile
+    split      spec ('5' or '1-2,3-4'), profile          -> folder of parts
+    images     zoom, image_format, quality, grayscale    -> folder of images
+The output of each step is the input of the next one; steps that produce
+a folder have to come last. `profile` is a pdf_writer output profile.
+
+How files move:
+  - A *.pdf in a watched folder is picked up once its size and modified
+    time have not changed for `settle_seconds` and it ends with %%EOF
+    (a file still being copied fails one of those). Hidden files and
+    sub-folders are ignored.
+  - Pipelines run on a pool of `workers` processes. Every step writes into
+    a hidden temp folder inside the output folder; the finished result is
+    renamed into place, so the output folder never shows a partial file.
+    Results keep the source file name (folders: the source name without
+    .pdf). If a worker process dies (killed, out of memory), the files
+    the pool was running are journaled as failed and a new pool is started.
+  - Each outcome is appended to the journal (one JSON line, fsync'd), keyed
+    by folder name and the SHA-256 of the file content. Content that was
+    processed successfully is never processed again, also after a restart,
+    and also when it is dropped in under another name. Content that failed
+    is tried again when it is dropped in again.
+  - With "after": "move" (the default) sources are then moved to
+    <watch>/processed/ or <watch>/failed/. With "keep" they stay where
+    they are.
+
+Watched folders are polled (os.scandir), which also works on network
+shares where change notifications are not delivered.
+'''
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import signal
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from .compress_pdf_lossy import compress_pdf_lossy_with_level
+from .extract_pages import extract_pages
+from .password_protect import password_protect
+from .pdf_2_img import pdf_to_images
+from .pdf_writer import get_profile
+from .remove_pages import remove_pages
+from .split_pdf import split_pdf
+from .unlock_password import unlock_pdf
+
+
+logger = logging.getLogger("toolverse.hot_folder")
+
+DEFAULT_POLL_SECONDS = 1.0
+DEFAULT_SETTLE_SECONDS = 2.0
+
+# A stable file without %%EOF near its end is processed anyway after this
+# many settle periods (the tool then decides whether it is a usable PDF).
+MAX_SETTLE_PERIODS = 15
+
+PROCESSED_DIR = "processed"
+FAILED_DIR = "failed"
+TEMP_PREFIX = ".hot_folder_"
+
+_HASH_CHUNK = 1024 * 1024
+
+
+# ---------- Pipeline steps ----------
+# step(input_path, output_path, options); output_path is a file, or an
+# existing empty folder for steps that produce several files.
+
+def _step_compress(src, dst, opts):
+    compress_pdf_lossy_with_level(src, dst, level=int(opts.get("level", 50)),
+                                  profile=opts.get("profile"))
+
+
+def _step_unlock(src, dst, opts):
+    unlock_pdf(src, opts["password"], dst, profile=opts.get("profile"))
+
+
+def _step_protect(src, dst, opts):
+    password_protect(src, dst,
+                     user_pwd=opts.get("user_password"),
+                     owner_pwd=opts.get("owner_password"),
+                     no_print=bool(opts.get("no_print")),
+                     no_copy=bool(opts.get("no_copy")),
+                     no_annot=bool(opts.get("no_annot")),
+                     profile=opts.get("profile"))
+
+
+def _step_extract(src, dst, opts):
+    extract_pages(src, opts["pages"], dst, profile=opts.get("profile"))
+
+
+def _step_remove(src, dst, opts):
+    remove_pages(src, opts["pages"], dst, profile=opts.get("profile"))
+
+
+def _step_split(src, dst, opts):
+    split_pdf(src, opts["spec"], dst, profile=opts.get("profile"))
+
+
+def _step_images(src, dst, opts):
+    pdf_to_images(src, output_folder=dst,
+                  zoom=float(opts.get("zoom", 2.0)),
+                  image_format=opts.get("image_format", "png"),
+                  quality=int(opts.get("quality", 85)),
+                  grayscale=bool(opts.get("grayscale")))
+
+
+# tool name -> (step, required options, writes a folder)
+STEPS = {
+    "compress": (_step_compress, (), False),
+    "unlock": (_step_unlock, ("password",), False),
+    "protect": (_step_protect, (), False),
+    "extract": (_step_extract, ("pages",), False),
+    "remove": (_step_remove, ("pages",), False),
+    "split": (_step_split, ("spec",), True),
+    "images": (_step_images, (), True),
+}
+
+
+def run_pipeline(source: str, output_dir: str, pipeline):
+    """
+    Run `pipeline` on `source` and move the result into `output_dir`.
+    Runs in a worker process. Returns the path of the published result.
+    """
+    source = Path(source)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Same file system as the output, so the final rename is atomic
+    with tempfile.TemporaryDirectory(prefix=TEMP_PREFIX, dir=output_dir) as work:
+        current = source
+        for index, opts in enumerate(pipeline):
+            step, _, writes_folder = STEPS[opts["tool"]]
+            result = Path(work) / f"step{index}_{opts['tool']}"
+            if writes_folder:
+                result.mkdir()
+            else:
+                result = result.with_suffix(".pdf")
+            step(str(current), str(result), opts)
+            current = result
+
+        if current.is_dir():
+            final = output_dir / source.stem
+            if final.exists():
+                # Directories can't be replaced in one rename: move the old
+                # result aside first and drop it once the new one is in place
+                old = Path(work) / "previous"
+                os.replace(final, old)
+            os.replace(current, final)
+        else:
+            final = output_dir / source.name
+            os.replace(current, final)
+    return str(final)
+
+
+def _init_worker():
+    # Ctrl+C / SIGTERM are handled by the daemon, which lets running
+    # pipelines finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+# ---------- Journal ----------
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Journal:
+    """
+    Append-only JSON-lines record of every processed file. Only files
+    that were processed successfully count as seen.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._seen = set()
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if entry.get("status") == "done":
+                        self._seen.add((entry["folder"], entry["sha256"]))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def __contains__(self, key):
+        return key in self._seen
+
+    def __len__(self):
+        return len(self._seen)
+
+    def record(self, entry: dict):
+        self._fh.write(json.dumps(entry) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        if entry.get("status") == "done":
+            self._seen.add((entry["folder"], entry["sha256"]))
+
+    def close(self):
+        self._fh.close()
+
+
+# ---------- Watcher ----------
+
+def _ends_with_eof(path) -> bool:
+    """
+    True if %%EOF appears in the last KB, False if not or if the file is
+    still locked by its writer (Windows).
+    """
+    try:
+        with open(path, "rb") as fh:
+            fh.seek(0, os.SEEK_END)
+            fh.seek(max(0, fh.tell() - 1024))
+            return b"%%EOF" in fh.read()
+    except OSError:
+        return False
+
+
+def _unique_path(folder: Path, name: str) -> Path:
+    path = folder / name
+    if not path.exists():
+        return path
+    stem, suffix = os.path.splitext(name)
+    return folder / f"{stem}_{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}{suffix}"
+
+
+class HotFolder:
+    """
+    One watched folder: finds settled PDFs and files them away afterwards.
+    """
+
+    def __init__(self, config: dict, base_dir: Path):
+        self.name = config["name"]
+        self.watch = (base_dir / config["watch"]).resolve()
+        self.output = (base_dir / config["output"]).resolve()
+        self.after = config.get("after", "move")
+        self.pipeline = config["pipeline"]
+        if self.after not in ("move", "keep"):
+            raise ValueError(f"[{self.name}] 'after' must be 'move' or 'keep'.")
+        if not self.pipeline:
+            raise ValueError(f"[{self.name}] The pipeline is empty.")
+        for index, opts in enumerate(self.pipeline):
+            if opts.get("tool") not in STEPS:
+                raise ValueError(f"[{self.name}] Unknown tool {opts.get('tool')!r}. "
+                                 f"Choose one of: {', '.join(STEPS)}.")
+            _, required, writes_folder = STEPS[opts["tool"]]
+            missing = [key for key in required if key not in opts]
+            if missing:
+                raise ValueError(f"[{self.name}] Tool '{opts['tool']}' needs: {', '.join(missing)}.")
+            if "profile" in opts:
+                get_profile(opts["profile"])
+            if writes_folder and index != len(self.pipeline) - 1:
+                raise ValueError(f"[{self.name}] Tool '{opts['tool']}' writes a folder "
+                                 f"and has to be the last step.")
+        self._pending = {}  # path -> (size, mtime_ns, stable since)
+        self._done = {}  # path -> (size, mtime_ns) already handled ('keep' mode)
+
+    def prepare(self):
+        self.watch.mkdir(parents=True, exist_ok=True)
+        self.output.mkdir(parents=True, exist_ok=True)
+        # Temp folders left behind by a crash or a kill
+        for stale in self.output.glob(TEMP_PREFIX + "*"):
+            shutil.rmtree(stale, ignore_errors=True)
+
+    def settled_files(self, settle_seconds: float):
+        """
+        Return the PDFs that have not changed for `settle_seconds` and look
+        complete. Each one is returned once, until it changes again.
+        """
+        now = time.monotonic()
+        seen = set()
+        ready = []
+        with os.scandir(self.watch) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.name.lower().endswith(".pdf"):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue  # removed while scanning
+                path = entry.path
+                seen.add(path)
+                state = (st.st_size, st.st_mtime_ns)
+                if self._done.get(path) == state:
+                    continue
+                pending = self._pending.get(path)
+                if pending is None or pending[:2] != state:
+                    self._pending[path] = (*state, now)
+                    continue
+                waited = now - pending[2]
+                if waited < settle_seconds:
+                    continue
+                if not _ends_with_eof(path) and waited < settle_seconds * MAX_SETTLE_PERIODS:
+                    continue
+                del self._pending[path]
+                ready.append(path)
+        for path in list(self._pending):
+            if path not in seen:
+                del self._pending[path]
+        for path in list(self._done):
+            if path not in seen:
+                del self._done[path]
+        return ready
+
+    def file_away(self, path: str, ok: bool):
+        """
+        Move a handled source to processed/ or failed/ ('move'), or
+        remember it so it is not picked up again ('keep').
+        """
+        if self.after == "keep":
+            try:
+                st = os.stat(path)
+                self._done[path] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                pass
+            return
+        folder = self.watch / (PROCESSED_DIR if ok else FAILED_DIR)
+        folder.mkdir(exist_ok=True)
+        try:
+            os.replace(path, _unique_path(folder, os.path.basename(path)))
+        except OSError as e:
+            logger.warning("[%s] Could not move %s: %s", self.name, path, e)
+
+
+def load_config(config_path):
+    config_path = Path(config_path).resolve()
+    with open(config_path, encoding="utf-8") as fh:
+        config = json.load(fh)
+    base_dir = config_path.parent
+    folders = [HotFolder(f, base_dir) for f in config.get("folders", [])]
+    if not folders:
+        raise ValueError("No folders configured.")
+    names = [f.name for f in folders]
+    if len(set(names)) != len(names):
+        raise ValueError("Folder names must be unique (they key the journal).")
+    return {
+        "poll_seconds": float(config.get("poll_seconds", DEFAULT_POLL_SECONDS)),
+        "settle_seconds": float(config.get("settle_seconds", DEFAULT_SETTLE_SECONDS)),
+        "workers": int(config.get("workers", min(4, os.cpu_count() or 1))),
+        "journal": base_dir / config.get("journal", "hot_folder_journal.jsonl"),
+        "folders": folders,
+    }
+
+
+def run(config: dict, stop=None):
+    """
+    Watch the configured folders until `stop()` returns True (or forever).
+    """
+    folders = config["folders"]
+    for folder in folders:
+        folder.prepare()
+        logger.info("[%s] %s -> %s (%s)", folder.name, folder.watch, folder.output,
+                    " | ".join(step["tool"] for step in folder.pipeline))
+
+    journal = Journal(config["journal"])
+    logger.info("Journal %s: %d files already processed", journal.path, len(journal))
+
+    in_flight = {}  # future -> (folder, path, sha256, size, started)
+    busy = set()
+
+    def finish(future):
+        folder, path, sha256, size, started = in_flight.pop(future)
+        wait([future])
+        _finish(journal, folder, path, sha256, size, started, future)
+        busy.discard(path)
+
+    pool = _new_pool(config["workers"])
+    try:
+        while not (stop and stop()):
+            broken = False
+            for folder in folders:
+                for path in folder.settled_files(config["settle_seconds"]):
+                    if path in busy:
+                        continue
+                    try:
+                        sha256 = file_sha256(path)
+                        size = os.path.getsize(path)
+                    except OSError:
+                        continue  # moved away in the meantime
+                    if (folder.name, sha256) in journal:
+                        logger.info("[%s] Already processed, skipping: %s", folder.name, path)
+                        folder.file_away(path, ok=True)
+                        continue
+                    try:
+                        future = pool.submit(run_pipeline, path, str(folder.output), folder.pipeline)
+                    except BrokenProcessPool:
+                        broken = True  # picked up again by the new pool
+                        break
+                    in_flight[future] = (folder, path, sha256, size, time.monotonic())
+                    busy.add(path)
+                if broken:
+                    break
+
+            if in_flight:
+                finished, _ = wait(in_flight, timeout=config["poll_seconds"],
+                                   return_when=FIRST_COMPLETED)
+                for future in finished:
+                    broken = broken or isinstance(future.exception(), BrokenProcessPool)
+                    finish(future)
+            elif not broken:
+                time.sleep(config["poll_seconds"])
+
+            if broken:
+                # A dead worker breaks the whole pool: every file it was
+                # running has failed, and every later submit would too
+                logger.error("A worker process died; starting a new pool")
+                for future in list(in_flight):
+                    finish(future)
+                pool.shutdown()
+                pool = _new_pool(config["workers"])
+
+        # Stopping: let running pipelines finish and journal them
+        for future in list(in_flight):
+            finish(future)
+    finally:
+        pool.shutdown()
+        journal.close()
+
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+
+def _finish(journal, folder, path, sha256, size, started, future):
+    seconds = round(time.monotonic() - started, 3)
+    entry = {
+        "folder": folder.name,
+        "sha256": sha256,
+        "source": path,
+        "size": size,
+        "seconds": seconds,
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        entry["output"] = future.result()
+        entry["status"] = "done"
+        logger.info("[%s] %s -> %s (%.1fs)", folder.name, path, entry["output"], seconds)
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = f"{type(e).__name__}: {e}"
+        logger.error("[%s] %s failed: %s", folder.name, path, entry["error"])
+    journal.record(entry)
+    folder.file_away(path, ok=entry["status"] == "done")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Watch folders and run every PDF dropped into them through the PDF tools."
+    )
+    parser.add_argument("config", help="JSON config file (see the top of hot_folder.py)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    config = load_config(args.config)
+
+    stopping = []
+
+    def request_stop(signum, frame):
+        logger.info("Stopping after the running pipelines finish...")
+        stopping.append(signum)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    run(config, stop=lambda: bool(stopping))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+# python -m pdfapp.images_to_pdf photos\*.jpg -o album.pdf --page-size a4 --margin 20
+
+from pathlib import Path
+import argparse
+import os
+import struct
+import zlib
+
+import fitz  # PyMuPDF
+
+from .metrics import phase, record_pages
+from .pdf_writer import save_pdf
+
+
+# Resolution assumed for images that don't record one (page size = pixels
+# at this dpi)
+DEFAULT_DPI = 96
+
+# zlib level for the pixels of images MuPDF decodes (TIFF, BMP, ...)
+FLATE_LEVEL = 6
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".jpe", ".png", ".tif", ".tiff", ".bmp", ".gif",
+                  ".webp", ".jxr", ".pnm", ".pgm", ".ppm", ".pbm", ".pam"}
+
+# JPEG start-of-frame markers (not DHT C4, JPG C8 or DAC CC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# EXIF orientation -> counter-clockwise rotation of the image on the page.
+# Mirrored orientations (2, 4, 5, 7) are placed without the mirroring.
+_EXIF_ROTATION = {3: 180, 4: 180, 5: 270, 6: 270, 7: 90, 8: 90}
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG colour type -> (colours per pixel, PDF colour space); types with an
+# alpha channel (4, 6) are decoded by MuPDF instead
+_PNG_COLOURS = {0: (1, "/DeviceGray"), 2: (3, "/DeviceRGB"), 3: (1, None)}
+
+_DEVICE_SPACES = {1: "/DeviceGray", 3: "/DeviceRGB", 4: "/DeviceCMYK"}
+
+
+def _exif_orientation(tiff: bytes) -> int:
+    """
+    Orientation tag (0x0112) of IFD0 of an EXIF block, 1 if missing.
+    """
+    if tiff[:2] == b"II":
+        order = "<"
+    elif tiff[:2] == b"MM":
+        order = ">"
+    else:
+        return 1
+    try:
+        (ifd,) = struct.unpack_from(order + "I", tiff, 4)
+        (count,) = struct.unpack_from(order + "H", tiff, ifd)
+        for i in range(count):
+            tag, _type, _n, value = struct.unpack_from(order + "HHIH", tiff, ifd + 2 + 12 * i)
+            if tag == 0x0112:
+                return value
+    except struct.error:
+        pass
+    return 1
+
+
+def _jpeg_info(data: bytes):
+    """
+    Header fields of a JPEG (width, height, components, bpc, dpi,
+    orientation, adobe), read without decoding it; None if the headers
+    can't be read. dpi is None when the file doesn't record one.
+    """
+    if data[:2] != b"\xff\xd8":
+        return None
+    info = {"dpi": None, "orientation": 1, "adobe": False}
+    pos = 2
+    try:
+        while pos + 4 <= len(data):
+            if data[pos] != 0xFF:
+                return None
+            marker = data[pos + 1]
+            if marker == 0xFF:  # fill byte
+                pos += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # no length
+                pos += 2
+                continue
+            (length,) = struct.unpack_from(">H", data, pos + 2)
+            segment = data[pos + 4:pos + 2 + length]
+            if marker == 0xE0 and segment[:5] == b"JFIF\0":
+                units = segment[7]
+                x_density, y_density = struct.unpack_from(">HH", segment, 8)
+                if units in (1, 2) and x_density and y_density:
+                    scale = 2.54 if units == 2 else 1  # dots per cm
+                    info["dpi"] = (x_density * scale, y_density * scale)
+            elif marker == 0xE1 and segment[:6] == b"Exif\0\0":
+                info["orientation"] = _exif_orientation(segment[6:])
+            elif marker == 0xEE and segment[:5] == b"Adobe":
+                info["adobe"] = True
+            elif marker in _JPEG_SOF:
+                info["bpc"] = segment[0]
+                info["height"], info["width"] = struct.unpack_from(">HH", segment, 1)
+                info["components"] = segment[5]
+                return info
+            pos += 2 + length
+    except (struct.error, IndexError):
+        pass
+    return None
+
+
+def _png_info(data: bytes):
+    """
+    Header fields of a PNG and its IDAT data; None if it isn't a readable
+    PNG.
+    """
+    if data[:8] != _PNG_SIGNATURE:
+        return None
+    info = {"dpi": None, "palette": None, "transparency": False, "idat": []}
+    pos = 8
+    try:
+        while pos + 8 <= len(data):
+            length, kind = struct.unpack_from(">I4s", data, pos)
+            body = data[pos + 8:pos + 8 + length]
+            if kind == b"IHDR":
+                (info["width"], info["height"], info["bpc"], info["colour_type"],
+                 _compression, _filter, info["interlace"]) = struct.unpack(">IIBBBBB", body)
+            elif kind == b"PLTE":
+                info["palette"] = body
+            elif kind == b"tRNS":
+                info["transparency"] = True
+            elif kind == b"pHYs":
+                x_ppu, y_ppu, unit = struct.unpack(">IIB", body)
+                if unit == 1 and x_ppu and y_ppu:  # pixels per metre
+                    info["dpi"] = (x_ppu * 0.0254, y_ppu * 0.0254)
+            elif kind == b"IDAT":
+                info["idat"].append(body)
+            elif kind == b"IEND":
+                break
+            pos += 12 + length
+    except struct.error:
+        return None
+    return info if "width" in info else None
+
+
+def _jpeg_passthrough(info) -> bool:
+    return info["bpc"] == 8 and info["components"] in _DEVICE_SPACES
+
+
+def _png_passthrough(info) -> bool:
+    """
+    True if the PNG's zlib data can be used as a FlateDecode stream with
+    the PNG predictors: no interlacing, no alpha and no transparency.
+    """
+    return (info["interlace"] == 0 and not info["transparency"]
+            and info["colour_type"] in _PNG_COLOURS
+            and (info["colour_type"] != 3 or info["palette"]))
+
+
+def page_size_points(page_size):
+    """
+    (width, height) in points of a paper name ('a4', 'letter', ... see
+    fitz.paper_size) or a (width, height) pair; None = size of each image.
+    Raises ValueError for unknown names.
+    """
+    if page_size is None:
+        return None
+    if isinstance(page_size, str):
+        width, height = fitz.paper_size(page_size)
+        if width < 0:
+            raise ValueError(f"Unknown page size '{page_size}'.")
+        return width, height
+    width, height = page_size
+    return float(width), float(height)
+
+
+def _layout(width: float, height: float, paper, margin: float):
+    """
+    Page size and image rectangle for an image of `width` x `height`
+    points: a page of the image's own size plus margins, or the image
+    fitted and centred on `paper`, turned to the image's orientation.
+    """
+    if paper is None:
+        page = fitz.Rect(0, 0, width + 2 * margin, height + 2 * margin)
+        return page, fitz.Rect(margin, margin, margin + width, margin + height)
+    paper_w, paper_h = paper
+    if (width > height) != (paper_w > paper_h):
+        paper_w, paper_h = paper_h, paper_w
+    page = fitz.Rect(0, 0, paper_w, paper_h)
+    box = page + (margin, margin, -margin, -margin)
+    if box.is_empty:
+        raise ValueError(f"Margin {margin} leaves no room on a {paper_w:g}x{paper_h:g} page.")
+    scale = min(box.width / width, box.height / height)
+    w, h = width * scale, height * scale
+    x0, y0 = box.x0 + (box.width - w) / 2, box.y0 + (box.height - h) / 2
+    return page, fitz.Rect(x0, y0, x0 + w, y0 + h)
+
+
+def _points(pixels: int, dpi) -> float:
+    return pixels * 72 / (dpi or DEFAULT_DPI)
+
+
+def _placement(page, rect, rotate: int) -> str:
+    """
+    'cm' operands mapping the image's unit square onto `rect` (top-down
+    page coordinates), turned `rotate` degrees counter-clockwise.
+    """
+    w, h = rect.width, rect.height
+    x0, y0 = rect.x0, page.height - rect.y1  # PDF y axis points up
+    a, b, c, d, e, f = {
+        0: (w, 0, 0, h, x0, y0),
+        90: (0, h, -w, 0, x0 + w, y0),
+        180: (-w, 0, 0, -h, x0 + w, y0 + h),
+        270: (0, -h, w, 0, x0, y0 + h),
+    }[rotate]
+    return " ".join(f"{v:.4f}".rstrip("0").rstrip(".") for v in (a, b, c, d, e, f))
+
+
+class _PdfFile:
+    """
+    A PDF written to disk object by object: each image and its page go to
+    the file as they are added, and only the objects' offsets stay in
+    memory. The page tree, catalog and cross-reference table are written
+    by close().
+    """
+
+    # Objects 1 and 2, written last
+    CATALOG, PAGES = 1, 2
+
+    def __init__(self, path):
+        self._f = open(path, "wb")
+        self._f.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        self._offsets = [None, None]
+        self._pages = []
+
+    def _reserve(self) -> int:
+        self._offsets.append(None)
+        return len(self._offsets)
+
+    def _write(self, num: int, obj: str, stream: bytes = None):
+        self._offsets[num - 1] = self._f.tell()
+        self._f.write(f"{num} 0 obj\n{obj}".encode("latin-1"))
+        if stream is not None:
+            self._f.write(b"\nstream\n")
+            self._f.write(stream)
+            self._f.write(b"\nendstream")
+        self._f.write(b"\nendobj\n")
+
+    def add_image(self, data: bytes, **keys) -> int:
+        """
+        Write an image XObject whose (already encoded) stream is `data`;
+        `keys` are its dictionary entries as PDF syntax. Returns its
+        object number.
+        """
+        num = self._reserve()
+        entries = "".join(f"/{key} {value}" for key, value in keys.items())
+        self._write(num, f"<</Type/XObject/Subtype/Image{entries}/Length {len(data)}>>", data)
+        return num
+
+    def add_page(self, page, image: int, rect, rotate: int = 0):
+        """
+        Write a page of size `page` showing the image object `image` in
+        `rect`.
+        """
+        content = f"q {_placement(page, rect, rotate)} cm /Im0 Do Q".encode("latin-1")
+        content_num, page_num = self._reserve(), self._reserve()
+        self._write(content_num, f"<</Length {len(content)}>>", content)
+        self._write(page_num,
+                    f"<</Type/Page/Parent {self.PAGES} 0 R"
+                    f"/MediaBox[0 0 {page.width:.4f} {page.height:.4f}]"
+                    f"/Resources<</XObject<</Im0 {image} 0 R>>>>/Contents {content_num} 0 R>>")
+        self._pages.append(page_num)
+
+    def close(self):
+        kids = " ".join(f"{num} 0 R" for num in self._pages)
+        self._write(self.PAGES, f"<</Type/Pages/Count {len(self._pages)}/Kids[{kids}]>>")
+        self._write(self.CATALOG, f"<</Type/Catalog/Pages {self.PAGES} 0 R>>")
+        xref = self._f.tell()
+        lines = [f"xref\n0 {len(self._offsets) + 1}\n", "0000000000 65535 f \n"]
+        lines.extend(f"{offset:010d} 00000 n \n" for offset in self._offsets)
+        lines.append(f"trailer\n<</Size {len(self._offsets) + 1}/Root {self.CATALOG} 0 R>>\n"
+                     f"startxref\n{xref}\n%%EOF\n")
+        self._f.write("".join(lines).encode("latin-1"))
+        self._f.close()
+
+    def abort(self):
+        self._f.close()
+
+
+def _add_jpeg(pdf, data: bytes, info, paper, margin: float):
+    """
+    The JPEG file itself is the image's DCTDecode stream.
+    """
+    width, height, dpi = info["width"], info["height"], info["dpi"]
+    rotate = _EXIF_ROTATION.get(info["orientation"], 0)
+    keys = {"Width": width, "Height": height, "BitsPerComponent": 8,
+            "ColorSpace": _DEVICE_SPACES[info["components"]], "Filter": "/DCTDecode"}
+    if info["components"] == 4 and info["adobe"]:
+        keys["Decode"] = "[1 0 1 0 1 0 1 0]"  # Adobe writes CMYK inverted
+    image = pdf.add_image(data, **keys)
+    if rotate in (90, 270):
+        width, height = height, width
+        dpi = dpi and (dpi[1], dpi[0])
+    page, rect = _layout(_points(width, dpi and dpi[0]), _points(height, dpi and dpi[1]),
+                         paper, margin)
+    pdf.add_page(page, image, rect, rotate)
+
+
+def _add_png(pdf, info, paper, margin: float):
+    """
+    The PNG's IDAT data is the image's FlateDecode stream: PDF has the
+    same (PNG) predictors, so nothing is decoded or recompressed.
+    """
+    colours, colour_space = _PNG_COLOURS[info["colour_type"]]
+    if colour_space is None:
+        palette = info["palette"]
+        colour_space = f"[/Indexed/DeviceRGB {len(palette) // 3 - 1}<{palette.hex()}>]"
+    image = pdf.add_image(
+        b"".join(info["idat"]), Width=info["width"], Height=info["height"],
+        BitsPerComponent=info["bpc"], ColorSpace=colour_space, Filter="/FlateDecode",
+        DecodeParms=f"<</Predictor 15/Colors {colours}/BitsPerComponent {info['bpc']}"
+                    f"/Columns {info['width']}>>",
+    )
+    dpi = info["dpi"]
+    page, rect = _layout(_points(info["width"], dpi and dpi[0]),
+                         _points(info["height"], dpi and dpi[1]), paper, margin)
+    pdf.add_page(page, image, rect)
+
+
+def _add_decoded(pdf, data: bytes, path: Path, paper, margin: float):
+    """
+    Formats PDF can't hold as they are (TIFF, BMP, GIF, PNG with alpha,
+    ...): MuPDF decodes them, one page per frame, and the pixels are
+    deflated. Transparency becomes a soft mask.
+    """
+    try:
+        frames = fitz.open(stream=data, filetype=path.suffix.lstrip(".") or None)
+    except Exception as e:
+        raise ValueError(f"'{path.name}' is not a readable image: {e}") from None
+    with frames:
+        if frames.is_pdf:
+            raise ValueError(f"'{path.name}' is not an image.")
+        # Pages of the image at its own resolution, the pixels unchanged
+        src = fitz.open("pdf", frames.convert_to_pdf())
+    with src:
+        for src_page in src:
+            xref, smask = src_page.get_images()[0][:2]
+            pix = fitz.Pixmap(src, xref)
+            if pix.colorspace is None or pix.colorspace.n not in _DEVICE_SPACES:
+                pix = fitz.Pixmap(fitz.csRGB, pix)
+            keys = {"Width": pix.width, "Height": pix.height, "BitsPerComponent": 8,
+                    "ColorSpace": _DEVICE_SPACES[pix.colorspace.n], "Filter": "/FlateDecode"}
+            mask = fitz.Pixmap(src, smask) if smask else None
+            # Some formats (BMP) always come with a mask, mostly fully opaque
+            if mask is not None and not (mask.is_unicolor and mask.pixel(0, 0)[0] == 255):
+                keys["SMask"] = "{} 0 R".format(pdf.add_image(
+                    zlib.compress(mask.samples, FLATE_LEVEL), Width=mask.width,
+                    Height=mask.height, BitsPerComponent=8, ColorSpace="/DeviceGray",
+                    Filter="/FlateDecode"))
+            image = pdf.add_image(zlib.compress(pix.samples, FLATE_LEVEL), **keys)
+            page, rect = _layout(src_page.rect.width, src_page.rect.height, paper, margin)
+            pdf.add_page(page, image, rect)
+
+
+def _add_image_file(pdf, path: Path, paper, margin: float):
+    """
+    Append the page(s) for one image file.
+    """
+    data = path.read_bytes()
+    jpeg = _jpeg_info(data)
+    if jpeg is not None and _jpeg_passthrough(jpeg):
+        _add_jpeg(pdf, data, jpeg, paper, margin)
+        return
+    png = _png_info(data)
+    if png is not None and _png_passthrough(png):
+        _add_png(pdf, png, paper, margin)
+        return
+    _add_decoded(pdf, data, path, paper, margin)
+
+
+def list_images(paths):
+    """
+    Image files of `paths` (files, or folders whose images are taken in
+    name order), in the order given.
+    """
+    images = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            images.extend(sorted(f for f in p.iterdir()
+                                 if f.is_file() and f.suffix.lower() in IMAGE_SUFFIXES))
+        else:
+            images.append(p)
+    return images
+
+
+def images_to_pdf(image_paths, output_path: str, page_size=None, margin: float = 0,
+                  profile=None, progress=None, cancel=None):
+    """
+    Combine images into one PDF, one page per image (per frame for
+    multi-page TIFFs and the like).
+
+    Args:
+        image_paths: Image files, in page order.
+        output_path (str): PDF to write.
+        page_size: None = each page is the size of its image (at the
+            image's dpi, DEFAULT_DPI if it has none); a paper name such as
+            'a4' or 'letter', or (width, height) in points = every image
+            is fitted and centred on a page of that size, turned to the
+            image's orientation.
+        margin (float): White border around each image, in points.
+        profile: Output profile (see pdf_writer.PROFILES); the written
+            file is then rewritten with it. None = the file as written,
+            which is already compact.
+        progress (callable): Optional callback(images_done, total_images).
+        cancel: Optional token (pdfapp.progress.CancelToken), looked at
+            before each image; cancel.check() raises once it is cancelled.
+            A run that fails or is cancelled removes the output.
+
+    JPEGs go into the PDF as they are (their file is the image stream: no
+    decoding, no quality loss, EXIF rotation applied on the page) and so
+    do the compressed pixels of PNGs without alpha. Each image and its page
+    are written to `output_path` as soon as they are read, so memory stays
+    flat however many images there are, and the time goes into reading
+    and writing the files.
+    """
+    images = [Path(p) for p in image_paths]
+    if not images:
+        raise ValueError("No images given.")
+    paper = page_size_points(page_size)
+    total = len(images)
+    record_pages("images_to_pdf", total)
+
+    if progress is not None:
+        progress(0, total)
+
+    pdf = _PdfFile(output_path)
+    try:
+        with phase("tool"):
+            for done, path in enumerate(images, start=1):
+                if cancel is not None:
+                    cancel.check()
+                _add_image_file(pdf, path, paper, margin)
+                if progress is not None:
+                    progress(done, total)
+            pdf.close()
+
+        if profile is not None:
+            with phase("save"):
+                tmp_path = f"{output_path}.tmp"
+                try:
+                    with fitz.open(output_path) as doc:
+                        save_pdf(doc, tmp_path, profile)
+                    os.replace(tmp_path, output_path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+    except BaseException:
+        pdf.abort()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    print(f"Created: {output_path} from {total} image(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Combine images (JPEG, PNG, TIFF, ...) into one PDF, one page per image."
+    )
+    parser.add_argument("inputs", nargs="+",
+                        help="Image files, or folders (their images in name order)")
+    parser.add_argument("-o", "--output", required=True, help="Output PDF file path")
+    parser.add_argument(
+        "--page-size",
+        help="Fit every image on pages of this size, e.g. 'a4' or 'letter' "
+             "(default: each page is the size of its image)"
+    )
+    parser.add_argument("--margin", type=float, default=0,
+                        help="Border around each image, in points (default: 0)")
+    args = parser.parse_args()
+
+    images_to_pdf(list_images(args.inputs), args.output,
+                  page_size=args.page_size, margin=args.margin)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""
+Run tool calls in isolated, reusable child processes.
+
+A malformed PDF can make a tool (pdf2docx, image rewriting, ...) loop or
+grow without bound. In the Django worker that would take every other
+request down with it, so the views run tools through `run()` instead of
+calling them:
+
+    run(compress_pdf_lossy_with_level, input_path, output_path, level=50,
+        progress=report)
+
+Each call goes to a child process from a small pool (TOOL_WORKERS per
+server process) and is bounded three ways:
+
+- memory: the child's address space is capped at TOOL_MEMORY_LIMIT_MB, so
+  a runaway allocation fails with MemoryError instead of swapping the
+  host (the child is then replaced);
+- CPU: each call may use TOOL_CPU_LIMIT_SECONDS of CPU time, after which
+  the kernel stops the child (SIGXCPU);
+- wall clock: after TOOL_TIMEOUT_SECONDS the child and everything it
+  started are killed.
+
+A call that hits a limit raises a ToolFailed subclass (answered with a
+422 by ToolFailedMiddleware); the pool starts a fresh child for the next
+call. Exceptions raised by the tool itself (ValueError for a bad page
+spec, ...) are re-raised as they are, so the views handle them as before.
+
+Children are reused across calls: they fork from a server process that
+has already imported PyMuPDF and pdf2docx, so a call doesn't pay for the
+imports. Like the web workers (ToolVerse/gunicorn.conf.py), a child is
+replaced after TOOL_MAX_CALLS_PER_CHILD calls, or as soon as a call
+leaves it with more than TOOL_MAX_CHILD_RSS_MB resident, or with more
+than half of TOOL_MEMORY_LIMIT_MB of address space: the heap of a
+long-lived child only grows, and under the fixed address-space limit a
+small job would otherwise end up failing as if it needed the whole
+limit. Every call gets its own temporary directory as working and temp
+directory, removed when the call ends however it ends.
+
+`progress=` callbacks are forwarded from the child, and phases / page
+counts the tool records (pdfapp.metrics) are added to the request.
+
+`cancel=` takes a pdfapp.progress.CancelToken. Once it is cancelled, a
+tool that accepts a `cancel` argument is told so (SIGUSR1 sets the
+child's own token) and gets CANCEL_GRACE_SECONDS to stop at its next
+page; other tools, and tools that don't stop in time, are killed. Either
+way the call raises Cancelled.
+
+Limits are set with setrlimit, which only exists on Unix; elsewhere
+calls still run in a child with the wall-clock timeout.
+"""
+
+import atexit
+import multiprocessing
+import os
+import pickle
+import shutil
+import signal
+import inspect
+import tempfile
+import threading
+import time
+import traceback
+
+from django.conf import settings
+
+from . import metrics
+from .progress import CancelToken, Cancelled
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits
+    resource = None
+
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MEMORY_LIMIT_MB = 4096
+DEFAULT_CPU_LIMIT_SECONDS = 600
+DEFAULT_TIMEOUT_SECONDS = 900
+DEFAULT_MAX_CALLS_PER_CHILD = 100
+DEFAULT_MAX_CHILD_RSS_MB = 1024
+
+# A child whose address space passes this share of the memory limit is
+# replaced, so every call starts with at least the rest of the limit
+RECYCLE_ADDRESS_SPACE_SHARE = 0.5
+
+# Imported once by the fork server, shared by every child it starts;
+# missing optional ones are skipped
+PRELOAD_MODULES = ["fitz", "pdf2docx", "pikepdf", "numpy", "PIL.Image"]
+
+# How long a tool told to cancel may take to stop before it is killed
+CANCEL_GRACE_SECONDS = 10
+# How often a running call looks at its cancel token
+CANCEL_POLL_SECONDS = 0.25
+
+MB = 1024 * 1024
+
+
+class ToolFailed(RuntimeError):
+    """
+    A tool call was stopped by its child process crashing or by a limit.
+    """
+
+    status = 422
+
+
+class ToolTimedOut(ToolFailed):
+    pass
+
+
+class ToolLimitExceeded(ToolFailed):
+    pass
+
+
+class _RemoteTraceback(Exception):
+    def __init__(self, tb):
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
+
+
+def _settings_value(name, default):
+    return getattr(settings, name, default)
+
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    if "forkserver" in methods:
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(PRELOAD_MODULES)
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _picklable(error):
+    """
+    `error`, or a RuntimeError with its message if it can't make the trip
+    back to the parent (not every library exception pickles).
+    """
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(str(error) or type(error).__name__)
+
+
+def _accepts_cancel(func):
+    try:
+        return "cancel" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _set_cpu_limit(seconds):
+    """
+    Allow `seconds` more CPU time from now. RLIMIT_CPU counts the
+    process's whole life, so a reused child moves it forward every call.
+    """
+    if resource is None or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + 1 + seconds
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+# Child side: the CancelToken of the running call, set by SIGUSR1
+_cancel_token = None
+
+
+def _cancel_running_call(signum, frame):
+    if _cancel_token is not None:
+        _cancel_token.cancel()
+
+
+def _child_main(conn, memory_limit_mb, cpu_limit_seconds):
+    """
+    Child side: run the calls sent over `conn` until the parent closes it.
+    """
+    global _cancel_token
+    if hasattr(os, "setsid"):
+        # Own process group, so a timeout kills the tool's own workers too
+        os.setsid()
+    if resource is not None:
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if memory_limit_mb:
+            limit = memory_limit_mb * MB
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, _cancel_running_call)
+    home, home_tmpdir = os.getcwd(), os.environ.get("TMPDIR")
+
+    while True:
+        try:
+            func, args, kwargs, workspace, with_progress, with_cancel = conn.recv()
+        except (EOFError, OSError):
+            return
+        if with_progress:
+            kwargs["progress"] = lambda *a: conn.send(("progress", a))
+        if with_cancel:
+            _cancel_token = kwargs["cancel"] = CancelToken()
+
+        os.chdir(workspace)
+        os.environ["TMPDIR"] = workspace
+        tempfile.tempdir = workspace
+        _set_cpu_limit(cpu_limit_seconds)
+        timing, metrics_token = metrics.start_request("TOOL", getattr(func, "__name__", "tool"))
+        out_of_memory = False
+        try:
+            message = ("ok", func(*args, **kwargs))
+        except MemoryError:
+            out_of_memory = True
+            message = ("error", ToolLimitExceeded(
+                f"Processing needed more than {memory_limit_mb} MB of memory and was stopped."))
+        except Exception as e:
+            message = ("error", _picklable(e), traceback.format_exc())
+        finally:
+            _cancel_token = None
+            metrics.end_request(metrics_token)
+            os.chdir(home)
+            if home_tmpdir is None:
+                os.environ.pop("TMPDIR", None)
+            else:
+                os.environ["TMPDIR"] = home_tmpdir
+            tempfile.tempdir = None
+
+        try:
+            conn.send(message + (timing.phases, timing.pages))
+        except Exception as e:  # the result doesn't pickle
+            conn.send(("error", RuntimeError(f"Tool result could not be returned: {e}"),
+                       timing.phases, timing.pages))
+        if out_of_memory:
+            return  # the heap may be in any state: let a fresh child take over
+
+
+class _Child:
+    """
+    One child process and the parent's end of its pipe.
+    """
+
+    def __init__(self, ctx, memory_limit_mb, cpu_limit_seconds):
+        self.conn, child_conn = ctx.Pipe()
+        # Not a daemon: tools start process pools of their own
+        self.process = ctx.Process(target=_child_main, name="toolverse-tool",
+                                   args=(child_conn, memory_limit_mb, cpu_limit_seconds))
+        self.process.start()
+        child_conn.close()
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_seconds = cpu_limit_seconds
+        self.reusable = True
+        self.calls = 0
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def memory_usage(self):
+        """
+        (address space, resident) bytes of the child, or None where
+        /proc isn't available.
+        """
+        try:
+            with open(f"/proc/{self.process.pid}/statm") as f:
+                size, resident = f.read().split()[:2]
+            page = os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            return None
+        return int(size) * page, int(resident) * page
+
+    def call(self, func, args, kwargs, progress, timeout, cancel):
+        """
+        Run one call; returns its result or raises. Raises ToolFailed or
+        Cancelled (and leaves the child dead) when the child died or was
+        killed.
+        """
+        cooperative = (cancel is not None and _accepts_cancel(func)
+                       and hasattr(signal, "SIGUSR1"))
+        workspace = tempfile.mkdtemp(prefix="tool_")
+        answered = False
+        self.calls += 1
+        try:
+            self.conn.send((func, args, kwargs, workspace, progress is not None, cooperative))
+            deadline = time.monotonic() + timeout if timeout else None
+            stop_deadline = None
+            while True:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    self.kill()
+                    raise ToolTimedOut(f"Processing took longer than {timeout:g} seconds "
+                                       f"and was stopped.")
+                if cancel is not None and cancel.cancelled:
+                    if stop_deadline is None:
+                        stop_deadline = now + (CANCEL_GRACE_SECONDS if cooperative else 0)
+                    if now >= stop_deadline:
+                        self.kill()
+                        raise Cancelled("Job cancelled.")
+                    # Every poll: a signal that arrives before the child
+                    # has set up the call's token is lost
+                    os.kill(self.process.pid, signal.SIGUSR1)
+
+                waits = [CANCEL_POLL_SECONDS] if cancel is not None else []
+                if deadline is not None:
+                    waits.append(deadline - now)
+                if not self.conn.poll(min(waits) if waits else None):
+                    continue
+                try:
+                    kind, payload, *rest = self.conn.recv()
+                except (EOFError, OSError):
+                    self.reusable = False
+                    raise self._death_error() from None
+                if kind == "progress":
+                    progress(*payload)
+                    continue
+
+                answered = True
+                *tb, phases, pages = rest
+                for name, seconds in phases:
+                    metrics.record_phase(name, seconds)
+                for tool, count in pages.items():
+                    metrics.record_pages(tool, count)
+                if kind == "ok":
+                    return payload
+                if isinstance(payload, ToolLimitExceeded):
+                    self.reusable = False  # the child exits after a MemoryError
+                if tb:
+                    payload.__cause__ = _RemoteTraceback(tb[0])
+                raise payload
+        finally:
+            if not answered and self.alive():
+                # Interrupted mid-call (e.g. the progress callback raised):
+                # the child is still busy, so it can't be reused
+                self.kill()
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    def _death_error(self):
+        self.process.join(5)
+        code = self.process.exitcode
+        if code == -getattr(signal, "SIGXCPU", -1):
+            return ToolLimitExceeded(f"Processing used more than {self.cpu_limit_seconds} "
+                                     f"seconds of CPU time and was stopped.")
+        if code == -getattr(signal, "SIGKILL", -1):
+            return ToolLimitExceeded("Processing was killed, most likely for using too much memory.")
+        return ToolFailed(f"Processing failed: the tool crashed (exit code {code}).")
+
+    def kill(self):
+        self.reusable = False
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):  # no process groups, or already gone
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+    def close(self):
+        """
+        Ask the child to exit (end of input), killing it if it doesn't.
+        """
+        self.conn.close()
+        self.process.join(2)
+        if self.process.is_alive():
+            self.kill()
+
+
+class IsolatedPool:
+    """
+    Up to `workers` children, started on demand and reused until they are
+    worn out (see _worn_out).
+    """
+
+    def __init__(self, workers, memory_limit_mb, cpu_limit_seconds, timeout,
+                 max_calls_per_child=0, max_child_rss_mb=0):
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_seconds = cpu_limit_seconds
+        self.timeout = timeout
+        self.max_calls_per_child = max_calls_per_child
+        self.max_child_rss_mb = max_child_rss_mb
+        self._ctx = _context()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _take(self):
+        with self._lock:
+            while self._idle:
+                child = self._idle.pop()
+                if child.alive():
+                    return child
+        return _Child(self._ctx, self.memory_limit_mb, self.cpu_limit_seconds)
+
+    def _worn_out(self, child):
+        """
+        True if `child` has run its share of calls or grown too big to be
+        given another one. 0 disables a limit.
+        """
+        if self.max_calls_per_child and child.calls >= self.max_calls_per_child:
+            return True
+        usage = child.memory_usage()
+        if usage is None:
+            return False
+        size, resident = usage
+        if self.max_child_rss_mb and resident > self.max_child_rss_mb * MB:
+            return True
+        return bool(self.memory_limit_mb
+                    and size > self.memory_limit_mb * MB * RECYCLE_ADDRESS_SPACE_SHARE)
+
+    def run(self, func, *args, timeout=None, cancel=None, **kwargs):
+        progress = kwargs.pop("progress", None)
+        timeout = self.timeout if timeout is None else timeout
+        with self._slots:
+            if cancel is not None:
+                cancel.check()  # cancelled while waiting for a child
+            child = self._take()
+            try:
+                return child.call(func, args, kwargs, progress, timeout, cancel)
+            finally:
+                if child.reusable and child.alive():
+                    if self._worn_out(child):
+                        child.close()
+                    else:
+                        with self._lock:
+                            self._idle.append(child)
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for child in idle:
+            child.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = IsolatedPool(
+                workers=_settings_value("TOOL_WORKERS", DEFAULT_WORKERS),
+                memory_limit_mb=_settings_value("TOOL_MEMORY_LIMIT_MB", DEFAULT_MEMORY_LIMIT_MB),
+                cpu_limit_seconds=_settings_value("TOOL_CPU_LIMIT_SECONDS", DEFAULT_CPU_LIMIT_SECONDS),
+                timeout=_settings_value("TOOL_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS),
+                max_calls_per_child=_settings_value("TOOL_MAX_CALLS_PER_CHILD",
+                                                    DEFAULT_MAX_CALLS_PER_CHILD),
+                max_child_rss_mb=_settings_value("TOOL_MAX_CHILD_RSS_MB", DEFAULT_MAX_CHILD_RSS_MB),
+            )
+            # Before multiprocessing's own exit handler, which would wait
+            # for the (non-daemon) children forever
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def run(func, *args, timeout=None, cancel=None, **kwargs):
+    """
+    Call `func(*args, **kwargs)` in a child process and return its result.
+
+    `func`, the arguments and the result must pickle (tool functions and
+    paths do). `timeout` overrides TOOL_TIMEOUT_SECONDS for this call.
+    Raises ToolFailed if the call is stopped by a limit or the child dies,
+    Cancelled if `cancel` (a CancelToken) is cancelled.
+    """
+    return _get_pool().run(func, *args, timeout=timeout, cancel=cancel, **kwargs)
@@ -1,5 +1,132 @@
-from PyPDF2 import PdfMerger
 from pathlib import Path
+import hashlib
+import re
+
+import fitz  # PyMuPDF
+
+from .metrics import phase, record_pages
+from .pdf_writer import save_pdf
+
+
+# Objects that must stay distinct even when byte-identical: page tree
+# nodes, the catalog, and anything pointing back to a parent or a page.
+_NO_DEDUPE_RE = re.compile(r"/Type\s*/(Page|Pages|Catalog|Annot)\b|/Parent\s|/P\s+\d+\s+0\s+R")
+_REF_RE = re.compile(r"\b(\d+) 0 R\b")
+
+
+def dedupe_objects(doc):
+    """
+    Point identical objects at one shared copy, across all merged inputs.
+
+    Objects are keyed by a SHA-256 of their source (with references already
+    rewritten to their canonical copy) plus their raw stream bytes. Repeating
+    this until nothing changes collapses whole trees: identical font files
+    make their descriptors identical, which make the fonts identical, and
+    so on up to the /Resources dicts. Returns the number of objects dropped;
+    the duplicates become unreferenced and are removed by garbage collection
+    on save.
+    """
+    sources = {}
+    stream_digests = {}
+    for xref in range(1, doc.xref_length()):
+        try:
+            source = doc.xref_object(xref, compressed=True)
+        except Exception:  # free / broken xref entry
+            continue
+        if source == "null" or _NO_DEDUPE_RE.search(source):
+            continue
+        sources[xref] = source
+        if doc.xref_is_stream(xref):
+            stream_digests[xref] = hashlib.sha256(doc.xref_stream_raw(xref) or b"").digest()
+
+    canonical = {}
+
+    def canon_ref(match):
+        return f"{canonical.get(int(match.group(1)), int(match.group(1)))} 0 R"
+
+    changed = True
+    while changed:
+        changed = False
+        seen = {}
+        for xref, source in sources.items():
+            if xref in canonical:
+                continue
+            h = hashlib.sha256(_REF_RE.sub(canon_ref, source).encode("latin-1", "replace"))
+            h.update(stream_digests.get(xref, b"-"))
+            key = h.digest()
+            if key in seen:
+                canonical[xref] = seen[key]
+                changed = True
+            else:
+                seen[key] = xref
+
+    if not canonical:
+        return 0
+
+    # Rewrite every object (pages included) that references a duplicate.
+    for xref in range(1, doc.xref_length()):
+        if xref in canonical:
+            continue
+        try:
+            source = doc.xref_object(xref, compressed=True)
+        except Exception:
+            continue
+        if not any(int(ref) in canonical for ref in _REF_RE.findall(source)):
+            continue
+        doc.update_object(xref, _REF_RE.sub(canon_ref, source))
+
+    return len(canonical)
+
+
+def merge_pdf_list(pdf_paths, output_path: str, dedupe: bool = True, profile=None):
+    """
+    Merge any number of PDF files, in order, into one PDF.
+    Bookmarks of every input are kept (shifted to their new pages).
+
+    dedupe: share identical fonts, images and other objects between the
+            inputs (see dedupe_objects). Merging many forms made from the
+            same template then costs roughly one template plus the
+            per-page content.
+    profile: output profile, see pdf_writer.PROFILES (None = default).
+    """
+    pdf_paths = [Path(p) for p in pdf_paths]
+    output_path = Path(output_path)
+
+    missing = [str(p) for p in pdf_paths if not p.exists()]
+    if missing:
+        raise FileNotFoundError(f"PDF file(s) not found: {', '.join(missing)}")
+
+    merged = fitz.open()
+    toc = []
+    with phase("open"):
+        for pdf_path in pdf_paths:
+            with fitz.open(str(pdf_path)) as src:
+                offset = merged.page_count
+                merged.insert_pdf(src)
+                toc.extend([level, title, page + offset] for level, title, page in src.get_toc())
+    record_pages("merge_pdfs", merged.page_count)
+
+    # insert_pdf drops the annotations' /P (their page). Without it, the
+    # annotations of inputs made from one form are identical objects, and
+    # the duplicate search on save would put one of them on every page.
+    for page in merged:
+        for annot_xref, _type, _id in page.annot_xrefs():
+            merged.xref_set_key(annot_xref, "P", f"{page.xref} 0 R")
+
+    if toc:
+        merged.set_toc(toc)
+
+    with phase("tool"):
+        removed = dedupe_objects(merged) if dedupe else 0
+
+    with phase("save"):
+        # Garbage collection drops the now-unreferenced duplicates. MuPDF's
+        # own duplicate search (garbage >= 3) is pairwise, but after
+        # dedupe_objects() there is little left for it to compare.
+        save_pdf(merged, output_path, profile)
+    merged.close()
+
+    print(f"✅ Merged PDF saved at: {output_path} ({removed} duplicate object(s) shared)")
 
 
 def merge_pdfs(pdf1_path: str, pdf2_path: str, output_path: str):
@@ -8,18 +135,11 @@ def merge_pdfs(pdf1_path: str, pdf2_path: str, output_path: str):
     """
     pdf1_path = Path(pdf1_path)
     pdf2_path = Path(pdf2_path)
-    output_path = Path(output_path)
 
     if not pdf1_path.exists() or not pdf2_path.exists():
         raise FileNotFoundError("One or both PDF files were not found.")
 
-    merger = PdfMerger()
-    merger.append(str(pdf1_path))
-    merger.append(str(pdf2_path))
-    merger.write(str(output_path))
-    merger.close()
-
-    print(f"✅ Merged PDF saved at: {output_path}")
+    merge_pdf_list([pdf1_path, pdf2_path], output_path)
 
 
 def main():
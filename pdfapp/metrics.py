@@ -0,0 +1,248 @@
+"""
+In-process request / tool metrics with a Prometheus text endpoint.
+
+- RequestTimingMiddleware (pdfapp.middleware) opens a RequestTiming for
+  every request and closes it once the response has been sent.
+- Views and tools wrap their work in `phase("name")` to record how long
+  each step took (upload spooling, disk write, fitz.open, the tool, save,
+  ZIP building, response streaming).
+- `record_pages()` / `record_bytes_in()` / `record_bytes_out()` add sizes.
+- `metrics_view` serves everything as Prometheus histograms on /metrics,
+  to staff users and to the addresses in METRICS_ALLOWED_IPS (the
+  Prometheus server); anyone else gets a 403.
+
+The registry lives in process memory, so with several workers each one
+reports its own numbers; scrape every worker or run a single process.
+
+Importing this module needs Django installed, not configured, so the
+tools import it unconditionally, also from the command line
+(`python -m pdfapp.<tool>`); there nothing is scraped.
+"""
+
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+slow_logger = logging.getLogger("toolverse.slow")
+
+# Seconds
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Bytes: 1 KB .. 1 GB
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))
+# Pages
+PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, one series per label set.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "counts": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = sorted(self._series.items())
+            for key, series in items:
+                base = [f'{k}="{_escape(v)}"' for k, v in key]
+                for bound, count in zip(self.buckets, series["counts"]):
+                    labels = ",".join(base + [f'le="{bound}"'])
+                    lines.append(f"{self.name}_bucket{{{labels}}} {count}")
+                labels = ",".join(base + ['le="+Inf"'])
+                lines.append(f"{self.name}_bucket{{{labels}}} {series['count']}")
+                labels = ",".join(base)
+                lines.append(f"{self.name}_sum{{{labels}}} {series['sum']}")
+                lines.append(f"{self.name}_count{{{labels}}} {series['count']}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REQUEST_SECONDS = Histogram(
+    "toolverse_request_seconds",
+    "Total request time, including streaming the response.",
+    TIME_BUCKETS,
+)
+PHASE_SECONDS = Histogram(
+    "toolverse_phase_seconds",
+    "Time spent in one phase of a request (upload, open, tool, save, zip, ...).",
+    TIME_BUCKETS,
+)
+BYTES_IN = Histogram(
+    "toolverse_request_bytes_in",
+    "Uploaded bytes per request.",
+    SIZE_BUCKETS,
+)
+BYTES_OUT = Histogram(
+    "toolverse_response_bytes_out",
+    "Response body bytes per request.",
+    SIZE_BUCKETS,
+)
+TOOL_PAGES = Histogram(
+    "toolverse_tool_pages",
+    "Pages processed per tool call.",
+    PAGE_BUCKETS,
+)
+
+REGISTRY = [REQUEST_SECONDS, PHASE_SECONDS, BYTES_IN, BYTES_OUT, TOOL_PAGES]
+
+
+class RequestTiming:
+    """
+    Per-request collector: phase durations, byte counts and page counts.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.view = "unresolved"
+        self.started = time.perf_counter()
+        self.phases = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.pages = {}
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+        PHASE_SECONDS.observe(seconds, view=self.view, phase=name)
+
+    def finish(self, status: int):
+        total = time.perf_counter() - self.started
+        labels = {"view": self.view, "method": self.method, "status": str(status)}
+        REQUEST_SECONDS.observe(total, **labels)
+        if self.bytes_in:
+            BYTES_IN.observe(self.bytes_in, view=self.view)
+        BYTES_OUT.observe(self.bytes_out, view=self.view)
+        _maybe_log_slow(self, total, status)
+        return total
+
+
+_current = contextvars.ContextVar("toolverse_request_timing", default=None)
+
+
+def start_request(method: str, path: str):
+    """
+    Begin timing a request. Returns (timing, token) for `end_request`.
+    """
+    timing = RequestTiming(method, path)
+    return timing, _current.set(timing)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current():
+    """
+    The RequestTiming of the request being handled, or None (e.g. CLI use).
+    """
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Time a block and record it as `name` for the current request.
+    Outside of a request the duration is recorded under view="none".
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - t0)
+
+
+def record_phase(name: str, seconds: float):
+    """
+    Record a phase timed elsewhere (e.g. in a tool's child process, see
+    pdfapp.isolation) as if `phase(name)` had run here.
+    """
+    timing = current()
+    if timing is not None:
+        timing.add_phase(name, seconds)
+    else:
+        PHASE_SECONDS.observe(seconds, view="none", phase=name)
+
+
+def record_pages(tool: str, pages: int):
+    TOOL_PAGES.observe(pages, tool=tool)
+    timing = current()
+    if timing is not None:
+        timing.pages[tool] = timing.pages.get(tool, 0) + pages
+
+
+def record_bytes_in(nbytes: int):
+    timing = current()
+    if timing is not None:
+        timing.bytes_in += nbytes
+
+
+def record_bytes_out(nbytes: int):
+    timing = current()
+    if timing is not None:
+        timing.bytes_out += nbytes
+
+
+def _maybe_log_slow(timing: RequestTiming, total: float, status: int):
+    threshold = getattr(settings, "SLOW_REQUEST_SECONDS", 5.0)
+    sample_rate = getattr(settings, "SLOW_REQUEST_SAMPLE_RATE", 1.0)
+    if total < threshold or random.random() >= sample_rate:
+        return
+
+    phases = " ".join(f"{name}={seconds:.3f}s" for name, seconds in timing.phases)
+    pages = " ".join(f"{tool}={n}" for tool, n in timing.pages.items())
+    slow_logger.warning(
+        "slow request %s %s view=%s status=%s total=%.3fs in=%dB out=%dB pages[%s] phases[%s]",
+        timing.method, timing.path, timing.view, status, total,
+        timing.bytes_in, timing.bytes_out, pages, phases,
+    )
+
+
+def render_metrics():
+    return "\n".join(h.render() for h in REGISTRY) + "\n"
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. The paths, views and timings show what
+    the site is used for, so only staff users and METRICS_ALLOWED_IPS
+    may read it.
+    """
+    allowed_ips = getattr(settings, "METRICS_ALLOWED_IPS", ())
+    if not (request.user.is_staff or request.META.get("REMOTE_ADDR") in allowed_ips):
+        return HttpResponseForbidden("Metrics are only available to staff users.")
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
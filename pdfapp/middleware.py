@@ -0,0 +1,146 @@
+import shutil
+import time
+
+from django.http import HttpResponse
+
+from . import metrics
+from .content_store import ContentStoreUploadHandler, UploadRejected
+from .isolation import ToolFailed
+from .progress import Cancelled
+
+
+class RequestTimingMiddleware:
+    """
+    Time every request and feed pdfapp.metrics.
+
+    The request's RequestTiming is active while the view runs, so
+    `metrics.phase()` calls in views and tools attach to it. The
+    "response" phase (streaming the body to the client) and the request
+    total are recorded when the server closes the response.
+
+    Put this first in MIDDLEWARE so the totals cover the other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing, token = metrics.start_request(request.method, request.path)
+        request.toolverse_timing = timing
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+
+        handler_done = time.perf_counter()
+        if not response.streaming:
+            timing.bytes_out = len(response.content)
+        elif getattr(response, "file_to_stream", None) is not None and response.has_header("Content-Length"):
+            # A file the server may send with sendfile(): left unwrapped
+            timing.bytes_out = int(response["Content-Length"])
+        elif not response.is_async:
+            # Generated as it is sent (batch ZIPs, extracted text): counted
+            # on the way out
+            response.streaming_content = _count_bytes_out(response.streaming_content, timing)
+
+        original_close = response.close
+        closed = False
+
+        def close():
+            nonlocal closed
+            try:
+                original_close()
+            finally:
+                # Servers and the test client may both close the response.
+                if not closed:
+                    closed = True
+                    timing.add_phase("response", time.perf_counter() - handler_done)
+                    timing.finish(response.status_code)
+
+        response.close = close
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.toolverse_timing.view = getattr(view_func, "__name__", "unknown")
+        return None
+
+
+def _count_bytes_out(chunks, timing):
+    for chunk in chunks:
+        timing.bytes_out += len(chunk)
+        yield chunk
+
+
+class ContentStoreUploadMiddleware:
+    """
+    Stream multipart uploads into the content store (pdfapp.content_store).
+
+    The body is parsed here, before CsrfViewMiddleware reads request.POST,
+    so an upload refused while streaming in (not a PDF, too large) is
+    answered with a 400 / 413 and its message instead of a server error.
+
+    Put this after RequestTimingMiddleware and before CsrfViewMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method == "POST" and request.content_type == "multipart/form-data":
+            request.upload_handlers.insert(0, ContentStoreUploadHandler(request))
+            try:
+                with metrics.phase("upload_spool"):
+                    request.FILES
+            except UploadRejected as e:
+                return HttpResponse(str(e), status=e.status, content_type="text/plain")
+        return self.get_response(request)
+
+
+class RequestFoldersMiddleware:
+    """
+    Remove the working folders a view made for its request
+    (request.toolverse_folders, filled by pdfapp.views._get_request_dirs)
+    once the response is closed: after a file response has been sent, a
+    stream has ended, or right away for anything else.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.toolverse_folders = folders = []
+        response = self.get_response(request)
+        if not folders:
+            return response
+
+        original_close = response.close
+
+        def close():
+            try:
+                original_close()
+            finally:
+                for folder in folders:
+                    shutil.rmtree(folder, ignore_errors=True)
+
+        response.close = close
+        return response
+
+
+class ToolFailedMiddleware:
+    """
+    Answer a tool call stopped by pdfapp.isolation (timeout, memory or CPU
+    limit, crashed child) with its message and a 422, instead of a server
+    error: the input file is the problem, not the server. A cancelled job
+    (pdfapp.progress.Cancelled) is answered with a 499.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, (ToolFailed, Cancelled)):
+            return HttpResponse(str(exception), status=exception.status, content_type="text/plain")
+        return None
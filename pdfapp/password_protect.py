@@ -1,15 +1,15 @@
 '''
 1. Just lock the PDF with an open 
-    python password_protect.py Files\Final_Thesis.pdf -u mypass123
+    python -m pdfapp.password_protect Files\Final_Thesis.pdf -u mypass123
 
 2. Separate owner password
-    python password_protect.py Files\Final_Thesis.pdf -u read123 -p admin456
+    python -m pdfapp.password_protect Files\Final_Thesis.pdf -u read123 -p admin456
 
 3. Add restrictions (disable printing & copy)
-    python password_protect.py Files\Final_Thesis.pdf -u read123 --no-print --no-copy
+    python -m pdfapp.password_protect Files\Final_Thesis.pdf -u read123 --no-print --no-copy
 
 4. Custom Output Path
-    python password_protect.py Files\Report.pdf -u secure -p admin -o Files\Report_secure.pdf
+    python -m pdfapp.password_protect Files\Report.pdf -u secure -p admin -o Files\Report_secure.pdf
 
 '''
 
@@ -20,17 +20,23 @@ import fitz  # PyMuPDF
 import os
 import argparse
 
+from .metrics import phase, record_pages
+from .pdf_writer import save_pdf
+
 
 def password_protect(input_path: str, output_path: str = None,
                      user_pwd: str = None, owner_pwd: str = None,
-                     no_print=False, no_copy=False, no_annot=False):
+                     no_print=False, no_copy=False, no_annot=False, profile=None):
     """
     Apply password protection and optional restrictions to a PDF.
+    profile: output profile, see pdf_writer.PROFILES (None = default).
     """
     if not user_pwd and not owner_pwd:
         raise ValueError("At least one password (user or owner) must be provided.")
 
-    doc = fitz.open(input_path)
+    with phase("open"):
+        doc = fitz.open(input_path)
+    record_pages("password_protect", doc.page_count)
 
     # Build permissions bitmask
     perms = 0
@@ -47,13 +53,16 @@ def password_protect(input_path: str, output_path: str = None,
         base_name, ext = os.path.splitext(os.path.basename(input_path))
         output_path = os.path.join(base_dir, f"{base_name}_locked{ext or '.pdf'}")
 
-    doc.save(
-        output_path,
-        encryption=fitz.PDF_ENCRYPT_AES_256,  # Strong AES-256 encryption
-        owner_pw=owner_pwd,
-        user_pw=user_pwd,
-        permissions=~perms,  # invert: bits unset = disallowed
-    )
+    with phase("save"):
+        save_pdf(
+            doc,
+            output_path,
+            profile,
+            encryption=fitz.PDF_ENCRYPT_AES_256,  # Strong AES-256 encryption
+            owner_pw=owner_pwd,
+            user_pw=user_pwd,
+            permissions=~perms,  # invert: bits unset = disallowed
+        )
     doc.close()
 
     print(f"🔐 Created password-protected PDF: {output_path}")
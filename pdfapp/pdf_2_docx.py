@@ -1,21 +1,362 @@
 from pdf2docx import Converter
 from pathlib import Path
+import gzip
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import re
 
+import fitz
 
-def pdf_to_word_exact(pdf_path: Path, docx_path: Path):
+from .metrics import phase, record_pages
+
+
+# Parsed page layouts are cached under their page fingerprint; the oldest
+# entries are dropped once the cache grows past this size.
+DOCX_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+_REF_RE = re.compile(rb"(\d+) 0 R")
+
+# A page without text whose images cover this share of it is image-only
+# (a scan): it becomes one picture instead of going through pdf2docx
+IMAGE_ONLY_COVERAGE = 0.9
+# Image-only pages that can't pass their image through are rendered at
+# their images' resolution, up to this
+IMAGE_PAGE_MAX_DPI = 300
+IMAGE_PAGE_JPEG_QUALITY = 85
+
+
+def _object_digest(doc, xref: int, memo: dict):
+    """
+    Hash a PDF object and everything it references (fonts, images, forms,
+    ...). Digests are memoized per xref, so shared resources are hashed
+    once per document.
+    """
+    if xref in memo:
+        return memo[xref]
+    memo[xref] = b""  # guard against reference cycles
+
+    h = hashlib.sha256()
+    source = doc.xref_object(xref, compressed=True).encode("latin-1", "replace")
+    h.update(source)
+    if doc.xref_is_stream(xref):
+        h.update(doc.xref_stream_raw(xref) or b"")
+    for ref in _REF_RE.findall(source):
+        h.update(_object_digest(doc, int(ref), memo))
+
+    memo[xref] = h.digest()
+    return memo[xref]
+
+
+def page_fingerprints(doc, settings: dict):
+    """
+    One hex key per page, built from the page's content streams, its
+    resources (recursively), its geometry and the conversion settings.
+    Pages with equal keys convert to the same layout.
+    """
+    try:
+        version = importlib.metadata.version("pdf2docx")
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+    salt = (version + json.dumps(settings, sort_keys=True, default=str)).encode()
+
+    memo = {}
+    keys = []
+    for page in doc:
+        h = hashlib.sha256(salt)
+        h.update(f"{tuple(page.rect)}|{page.rotation}".encode())
+        h.update(page.read_contents())
+
+        kind, value = doc.xref_get_key(page.xref, "Resources")
+        if kind == "xref":
+            h.update(_object_digest(doc, int(value.split()[0]), memo))
+        else:
+            h.update(value.encode("latin-1", "replace"))
+            for ref in _REF_RE.findall(value.encode("latin-1", "replace")):
+                h.update(_object_digest(doc, int(ref), memo))
+
+        keys.append(h.hexdigest())
+    return keys
+
+
+def _cache_load(cache_dir: Path, key: str):
+    path = cache_dir / f"{key}.json.gz"
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    os.utime(path)  # mark as recently used
+    return data
+
+
+def _cache_store(cache_dir: Path, key: str, data: dict):
+    path = cache_dir / f"{key}.json.gz"
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _prune_cache(cache_dir: Path, max_bytes: int):
+    entries = []
+    for path in cache_dir.glob("*.json.gz"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def image_only_pages(doc):
+    """
+    Numbers of the pages that are image-only: no text layer, and images
+    covering at least IMAGE_ONLY_COVERAGE of the page (overlapping images
+    count twice).
+    """
+    pages = []
+    for page in doc:
+        if not page.get_images() or page.get_text("text").strip():
+            continue
+        area = abs(page.rect)
+        # (image boxes are unrotated)
+        covered = sum(abs(fitz.Rect(info["bbox"]) * page.rotation_matrix & page.rect)
+                      for info in page.get_image_info())
+        if area and covered >= IMAGE_ONLY_COVERAGE * area:
+            pages.append(page.number)
+    return pages
+
+
+def _page_picture(page):
+    """
+    (image bytes, pixel width, pixel height) showing an image-only page.
+
+    A page that is just one upright image filling it hands over that
+    image's JPEG stream as it is (or its pixels as PNG); anything else -
+    several images, drawings on top, rotation, masks, CMYK - is rendered
+    at the images' resolution: PNG when they are all black-and-white,
+    otherwise JPEG.
+    """
+    doc = page.parent
+    # (xrefs=True would decode every image to hash it)
+    infos = page.get_image_info()
+    images = page.get_images()
+    if len(infos) == 1 and len(images) == 1 and page.rotation == 0 and not page.get_drawings():
+        info = infos[0]
+        a, b, c, d = info["transform"][:4]
+        xref = images[0][0]
+        if a > 0 and d > 0 and b == c == 0 \
+                and abs(fitz.Rect(info["bbox"]) & page.rect) >= 0.99 * abs(page.rect) \
+                and doc.xref_get_key(xref, "Decode")[0] == "null":
+            image = doc.extract_image(xref)
+            if image and image["ext"] in ("jpeg", "png") and not image["smask"] \
+                    and image["colorspace"] in (1, 3):
+                return image["image"], image["width"], image["height"]
+
+    dpi = 72
+    for info in infos:
+        x0, y0, x1, y1 = info["bbox"]
+        if x1 > x0:
+            dpi = max(dpi, info["width"] * 72 / (x1 - x0))
+    pix = page.get_pixmap(dpi=int(min(dpi, IMAGE_PAGE_MAX_DPI)))
+    if all(info["bpc"] == 1 for info in infos):
+        return pix.tobytes("png"), pix.width, pix.height
+    return pix.tobytes("jpg", jpg_quality=IMAGE_PAGE_JPEG_QUALITY), pix.width, pix.height
+
+
+def _picture_page_layout(page):
+    """
+    Parsed layout of an image-only page, in Page.store() format: what
+    pdf2docx makes of a scan, one inline picture filling a section
+    without margins, without running its layout analysis.
+    """
+    image, width, height = _page_picture(page)
+    bbox = [0.0, 0.0, page.rect.width, page.rect.height]
+    span = {"bbox": bbox, "width": width, "height": height, "image": image}
+    line = {"bbox": bbox, "wmode": 0, "dir": [1.0, 0.0], "line_break": 0, "tab_stop": 0,
+            "spans": [span]}
+    block = {"bbox": bbox, "type": 0, "alignment": 2, "left_space": 0, "right_space": 0,
+             "first_line_space": 0.0, "before_space": 0.0, "after_space": 0.0,
+             "line_space": 1.02, "line_space_type": 1, "tab_stops": [], "lines": [line]}
+    column = {"bbox": bbox, "blocks": [block], "shapes": []}
+    return {
+        "id": page.number,
+        "width": page.rect.width,
+        "height": page.rect.height,
+        "margin": [0.0, 0.0, 0.0, 0.0],
+        "sections": [{"bbox": bbox, "num_cols": 1, "space": 0, "before_space": 0.0,
+                      "columns": [column]}],
+        "header": "",
+        "footer": "",
+        "floats": [],
+    }
+
+
+class _CancellableDocument:
+    """
+    The fitz.Document as handed to pdf2docx's document analysis, which
+    fetches every page in one loop of its own: `cancel` is checked on each
+    fetch, so a cancelled job stops there within a page too.
+    """
+
+    def __init__(self, doc, cancel):
+        self._doc = doc
+        self._cancel = cancel
+
+    def __getitem__(self, index):
+        self._cancel.check()
+        return self._doc[index]
+
+    def __len__(self):
+        return len(self._doc)
+
+    def __iter__(self):
+        return iter(self._doc)
+
+    def __getattr__(self, name):
+        return getattr(self._doc, name)
+
+
+def _convert_pages(converter, docx_path: Path, progress, cache_dir: Path = None,
+                   cancel=None, image_pages=()):
+    """
+    Same steps as Converter.convert(), with the page-parsing loop unrolled
+    here so progress can be reported (and `cancel` checked) after each
+    page.
+
+    Pages in image_pages (see image_only_pages) skip pdf2docx: each is
+    laid out as one picture. With a cache_dir, other pages whose
+    fingerprint is already cached are restored instead of parsed, and
+    newly parsed pages are added to it.
+    """
+    settings = converter.default_settings
+    total = converter.fitz_doc.page_count
+
+    cached = {}
+    keys = []
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        keys = page_fingerprints(converter.fitz_doc, settings)
+        skip = set(image_pages)
+        for i, key in enumerate(keys):
+            if i in skip:
+                continue
+            data = _cache_load(cache_dir, key)
+            if data is not None:
+                cached[i] = data
+        print(f"Page cache: {len(cached)}/{total - len(image_pages)} page(s) unchanged")
+
+    done = len(cached)
+    progress(done, total)
+    if image_pages:
+        print(f"Image-only pages: {len(image_pages)}/{total} placed as pictures")
+    for i in image_pages:
+        if cancel is not None:
+            cancel.check()
+        cached[i] = _picture_page_layout(converter.fitz_doc[i])
+        done += 1
+        progress(done, total)
+
+    changed = [i for i in range(total) if i not in cached]
+
+    if changed:
+        converter.load_pages(pages=changed)
+        if cancel is None:
+            converter.parse_document(**settings)
+        else:
+            # What parse_document() does, on the checked document
+            converter.pages.parse(_CancellableDocument(converter.fitz_doc, cancel), **settings)
+        for page in converter.pages:
+            if page.skip_parsing:
+                continue
+            if cancel is not None:
+                cancel.check()
+            try:
+                page.parse(**settings)
+            except Exception as e:
+                if not settings["ignore_page_error"]:
+                    raise
+                logging.error("Ignore page %d due to parsing page error: %s", page.id + 1, e)
+            else:
+                if cache_dir is not None:
+                    _cache_store(cache_dir, keys[page.id], page.store())
+            done += 1
+            progress(done, total)
+
+    if cancel is not None:
+        cancel.check()
+    if cached:
+        converter.restore({
+            "page_cnt": total,
+            "pages": [dict(data, id=i) for i, data in cached.items()],
+        })
+
+    converter.make_docx(str(docx_path), **settings)
+    progress(total, total, docx_path.stat().st_size)
+
+    if cache_dir is not None and changed:
+        _prune_cache(cache_dir, DOCX_CACHE_MAX_BYTES)
+
+
+def _no_progress(done, total, bytes_written=0):
+    pass
+
+
+def pdf_to_word_exact(pdf_path: Path, docx_path: Path, progress=None, cache_dir: Path = None,
+                      cancel=None):
     """
     Convert a PDF to DOCX while preserving layout and formatting.
     Uses pdf2docx (pure Python, no external dependencies).
+
+    progress: optional callback(pages_done, total_pages, bytes_written),
+    called after each parsed page and once more when the DOCX is saved.
+
+    cache_dir: optional folder for the per-page layout cache. When given,
+    only pages whose content or resources changed since an earlier
+    conversion are re-analyzed (e.g. re-uploading a thesis with one typo
+    fixed re-parses one page).
+
+    cancel: optional token (pdfapp.progress.CancelToken). Its check() is
+    called before each page is parsed and raises once it is cancelled;
+    the DOCX is only written after the last page, so nothing is left
+    behind.
+
+    Image-only pages (scans, see image_only_pages) are not analyzed: each
+    becomes one full-page picture, its JPEG passed through where possible.
+    Mixed documents are routed page by page.
     """
+    pdf_path = Path(pdf_path)
+    docx_path = Path(docx_path)
+
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
     print(f"****    Converting '{pdf_path.name}' → '{docx_path.name}' ...    ****")
 
     # Initialize converter
-    converter = Converter(str(pdf_path))
-    converter.convert(str(docx_path), start=0, end=None)
-    converter.close()
+    with phase("open"):
+        converter = Converter(str(pdf_path))
+    record_pages("pdf_to_word_exact", len(converter.fitz_doc))
+    try:
+        with phase("tool"):
+            image_pages = image_only_pages(converter.fitz_doc)
+            if progress is None and cache_dir is None and cancel is None and not image_pages:
+                converter.convert(str(docx_path), start=0, end=None)
+            else:
+                cache_dir = Path(cache_dir) if cache_dir is not None else None
+                _convert_pages(converter, docx_path, progress or _no_progress, cache_dir, cancel,
+                               image_pages)
+    finally:
+        converter.close()
 
     print(f"====    Done: {docx_path.name}    ====\n")
 
@@ -0,0 +1,390 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+import math
+import multiprocessing
+import struct
+import zlib
+
+import fitz  # PyMuPDF
+
+from .extract_pages import parse_extract_spec
+from .metrics import phase, record_pages
+
+
+# Upper bound on pixels rendered for one page (25 MP ~ 75 MB as RGB).
+# Pages that would exceed it at the requested zoom are rendered smaller.
+DEFAULT_MAX_PIXELS = 25_000_000
+
+# Pixels held in memory at once for each band in tiled mode.
+DEFAULT_BAND_PIXELS = 4_000_000
+
+# Tiled mode only holds one band in memory, so it can afford a much larger
+# page budget (400 MP ~ an A0 sheet at 600 dpi).
+TILED_MAX_PIXELS = 400_000_000
+
+# Accepted output formats -> file extension
+IMAGE_FORMATS = {"png": "png", "jpg": "jpg", "jpeg": "jpg", "webp": "webp"}
+
+# Largest batch of pages handed to one worker task. Smaller batches spread
+# the load better and let progress be reported as batches complete.
+MAX_PAGES_PER_TASK = 16
+
+# How often the parallel path looks at the cancel token
+CANCEL_POLL_SECONDS = 0.25
+
+# Pool workers: set when the run is cancelled (see _init_worker)
+_stop_event = None
+
+
+def fit_zoom_to_budget(page_rect, zoom: float, max_pixels: int):
+    """
+    Return the largest zoom <= `zoom` whose render of `page_rect`
+    stays within `max_pixels`.
+    """
+    width = page_rect.width * zoom
+    height = page_rect.height * zoom
+    if math.ceil(width) * math.ceil(height) <= max_pixels:
+        return zoom
+    # The render is rounded up to whole pixels: solve
+    # (width * s + 1) * (height * s + 1) = max_pixels for the scale s
+    a, b, c = width * height, width + height, 1 - max_pixels
+    return zoom * (math.sqrt(b * b - 4 * a * c) - b) / (2 * a)
+
+
+class _PngBandWriter:
+    """
+    Minimal streaming PNG encoder.
+
+    Rows are fed band by band and deflated straight into IDAT chunks,
+    so the full image never has to exist in memory.
+    """
+
+    def __init__(self, path, width: int, height: int, channels: int, level: int = 6):
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.rows_written = 0
+        self._zip = zlib.compressobj(level)
+        self._fh = open(path, "wb")
+        self._fh.write(b"\x89PNG\r\n\x1a\n")
+        color_type = {1: 0, 3: 2}[channels]
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+        self._chunk(b"IHDR", ihdr)
+
+    def _chunk(self, tag: bytes, data: bytes):
+        self._fh.write(struct.pack(">I", len(data)))
+        self._fh.write(tag)
+        self._fh.write(data)
+        self._fh.write(struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    def write_band(self, pix):
+        """
+        Append the rows of a pixmap band. Rows are trimmed or padded so the
+        image keeps the width / height declared in the header.
+        """
+        row_len = self.width * self.channels
+        samples = pix.samples_mv
+        stride = pix.stride
+        pad = b"\xff" * row_len
+
+        raw = bytearray()
+        for y in range(pix.height):
+            if self.rows_written >= self.height:
+                break
+            row = bytes(samples[y * stride:y * stride + min(stride, row_len)])
+            raw += b"\x00" + row + pad[len(row):]
+            self.rows_written += 1
+
+        data = self._zip.compress(bytes(raw))
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def close(self):
+        row_len = self.width * self.channels
+        while self.rows_written < self.height:
+            data = self._zip.compress(b"\x00" + b"\xff" * row_len)
+            if data:
+                self._chunk(b"IDAT", data)
+            self.rows_written += 1
+        self._chunk(b"IDAT", self._zip.flush())
+        self._chunk(b"IEND", b"")
+        self._fh.close()
+
+
+def _render_tiled(page, matrix, zoom: float, img_path: Path, band_pixels: int,
+                  colorspace, png_level: int = None):
+    """
+    Render one page as horizontal bands using clip rectangles and
+    stream them into a single PNG.
+    """
+    full = (page.rect * matrix).irect
+    width, height = full.width, full.height
+    band_rows = max(1, band_pixels // max(1, width))
+
+    # Interpret the page content once, then rasterize each band from it.
+    display_list = page.get_displaylist()
+    writer = _PngBandWriter(img_path, width, height, channels=colorspace.n,
+                            level=6 if png_level is None else png_level)
+    try:
+        for row0 in range(0, height, band_rows):
+            row1 = min(height, row0 + band_rows)
+            clip = fitz.Rect(
+                page.rect.x0,
+                page.rect.y0 + row0 / zoom,
+                page.rect.x1,
+                page.rect.y0 + row1 / zoom,
+            )
+            pix = display_list.get_pixmap(matrix=matrix, colorspace=colorspace,
+                                          alpha=False, clip=clip)
+            writer.write_band(pix)
+            pix = None
+    finally:
+        writer.close()
+
+
+def _save_pixmap(pix, img_path: Path, fmt: str, quality: int, png_level: int = None):
+    """
+    Encode a rendered page in the requested format.
+    """
+    if fmt == "jpg":
+        pix.save(str(img_path), output="jpg", jpg_quality=quality)
+    elif fmt == "webp":
+        # PyMuPDF has no WebP encoder of its own; this goes through Pillow.
+        pix.pil_save(str(img_path), format="WEBP", quality=quality)
+    elif png_level is not None:
+        writer = _PngBandWriter(img_path, pix.width, pix.height, pix.n, level=png_level)
+        writer.write_band(pix)
+        writer.close()
+    else:
+        pix.save(str(img_path))
+
+
+def _render_pages(doc, page_indices, output_dir: Path, options: dict, on_page=None,
+                  stop=None):
+    """
+    Render and encode the given pages of an open document.
+    Returns the number of bytes written; `on_page(nbytes)` is called after
+    each page. `stop()` is asked before each page: when it returns True,
+    the remaining pages are skipped.
+    """
+    written = 0
+    zoom = options["zoom"]
+    fmt = options["fmt"]
+    colorspace = fitz.csGRAY if options["grayscale"] else fitz.csRGB
+
+    for page_index in page_indices:
+        if stop is not None and stop():
+            break
+        page = doc.load_page(page_index)
+
+        page_zoom = fit_zoom_to_budget(page.rect, zoom, options["max_pixels"])
+        if page_zoom < zoom:
+            print(f"⚠️ Page {page_index + 1}: zoom {zoom} exceeds pixel budget, "
+                  f"using {page_zoom:.2f}")
+
+        # Matrix for zoom (quality)
+        matrix = fitz.Matrix(page_zoom, page_zoom)
+
+        # File name: page_001.png, page_002.jpg, ...
+        img_name = f"page_{page_index + 1:03d}.{fmt}"
+        img_path = output_dir / img_name
+
+        if options["tiled"]:
+            _render_tiled(page, matrix, page_zoom, img_path, options["band_pixels"],
+                          colorspace, options["png_level"])
+        else:
+            pix = page.get_pixmap(matrix=matrix, colorspace=colorspace, alpha=False)
+            _save_pixmap(pix, img_path, fmt, options["quality"], options["png_level"])
+            pix = None
+        print(f"✅ Saved: {img_path}")
+
+        nbytes = img_path.stat().st_size
+        written += nbytes
+        if on_page is not None:
+            on_page(nbytes)
+
+    return written
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _render_pages_worker(pdf_path: str, page_indices, output_dir: Path, options: dict):
+    """
+    Process-pool entry point: each worker opens its own copy of the PDF.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        return _render_pages(doc, page_indices, output_dir, options,
+                             stop=_stop_event.is_set if _stop_event is not None else None)
+    finally:
+        doc.close()
+
+
+def _remove_page_images(output_dir: Path, page_indices, fmt: str):
+    for page_index in page_indices:
+        (output_dir / f"page_{page_index + 1:03d}.{fmt}").unlink(missing_ok=True)
+
+
+def _render_parallel(pdf_path: Path, page_indices, output_dir: Path, options: dict,
+                     workers: int, page_done, cancel=None):
+    """
+    Render `page_indices` on a pool of `workers` processes. Once `cancel`
+    is cancelled, queued chunks are dropped and running ones stop before
+    their next page.
+    """
+    total = len(page_indices)
+    # Contiguous chunks keep each worker's page accesses local.
+    chunk = min(math.ceil(total / workers), MAX_PAGES_PER_TASK)
+    chunks = [page_indices[i:i + chunk] for i in range(0, total, chunk)]
+    stop_event = multiprocessing.Event() if cancel is not None else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(stop_event,)) as pool:
+        futures = {
+            pool.submit(_render_pages_worker, str(pdf_path), c, output_dir, options): len(c)
+            for c in chunks
+        }
+        pending = set(futures)
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED,
+                                     timeout=CANCEL_POLL_SECONDS if cancel is not None else None)
+            if cancel is not None and cancel.cancelled:
+                stop_event.set()
+                for future in pending:
+                    future.cancel()
+                return
+            for future in finished:
+                page_done(future.result(), pages=futures[future])
+
+
+def pdf_to_images(pdf_path: str, output_folder: str = None, zoom: float = 2.0,
+                  pages: str = None, max_pixels: int = DEFAULT_MAX_PIXELS,
+                  tiled: bool = False, band_pixels: int = DEFAULT_BAND_PIXELS,
+                  image_format: str = "png", quality: int = 85,
+                  grayscale: bool = False, png_level: int = None,
+                  workers: int = 1, progress=None, cancel=None):
+    """
+    Export each page of a PDF as an image.
+
+    Args:
+        pdf_path (str): Path to input PDF.
+        output_folder (str): Folder to save images. If None, uses PDF's folder.
+        zoom (float): Scale factor for quality. >1 = higher resolution.
+        pages (str): Optional page spec like '1-3,5'. None = all pages.
+        max_pixels (int): Pixel budget per page. Pages larger than this at
+            `zoom` are downscaled to fit.
+        tiled (bool): Render in horizontal bands of `band_pixels` and stream
+            them into the PNG, so memory does not grow with page size.
+            PNG output only.
+        band_pixels (int): Pixels per band in tiled mode.
+        image_format (str): 'png', 'jpg'/'jpeg' or 'webp' (WebP needs Pillow).
+        quality (int): JPEG / WebP quality 1-100.
+        grayscale (bool): Render in 8-bit gray instead of RGB.
+        png_level (int): zlib level 0-9 for PNG. None = PyMuPDF default.
+        workers (int): Processes that render and encode pages in parallel.
+        progress (callable): Optional callback(pages_done, total_pages,
+            bytes_written), called as pages are finished.
+        cancel: Optional token (pdfapp.progress.CancelToken). Rendering
+            stops before the next page once it is cancelled, and
+            cancel.check() raises. A run that fails or is cancelled
+            removes the images it wrote.
+    """
+    pdf_path = Path(pdf_path)
+
+    if not pdf_path.exists():
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+    if zoom <= 0:
+        raise ValueError("Zoom must be greater than 0.")
+
+    fmt = IMAGE_FORMATS.get(image_format.lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported image format '{image_format}'. "
+                         f"Choose one of: {', '.join(sorted(IMAGE_FORMATS))}.")
+    if tiled and fmt != "png":
+        raise ValueError("Tiled rendering only supports PNG output.")
+    if png_level is not None and not 0 <= png_level <= 9:
+        raise ValueError("PNG compression level must be between 0 and 9.")
+
+    # Resolve output folder
+    if output_folder is None:
+        output_dir = pdf_path.parent / (pdf_path.stem + "_pages")
+    else:
+        output_dir = Path(output_folder)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Open PDF
+    with phase("open"):
+        doc = fitz.open(str(pdf_path))
+    print(f"📄 PDF: {pdf_path}")
+    print(f"📁 Output folder: {output_dir}")
+    print(f"📑 Pages: {doc.page_count}")
+
+    if pages:
+        page_indices = parse_extract_spec(pages, doc.page_count)
+    else:
+        page_indices = list(range(doc.page_count))
+
+    record_pages("pdf_to_images", len(page_indices))
+
+    options = {
+        "zoom": zoom,
+        "max_pixels": max_pixels,
+        "tiled": tiled,
+        "band_pixels": band_pixels,
+        "fmt": fmt,
+        "quality": max(1, min(100, quality)),
+        "grayscale": grayscale,
+        "png_level": png_level,
+    }
+
+    total = len(page_indices)
+    state = {"done": 0, "bytes": 0}
+
+    def page_done(nbytes, pages=1):
+        state["done"] += pages
+        state["bytes"] += nbytes
+        if progress is not None:
+            progress(state["done"], total, state["bytes"])
+
+    if progress is not None:
+        progress(0, total, 0)
+
+    workers = max(1, min(workers, total))
+    stop = (lambda: cancel.cancelled) if cancel is not None else None
+    try:
+        with phase("tool"):
+            if workers == 1:
+                try:
+                    _render_pages(doc, page_indices, output_dir, options, on_page=page_done,
+                                  stop=stop)
+                finally:
+                    doc.close()
+            else:
+                doc.close()
+                _render_parallel(pdf_path, page_indices, output_dir, options, workers,
+                                 page_done, cancel)
+        if cancel is not None:
+            cancel.check()
+    except BaseException:
+        _remove_page_images(output_dir, page_indices, fmt)
+        raise
+
+    print("✨ Done. All pages exported as images.")
+
+
+def main():
+    # 🔧 Set your PDF path here
+    input_pdf = r"Files\Final_Thesis.pdf"  # change this
+
+    # Optional: set output folder (None = auto folder next to PDF)
+    output_folder = None
+
+    # zoom=2.0 → decent quality, 3.0 → higher but bigger files
+    pdf_to_images(input_pdf, output_folder=output_folder, zoom=2.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+Shared output writer for the PDF tools.
+
+Every tool saves its result through `save_pdf()`, so how a PDF is written
+is decided in one place and can be picked per request:
+
+    save_pdf(doc, output_path, profile="web")
+
+A profile is a named set of save options:
+
+    garbage         MuPDF garbage collection, 0-4 (3 also merges duplicate
+                    objects, 4 also compares stream contents)
+    deflate         compress streams that are stored uncompressed
+                    (content, images and fonts)
+    object_streams  pack the non-stream objects into compressed object
+                    streams (PDF 1.5)
+    clean           sanitize and rewrite page content streams
+    linearize       "fast web view": page 1 and a hint table at the front
+                    of the file, so viewers can show the first page while
+                    the rest is still downloading
+
+MuPDF no longer writes linearized files, so `linearize` uses pikepdf
+(qpdf) when it is installed. Without it the file is written with the
+profile's other options, not linearized, and a warning is logged.
+
+Structural edits of a document that was opened from a file (pages
+removed, rotated or reordered, metadata changed) can instead be saved
+in place with `save_incremental()`, which appends only the changed
+objects and a new xref section to the file. Nothing is compacted: data
+of removed pages stays in the file, unreferenced. Use `save_pdf()` when
+the output should be small. To update a copy, make it with
+`copy_for_update()`: on a filesystem with reflinks (btrfs, XFS) the copy
+shares the input's blocks and costs nothing; elsewhere (ext4) it is a
+full in-kernel copy, and the copy dominates the time of a small edit.
+"""
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+import zlib
+
+import fitz  # PyMuPDF
+
+try:
+    import fcntl
+except ImportError:  # Windows: no reflinks
+    fcntl = None
+
+try:
+    import pikepdf
+except ImportError:  # linearization unavailable
+    pikepdf = None
+
+
+logger = logging.getLogger(__name__)
+
+PROFILES = {
+    # Compact output; what the tools wrote before profiles existed
+    "compact": {"garbage": 3, "deflate": True, "object_streams": True,
+                "clean": False, "linearize": False},
+    # Compact and linearized, for files that are opened in a browser
+    "web": {"garbage": 3, "deflate": True, "object_streams": True,
+            "clean": False, "linearize": True},
+    # Smallest file: also compares stream contents and rewrites content
+    # streams (slower, O(n^2) in the number of streams)
+    "smallest": {"garbage": 4, "deflate": True, "object_streams": True,
+                 "clean": True, "linearize": False},
+    # Quickest write: objects are copied as they are
+    "fast": {"garbage": 0, "deflate": False, "object_streams": False,
+             "clean": False, "linearize": False},
+}
+
+DEFAULT_PROFILE = "compact"
+
+# fitz encryption method -> pikepdf.Encryption arguments
+_PIKEPDF_ENCRYPTION = {
+    fitz.PDF_ENCRYPT_AES_256: {"R": 6},
+    fitz.PDF_ENCRYPT_AES_128: {"R": 4, "aes": True},
+    fitz.PDF_ENCRYPT_RC4_128: {"R": 4, "aes": False},
+    fitz.PDF_ENCRYPT_RC4_40: {"R": 2},
+}
+
+_warned_no_linearizer = False
+
+
+def get_profile(profile=None) -> dict:
+    """
+    Return the options of a profile name (None = DEFAULT_PROFILE).
+    Raises ValueError for unknown names.
+    """
+    name = profile or DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown output profile '{name}'. "
+                         f"Choose one of: {', '.join(PROFILES)}.") from None
+
+
+def can_linearize() -> bool:
+    return pikepdf is not None
+
+
+def _pikepdf_encryption(encryption, owner_pw, user_pw, permissions):
+    """
+    The pikepdf equivalent of fitz's encryption save options, or False
+    for no encryption.
+    """
+    if encryption in (None, fitz.PDF_ENCRYPT_KEEP, fitz.PDF_ENCRYPT_NONE):
+        return False
+    perms = -1 if permissions is None else permissions
+    allow = pikepdf.Permissions(
+        accessibility=bool(perms & fitz.PDF_PERM_ACCESSIBILITY),
+        extract=bool(perms & fitz.PDF_PERM_COPY),
+        modify_annotation=bool(perms & fitz.PDF_PERM_ANNOTATE),
+        modify_assembly=bool(perms & fitz.PDF_PERM_ASSEMBLE),
+        modify_form=bool(perms & fitz.PDF_PERM_FORM),
+        modify_other=bool(perms & fitz.PDF_PERM_MODIFY),
+        print_lowres=bool(perms & fitz.PDF_PERM_PRINT),
+        # qpdf reads high-quality printing as permission to print at all
+        print_highres=bool(perms & fitz.PDF_PERM_PRINT) and bool(perms & fitz.PDF_PERM_PRINT_HQ),
+    )
+    # An empty owner password opens the file with full rights: like MuPDF,
+    # use the user password for both when no owner password is given
+    return pikepdf.Encryption(owner=owner_pw or user_pw or "", user=user_pw or "", allow=allow,
+                              **_PIKEPDF_ENCRYPTION[encryption])
+
+
+def save_pdf(doc, output_path, profile=None, encryption=None,
+             owner_pw: str = None, user_pw: str = None, permissions: int = None):
+    """
+    Save an open fitz document to `output_path` with the options of
+    `profile` (a name from PROFILES, None = DEFAULT_PROFILE).
+
+    encryption / owner_pw / user_pw / permissions are fitz's save options
+    (fitz.PDF_ENCRYPT_*, fitz.PDF_PERM_* bits). Linearized output is only
+    encrypted when `encryption` asks for it.
+    """
+    options = get_profile(profile)
+    output_path = str(output_path)
+
+    save_options = {
+        "garbage": options["garbage"],
+        "clean": options["clean"],
+        "deflate": options["deflate"],
+        "deflate_images": options["deflate"],
+        "deflate_fonts": options["deflate"],
+    }
+
+    linearize = options["linearize"]
+    if linearize and not can_linearize():
+        global _warned_no_linearizer
+        if not _warned_no_linearizer:
+            logger.warning("pikepdf is not installed: writing PDFs without linearization.")
+            _warned_no_linearizer = True
+        linearize = False
+
+    if not linearize:
+        encrypt = {}
+        if encryption is not None:
+            encrypt["encryption"] = encryption
+        if owner_pw is not None:
+            encrypt["owner_pw"] = owner_pw
+        if user_pw is not None:
+            encrypt["user_pw"] = user_pw
+        if permissions is not None:
+            encrypt["permissions"] = permissions
+        doc.save(output_path, use_objstms=int(options["object_streams"]),
+                 **save_options, **encrypt)
+        return
+
+    # MuPDF writes an unencrypted intermediate file next to the output;
+    # qpdf reorders it for linearization, builds the object streams and
+    # applies the encryption.
+    fd, tmp_path = tempfile.mkstemp(suffix=".pdf", dir=os.path.dirname(os.path.abspath(output_path)))
+    os.close(fd)
+    try:
+        doc.save(tmp_path, encryption=fitz.PDF_ENCRYPT_NONE, **save_options)
+        with pikepdf.open(tmp_path) as pdf:
+            pdf.save(
+                output_path,
+                linearize=True,
+                object_stream_mode=(pikepdf.ObjectStreamMode.generate if options["object_streams"]
+                                    else pikepdf.ObjectStreamMode.disable),
+                encryption=_pikepdf_encryption(encryption, owner_pw, user_pw, permissions),
+            )
+    finally:
+        os.remove(tmp_path)
+
+
+# How far from the end of the file to look for the last 'startxref'
+_TAIL_BYTES = 4096
+
+# save_incremental() reads MuPDF's xref entries through PyMuPDF internals
+# (fitz._as_pdf_document, mupdf.ll_pdf_get_xref_entry_no_null), which are
+# not public API. They are only used with the PyMuPDF versions the tests
+# check against qpdf (pdfapp/tests/test_pdf_writer.py), [low, high);
+# other versions use doc.saveIncr().
+XREF_INTERNALS_VERSIONS = ((1, 28, 0), (1, 29, 0))
+
+_warned_no_xref_internals = False
+
+# ioctl(dest, FICLONE, src): share src's blocks with dest (linux/fs.h)
+_FICLONE = 0x40049409
+
+
+def copy_for_update(src, dst) -> str:
+    """
+    Copy `src` to `dst`, to be updated with save_incremental(), as
+    cheaply as the filesystem allows: a reflink (no data copied) where it
+    supports one, else os.copy_file_range() (copied in the kernel, or by
+    the server on NFS / SMB), else shutil.copyfile(). Returns the method
+    used: "reflink", "copy_file_range" or "copy".
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+                return "reflink"
+            except OSError:  # not supported here, or across filesystems
+                pass
+        if hasattr(os, "copy_file_range"):
+            remaining = os.fstat(fsrc.fileno()).st_size
+            try:
+                while remaining:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if not copied:
+                        break
+                    remaining -= copied
+            except OSError:
+                remaining = -1
+            if not remaining:
+                return "copy_file_range"
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+def _last_xref(path):
+    """
+    Offset of the file's last xref section, and whether it is an xref
+    stream (True) or a classic 'xref' table (False).
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - _TAIL_BYTES))
+        tail = f.read()
+        match = None
+        for match in re.finditer(rb"startxref\s+(\d+)", tail):
+            pass
+        if match is None:
+            raise ValueError("No startxref found at the end of the file.")
+        offset = int(match.group(1))
+        f.seek(offset)
+        is_stream = not f.read(32).lstrip().startswith(b"xref")
+    return offset, is_stream
+
+
+def _trailer_value(doc, key):
+    kind, value = doc.xref_get_key(-1, key)
+    return None if kind == "null" else value
+
+
+def _xref_internals():
+    """
+    (mupdf, _as_pdf_document) when this PyMuPDF is one of
+    XREF_INTERNALS_VERSIONS and has them, else None (logged once).
+    """
+    global _warned_no_xref_internals
+    low, high = XREF_INTERNALS_VERSIONS
+    version = tuple(getattr(fitz, "pymupdf_version_tuple", ()))
+    mupdf = getattr(fitz, "mupdf", None)
+    as_pdf_document = getattr(fitz, "_as_pdf_document", None)
+    if (low <= version < high and as_pdf_document is not None
+            and hasattr(mupdf, "pdf_xref_is_incremental")
+            and hasattr(mupdf, "ll_pdf_get_xref_entry_no_null")):
+        return mupdf, as_pdf_document
+    if not _warned_no_xref_internals:
+        logger.warning("PyMuPDF %s is not one save_incremental() was checked with: "
+                       "using doc.saveIncr().", getattr(fitz, "VersionBind", "?"))
+        _warned_no_xref_internals = True
+    return None
+
+
+def _changed_objects(doc):
+    """
+    (xref, generation, in_use) of the objects MuPDF has changed or created
+    since the document was opened, or None when the xref internals can't
+    be used (see _xref_internals).
+    """
+    internals = _xref_internals()
+    if internals is None:
+        return None
+    mupdf, as_pdf_document = internals
+    pdf = as_pdf_document(doc)
+    changed = []
+    for xref in range(1, doc.xref_length()):
+        if mupdf.pdf_xref_is_incremental(pdf, xref):
+            entry = mupdf.ll_pdf_get_xref_entry_no_null(pdf.m_internal, xref)
+            changed.append((xref, entry.gen, entry.type != "f"))
+    return changed
+
+
+def _runs(numbers):
+    """
+    Split sorted object numbers into (first, count) runs for an xref
+    section.
+    """
+    runs = []
+    for n in numbers:
+        if runs and runs[-1][0] + runs[-1][1] == n:
+            runs[-1][1] += 1
+        else:
+            runs.append([n, 1])
+    return runs
+
+
+def save_incremental(doc):
+    """
+    Append the changes made to `doc` to the file it was opened from, as an
+    incremental update, and return the number of bytes written.
+
+    Only the changed and new objects are written, plus an xref section of
+    the same kind as the file's last one (table or stream) that points
+    back to it with /Prev, so the cost depends on the edit, not on the
+    size of the file. MuPDF's own incremental save (doc.saveIncr()) writes
+    the same objects but reads the whole file twice first.
+
+    That save is used instead for encrypted documents (objects would have
+    to be encrypted again) and with PyMuPDF versions outside
+    XREF_INTERNALS_VERSIONS. Documents MuPDF had to repair can't be updated in place and
+    raise ValueError. `doc` must not be saved again afterwards: close it
+    and reopen the file.
+    """
+    path = doc.name
+    if not doc.is_pdf or not path or not os.path.isfile(path):
+        raise ValueError("Only a PDF opened from a file can be saved incrementally.")
+    if not doc.can_save_incrementally():
+        raise ValueError("This PDF had to be repaired and can't be saved incrementally.")
+
+    changed = None if _trailer_value(doc, "Encrypt") else _changed_objects(doc)
+    if changed is None:
+        before = os.path.getsize(path)
+        doc.saveIncr()
+        return os.path.getsize(path) - before
+    if not changed:
+        return 0
+
+    prev_offset, xref_stream = _last_xref(path)
+    size = doc.xref_length()
+    root = _trailer_value(doc, "Root")
+    info = _trailer_value(doc, "Info")
+    file_id = _trailer_value(doc, "ID")
+
+    with open(path, "ab") as f:
+        start = f.tell()
+        try:
+            return _append_update(f, doc, changed, size, prev_offset, xref_stream,
+                                  root, info, file_id) - start
+        except BaseException:
+            # Leave the file as it was rather than with half an update
+            f.truncate(start)
+            raise
+
+
+def _append_update(f, doc, changed, size, prev_offset, xref_stream, root, info, file_id):
+    """
+    save_incremental(): write the objects, xref section and trailer to
+    `f`; returns the end offset.
+    """
+    entries = {}  # xref -> (in use, offset or 0, generation)
+    f.write(b"\n")
+    for xref, gen, in_use in changed:
+        if not in_use:
+            entries[xref] = (False, 0, gen)
+            continue
+        raw = None
+        if doc.xref_is_stream(xref):
+            raw = doc.xref_stream_raw(xref)
+            doc.xref_set_key(xref, "Length", str(len(raw)))
+        entries[xref] = (True, f.tell(), gen)
+        f.write(f"{xref} {gen} obj\n".encode())
+        f.write(doc.xref_object(xref, compressed=True, ascii=True).encode("latin-1"))
+        if raw is not None:
+            f.write(b"\nstream\n" + raw + b"\nendstream")
+        f.write(b"\nendobj\n")
+
+    trailer = f"/Root {root}"
+    if info:
+        trailer += f"/Info {info}"
+    if file_id:
+        trailer += f"/ID{file_id}"
+    trailer += f"/Prev {prev_offset}"
+
+    xref_offset = f.tell()
+    if xref_stream:
+        # The xref stream is an object too and lists itself
+        entries[size] = (True, xref_offset, 0)
+        numbers = sorted(entries)
+        width = max(1, (xref_offset.bit_length() + 7) // 8)
+        rows = b"".join(
+            (1 if in_use else 0).to_bytes(1, "big") + offset.to_bytes(width, "big")
+            + gen.to_bytes(2, "big")
+            for in_use, offset, gen in (entries[n] for n in numbers)
+        )
+        data = zlib.compress(rows)
+        index = " ".join(f"{first} {count}" for first, count in _runs(numbers))
+        f.write(f"{size} 0 obj\n<</Type/XRef/Size {size + 1}/W[1 {width} 2]/Index[{index}]"
+                f"{trailer}/Filter/FlateDecode/Length {len(data)}>>\nstream\n".encode())
+        f.write(data + b"\nendstream\nendobj\n")
+    else:
+        numbers = sorted(entries)
+        lines = ["xref"]
+        for first, count in _runs(numbers):
+            lines.append(f"{first} {count}")
+            for n in range(first, first + count):
+                in_use, offset, gen = entries[n]
+                lines.append(f"{offset:010d} {gen:05d} {'n' if in_use else 'f'} ")
+        f.write(("\n".join(lines) + f"\ntrailer\n<</Size {size}{trailer}>>\n").encode())
+    f.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+    return f.tell()
@@ -0,0 +1,367 @@
+"""
+Job progress for long-running conversions, streamed as Server-Sent Events.
+
+The browser picks a job id, sends it with the upload as the 'job_id' POST
+field and opens GET /progress/<job_id>/ at the same time. The view wraps
+the tool call in `track(job_id)` and passes the callback it yields as the
+tool's `progress` argument:
+
+    with progress.track(request.POST.get("job_id")) as report:
+        pdf_to_word_exact(input_path, output_path, progress=report)
+
+Tools call `report(done, total, bytes_written)`; every change is pushed
+to the SSE stream until the job finishes, fails or is cancelled.
+
+A job is cancelled by POST /progress/<job_id>/cancel/ (the page's Cancel
+button, or a beacon when the tab is closed), or when its progress streams
+all disconnect and no client reconnects within DISCONNECT_GRACE_SECONDS.
+Views pass `cancel_token(job_id)` to tools as their `cancel` argument;
+tools call `cancel.check()` between pages, which raises Cancelled once
+the job is cancelled.
+
+Job state is kept in one SQLite file (settings.PROGRESS_DB_PATH, WAL
+mode) shared by every worker process of the server, so the upload, its
+progress stream and its cancel request may each reach a different
+worker. The worker running the job notices a cancel recorded by another
+one by reading the job's row, at most every CANCEL_POLL_SECONDS, when
+its token is looked at; progress streams read the row every
+STREAM_POLL_SECONDS.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Forget finished jobs after this many seconds
+JOB_TTL_SECONDS = 600
+# ...and jobs still marked running after this many (their worker died)
+STALE_JOB_SECONDS = 24 * 3600
+# Send an SSE comment at least this often so proxies keep the stream open
+HEARTBEAT_SECONDS = 15
+# Cancel a running job this long after its last progress stream closed,
+# unless a client reconnects (EventSource retries after a few seconds)
+DISCONNECT_GRACE_SECONDS = 10
+# How often a progress stream reads the job's state
+STREAM_POLL_SECONDS = 0.5
+# How often a cancel token reads the shared cancel flag
+CANCEL_POLL_SECONDS = 0.5
+# Progress reports closer together than this are not written down (the
+# stream would not show them anyway)
+REPORT_INTERVAL_SECONDS = 0.25
+
+FINISHED = ("done", "error", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    bytes_written INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    started REAL,
+    updated REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    cancelled INTEGER NOT NULL DEFAULT 0,
+    listeners INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs(updated);
+"""
+
+_local = threading.local()
+
+
+def db_path() -> Path:
+    return Path(getattr(settings, "PROGRESS_DB_PATH", Path(settings.MEDIA_ROOT) / "progress.sqlite3"))
+
+
+def _connection() -> sqlite3.Connection:
+    """
+    This thread's connection to the job database (created if needed).
+    """
+    path = db_path()
+    connections = _local.__dict__.setdefault("connections", {})
+    conn = connections.get(path)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        connections[path] = conn
+    return conn
+
+
+def _execute(sql: str, params=()):
+    return _connection().execute(sql, params)
+
+
+class Cancelled(Exception):
+    """
+    Raised by CancelToken.check() in a cancelled job.
+    """
+
+    status = 499  # client closed request
+
+
+class CancelToken:
+    """
+    Cancellation flag shared by a job's view and the tool doing the work.
+    Thread-safe.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled("Job cancelled.")
+
+
+class JobCancelToken(CancelToken):
+    """
+    CancelToken of a job: cancelling it records the cancel in the job's
+    row, and a cancel recorded there by any worker cancels it.
+    """
+
+    def __init__(self, job_id: str):
+        super().__init__()
+        self.job_id = job_id
+        self._next_poll = 0.0
+
+    def cancel(self):
+        super().cancel()
+        _execute("UPDATE jobs SET cancelled = 1 WHERE job_id = ?", (self.job_id,))
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        now = time.monotonic()
+        if now >= self._next_poll:
+            self._next_poll = now + CANCEL_POLL_SECONDS
+            row = _execute("SELECT cancelled FROM jobs WHERE job_id = ?", (self.job_id,)).fetchone()
+            if row is not None and row["cancelled"]:
+                self._event.set()
+        return self._event.is_set()
+
+
+class Job:
+    """
+    Handle on the progress state of one conversion (its row in the job
+    database). Any worker process may report, stream or cancel it.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.cancel_token = JobCancelToken(job_id)
+        self._last_report = 0.0
+
+    def _update(self, assignments: str, params=()):
+        _execute(f"UPDATE jobs SET {assignments}, updated = ?, version = version + 1 "
+                 f"WHERE job_id = ?", (*params, time.time(), self.job_id))
+
+    def start(self):
+        self._update("status = 'running', started = COALESCE(started, ?)", (time.time(),))
+
+    def report(self, done: int, total: int, bytes_written: int = 0):
+        now = time.monotonic()
+        if now - self._last_report < REPORT_INTERVAL_SECONDS and done < total:
+            return
+        self._last_report = now
+        self._update("status = 'running', started = COALESCE(started, ?), done = ?, total = ?, "
+                     "bytes_written = MAX(bytes_written, ?)",
+                     (time.time(), done, total, bytes_written))
+
+    def finish(self):
+        self._update("status = 'done', done = CASE WHEN total > 0 THEN total ELSE done END")
+
+    def fail(self, message: str):
+        self._update("status = 'error', message = ?", (message,))
+
+    def mark_cancelled(self):
+        self._update("status = 'cancelled', message = 'Cancelled.'")
+
+    def state(self):
+        """
+        The job's row as a dict, or None once it has been forgotten.
+        """
+        row = _execute("SELECT * FROM jobs WHERE job_id = ?", (self.job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def attach(self):
+        _execute("UPDATE jobs SET listeners = listeners + 1 WHERE job_id = ?", (self.job_id,))
+
+    def detach(self):
+        """
+        A progress stream closed. If it was the last one and the job is
+        still going, cancel it unless a client reconnects in time.
+        """
+        _execute("UPDATE jobs SET listeners = MAX(0, listeners - 1) WHERE job_id = ?",
+                 (self.job_id,))
+        if self._abandoned():
+            timer = threading.Timer(DISCONNECT_GRACE_SECONDS, self._cancel_if_abandoned)
+            timer.daemon = True
+            timer.start()
+
+    def _abandoned(self) -> bool:
+        state = self.state()
+        return state is not None and not state["listeners"] and state["status"] not in FINISHED
+
+    def _cancel_if_abandoned(self):
+        if self._abandoned():
+            self.cancel_token.cancel()
+
+    def snapshot(self, state=None):
+        """
+        What the progress stream sends: the public part of `state` (default
+        the current one) and an ETA.
+        """
+        state = state or self.state()
+        eta = None
+        if (state["status"] == "running" and state["started"]
+                and 0 < state["done"] < state["total"]):
+            elapsed = time.time() - state["started"]
+            eta = round(elapsed / state["done"] * (state["total"] - state["done"]), 1)
+        return {
+            "job_id": self.job_id,
+            "status": state["status"],
+            "done": state["done"],
+            "total": state["total"],
+            "bytes_written": state["bytes_written"],
+            "eta_seconds": eta,
+            "message": state["message"],
+        }
+
+
+def _purge_expired():
+    now = time.time()
+    _execute("DELETE FROM jobs WHERE updated < ? AND (status IN ('pending', 'done', 'error', "
+             "'cancelled') OR updated < ?)", (now - JOB_TTL_SECONDS, now - STALE_JOB_SECONDS))
+
+
+def get_job(job_id: str):
+    """
+    Return the Job for `job_id`, creating its row if needed (the SSE
+    stream may connect before the upload has finished arriving).
+    """
+    _purge_expired()
+    _execute("INSERT OR IGNORE INTO jobs (job_id, updated) VALUES (?, ?)", (job_id, time.time()))
+    return Job(job_id)
+
+
+def cancel_token(job_id: str = None):
+    """
+    The CancelToken of `job_id`, or None without a valid job id.
+    """
+    if not job_id or not JOB_ID_RE.match(job_id):
+        return None
+    return get_job(job_id).cancel_token
+
+
+def _noop(done, total, bytes_written=0):
+    pass
+
+
+@contextmanager
+def track(job_id: str = None):
+    """
+    Yield a progress callback for `job_id` and mark the job done / failed /
+    cancelled when the block exits. Without a valid job id the callback is
+    a no-op.
+    """
+    if not job_id or not JOB_ID_RE.match(job_id):
+        yield _noop
+        return
+
+    job = get_job(job_id)
+    job.start()
+    try:
+        yield job.report
+    except Cancelled:
+        job.mark_cancelled()
+        raise
+    except Exception as e:
+        job.fail(str(e) or type(e).__name__)
+        raise
+    else:
+        job.finish()
+
+
+def _event_stream(job: Job):
+    # The server closes this generator when the client has gone away (a
+    # write fails), which is how a closed tab is noticed
+    job.attach()
+    try:
+        version = -1
+        last_sent = time.monotonic()
+        while True:
+            state = job.state()
+            if state is None:
+                return  # forgotten (expired)
+            if state["version"] != version:
+                version = state["version"]
+                last_sent = time.monotonic()
+                yield f"data: {json.dumps(job.snapshot(state))}\n\n"
+                if state["status"] in FINISHED:
+                    return
+            elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+                if time.time() - state["updated"] > JOB_TTL_SECONDS:
+                    return  # abandoned: no upload ever arrived for this id
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            time.sleep(STREAM_POLL_SECONDS)
+    finally:
+        job.detach()
+
+
+def progress_stream_view(request, job_id):
+    """
+    GET /progress/<job_id>/ -> text/event-stream of progress snapshots.
+    """
+    if not JOB_ID_RE.match(job_id):
+        return HttpResponseBadRequest("Invalid job id.")
+
+    response = StreamingHttpResponse(_event_stream(get_job(job_id)),
+                                     content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
+
+
+# Sent with navigator.sendBeacon() from a closing tab, which can't add the
+# CSRF header; the job id itself is an unguessable 128-bit secret
+@csrf_exempt
+@require_POST
+def cancel_job_view(request, job_id):
+    """
+    POST /progress/<job_id>/cancel/ -> cancel the job; 202 with its state.
+    The tool stops at its next page and the upload request is answered
+    with a 499.
+    """
+    if not JOB_ID_RE.match(job_id):
+        return HttpResponseBadRequest("Invalid job id.")
+
+    job = get_job(job_id)
+    job.cancel_token.cancel()
+    return JsonResponse(job.snapshot(), status=202)
@@ -0,0 +1,151 @@
+# python -m pdfapp.remove_pages Files\Final_Thesis.pdf "1,3-5,7-8"
+
+import fitz  # PyMuPDF
+import os
+import argparse
+
+from .metrics import phase, record_pages
+from .pdf_writer import copy_for_update, save_incremental, save_pdf
+
+
+def parse_remove_spec(spec: str, num_pages: int):
+    """
+    Parse a string like:
+      "5"
+      "3-7"
+      "1-2,5,7-9"
+    into a sorted list of 0-based page indices to remove.
+
+    Pages are 1-based in the spec, but we convert to 0-based for PyMuPDF.
+    """
+    spec = spec.strip()
+    if not spec:
+        return []
+
+    pages_to_remove = set()
+
+    tokens = spec.split(",")
+    for token in tokens:
+        token = token.strip()
+        if not token:
+            continue
+
+        if "-" in token:
+            start_str, end_str = token.split("-", 1)
+            start = int(start_str.strip())
+            end = int(end_str.strip())
+        else:
+            start = end = int(token)
+
+        if start < 1 or end > num_pages or start > end:
+            raise ValueError(
+                f"Invalid page / range '{token}' for PDF with {num_pages} pages."
+            )
+
+        for p in range(start, end + 1):
+            pages_to_remove.add(p - 1)  # convert to 0-based
+
+    return sorted(pages_to_remove)
+
+
+def remove_pages(input_path: str, remove_spec: str, output_path: str = None, profile=None,
+                 incremental: bool = False):
+    """
+    Write input_path without the pages of remove_spec to output_path.
+
+    With incremental=True and no profile, the input is copied to
+    output_path (or edited in place when they are the same file) and the
+    change is appended as an incremental update: only the page tree is
+    written, however big the file is. The removed pages' data stays in
+    the file. Passing a profile asks for a compacted file and always
+    rewrites it.
+    """
+    with phase("open"):
+        doc = fitz.open(input_path)
+    if doc.needs_pass:
+        doc.close()
+        raise ValueError("PDF is password protected. Unlock it first.")
+    num_pages = doc.page_count
+    record_pages("remove_pages", num_pages)
+
+    to_remove = parse_remove_spec(remove_spec, num_pages)
+    print(f"Total pages: {num_pages}")
+    print(f"Pages to remove (0-based): {to_remove}")
+
+    if not to_remove:
+        print("No pages to remove. Exiting without changes.")
+        doc.close()
+        return
+
+    if len(to_remove) == num_pages:
+        doc.close()
+        raise ValueError("Remove spec would delete all pages. Refusing to create empty PDF.")
+
+    # Output path
+    if output_path is None:
+        base_dir = os.path.dirname(os.path.abspath(input_path)) or "."
+        base_name, ext = os.path.splitext(os.path.basename(input_path))
+        output_path = os.path.join(base_dir, f"{base_name}_removed{ext or '.pdf'}")
+
+    if incremental and profile is None:
+        doc.close()
+        in_place = os.path.exists(output_path) and os.path.samefile(input_path, output_path)
+        if not in_place:
+            with phase("copy"):
+                copy_for_update(input_path, output_path)
+        try:
+            doc = fitz.open(output_path)
+            try:
+                with phase("tool"):
+                    doc.delete_pages(to_remove)
+                with phase("save"):
+                    save_incremental(doc)
+            finally:
+                doc.close()
+        except BaseException:
+            if not in_place and os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        print(f"Updated: {output_path}")
+        return
+
+    # Deleting the removed pages (in one call: each call scans all links)
+    # is much quicker than select()ing the kept ones, which rewrites every
+    # page of a large document
+    with phase("tool"):
+        doc.delete_pages(to_remove)
+
+    # Save optimized
+    with phase("save"):
+        save_pdf(doc, output_path, profile)
+    doc.close()
+    print(f"Created: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Remove pages from a PDF (single pages, ranges, or combinations)."
+    )
+    parser.add_argument("input", help="Input PDF file path")
+    parser.add_argument("spec", help="Pages to remove, e.g. '5' or '3-7' or '1-2,5,7-9'")
+    parser.add_argument(
+        "-o", "--output",
+        help="Output PDF file path (default: <input>_removed.pdf in same folder)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Append the change to a copy of the input instead of rewriting it "
+             "(fast on large files, but the removed pages' data stays in the file)"
+    )
+    parser.add_argument(
+        "--in-place", action="store_true",
+        help="Update the input file itself (implies --incremental)"
+    )
+    args = parser.parse_args()
+
+    output = args.input if args.in_place else args.output
+    remove_pages(args.input, args.spec, output, incremental=args.incremental or args.in_place)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+Full-text search over the PDFs uploaded to the tools.
+
+Every upload is queued with `index_upload(path)`. A background thread
+hashes the file, reads its text page by page (extract_text.iter_page_text)
+and then writes it to a SQLite FTS5 table in one short transaction, so
+requests never wait for indexing. The text is read before the transaction
+starts: SQLite allows one writer per file, and a worker reading a long
+document must not hold the other workers' writes until they time out.
+
+Documents are keyed by the SHA-256 of their content: uploading the same
+file again (under any name) only records the new path. When a path is
+overwritten with different content, the old document is dropped once no
+path refers to it any more.
+
+    GET /search/?q=invoice+2024       -> documents and page numbers, best first
+    GET /search/?q=thes*&limit=5      -> prefix search
+
+The index holds every visitor's uploads (names and text), so /search/ is
+for staff users only (log in through /admin/); anyone else gets a 403.
+
+The index is one SQLite file (settings.SEARCH_INDEX_PATH) in WAL mode, so
+searches run while uploads are being indexed. With several worker
+processes, each one indexes its own uploads into the same file; SQLite
+serializes the writes.
+
+Uploads are read by MuPDF like any tool input, so the indexing thread
+reads their text through pdfapp.isolation, under the same memory, CPU and
+time limits. A PDF that hits a limit is recorded as unreadable (0 pages).
+
+    python -m pdfapp.search_index --db index.sqlite3 index media/uploads
+    python -m pdfapp.search_index --db index.sqlite3 search "final thesis"
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, JsonResponse
+
+from . import isolation
+from .extract_text import iter_page_text
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    pages INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paths (
+    path TEXT PRIMARY KEY,
+    doc_id INTEGER NOT NULL REFERENCES documents(id)
+);
+CREATE INDEX IF NOT EXISTS paths_doc_id ON paths(doc_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(
+    text,
+    doc_id UNINDEXED,
+    page UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2',
+    -- short prefix queries ('inv*') read one prefix entry instead of
+    -- merging every matching term
+    prefix = '2 3'
+);
+"""
+
+# Page hits fetched per query before grouping them by document
+MAX_PAGE_HITS = 1000
+# Matching pages ranked per query (the most recently indexed ones). Ranking
+# costs time per match, and a common word can match every page indexed.
+RANK_WINDOW = 10000
+# Documents returned by one search (the 'limit' query parameter is capped here)
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Page numbers listed per document in a search result, and how many of
+# them come with a text snippet
+MAX_PAGES_PER_RESULT = 50
+SNIPPETS_PER_RESULT = 3
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def connect(db_path) -> sqlite3.Connection:
+    """
+    Open the index (creating it if needed). Connections are cheap; open
+    one per thread / request.
+    """
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _drop_if_unreferenced(conn, doc_id: int):
+    if conn.execute("SELECT 1 FROM paths WHERE doc_id = ?", (doc_id,)).fetchone():
+        return
+    conn.execute("DELETE FROM page_text WHERE doc_id = ?", (doc_id,))
+    conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+
+def index_pdf(conn, pdf_path, name: str = None, sha256: str = None, reader=None) -> bool:
+    """
+    Add one PDF to the index under `name` (default: its path).
+    Returns True if its text was extracted, False if the same content was
+    already indexed and only the name was recorded.
+
+    `sha256` is the known hash of an immutable `pdf_path` (a content store
+    object): the file is then not hashed, nor checked for changes.
+    `reader` replaces read_pages() to read the text (see
+    _read_pages_isolated).
+
+    Password-protected or unreadable PDFs are recorded with 0 pages, so
+    they are not retried on every upload. If the file is overwritten while
+    it is being read, nothing is stored (the newer upload is indexed by
+    its own call) and False is returned.
+    """
+    name = name or str(pdf_path)
+    verify = sha256 is None
+    if verify:
+        sha256 = file_sha256(pdf_path)
+    size = os.path.getsize(pdf_path)
+
+    pages, texts = 0, []
+    known = conn.execute("SELECT 1 FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+    if not known:
+        # Outside any transaction: reading a long document takes a while
+        pages, texts, error = (reader or read_pages)(str(pdf_path))
+        if verify and file_sha256(pdf_path) != sha256:
+            logger.info("%s changed while it was being indexed; skipped", name)
+            return False
+        if error:
+            logger.warning("Not indexing %s: %s", name, error)
+
+    with conn:
+        return _store(conn, name, sha256, size, pages, texts)
+
+
+def read_pages(pdf_path: str):
+    """
+    Read the text to index: (page count, [(page_number, text), ...] for
+    the pages with text, error message or None). A PDF that can't be read
+    to the end keeps the pages read before the error.
+    """
+    pages, texts = 0, []
+    try:
+        for page_number, text in iter_page_text(pdf_path):
+            if text.strip():
+                texts.append((page_number, text))
+            pages = page_number
+    except (RuntimeError, ValueError) as e:  # fitz.FileDataError is a RuntimeError
+        return pages, texts, str(e)
+    return pages, texts, None
+
+
+def _read_pages_isolated(pdf_path: str):
+    """
+    read_pages() in an isolated child (pdfapp.isolation); a PDF that hits
+    a limit reads as unreadable instead of being retried on every upload.
+    """
+    try:
+        return isolation.run(read_pages, pdf_path)
+    except isolation.ToolFailed as e:
+        return 0, [], str(e)
+
+
+def _store(conn, name: str, sha256: str, size: int, pages: int, texts) -> bool:
+    """
+    index_pdf() writes; runs inside one transaction.
+    """
+    row = conn.execute("SELECT doc_id FROM paths WHERE path = ?", (name,)).fetchone()
+    old_doc_id = row[0] if row else None
+
+    # Looked up again: another worker may have indexed the same content
+    # while this one was reading it
+    row = conn.execute("SELECT id FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+    extracted = row is None
+    if extracted:
+        doc_id = conn.execute(
+            "INSERT INTO documents (sha256, pages, size, indexed_at) VALUES (?, ?, ?, ?)",
+            (sha256, pages, size, time.time()),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO page_text (text, doc_id, page) VALUES (?, ?, ?)",
+            ((text, doc_id, page_number) for page_number, text in texts),
+        )
+    else:
+        doc_id = row[0]
+
+    conn.execute("INSERT OR REPLACE INTO paths (path, doc_id) VALUES (?, ?)", (name, doc_id))
+    if old_doc_id is not None and old_doc_id != doc_id:
+        _drop_if_unreferenced(conn, old_doc_id)
+
+    return extracted
+
+
+def _fts_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query: every word must appear (in any
+    order); a trailing '*' keeps prefix matching. Quoting each word stops
+    FTS5 operators and punctuation in user input from being parsed.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search(conn, query: str, limit: int = DEFAULT_LIMIT):
+    """
+    Return up to `limit` documents matching `query`, best match first:
+    [{"sha256", "paths", "page_count",
+      "pages": [matching page numbers, best first],
+      "snippets": [{"page", "text"}, ...]}, ...]
+
+    Only the RANK_WINDOW most recently indexed matching pages are ranked,
+    which keeps words that occur on nearly every page fast.
+    """
+    fts_query = _fts_query(query)
+    if not fts_query:
+        return []
+
+    hits = conn.execute(
+        """
+        SELECT rowid, doc_id, page
+        FROM page_text
+        WHERE page_text MATCH ?1
+          AND rowid >= coalesce((SELECT rowid FROM page_text WHERE page_text MATCH ?1
+                                 ORDER BY rowid DESC LIMIT 1 OFFSET ?2), 0)
+        ORDER BY rank
+        LIMIT ?3
+        """,
+        (fts_query, RANK_WINDOW, MAX_PAGE_HITS),
+    ).fetchall()
+
+    results = {}
+    snippet_rows = {}
+    for rowid, doc_id, page in hits:
+        result = results.get(doc_id)
+        if result is None:
+            if len(results) >= limit:
+                continue
+            result = results[doc_id] = {"pages": [], "snippets": []}
+        if len(result["pages"]) < SNIPPETS_PER_RESULT:
+            snippet_rows[rowid] = (doc_id, page)
+        if len(result["pages"]) < MAX_PAGES_PER_RESULT:
+            result["pages"].append(page)
+
+    # snippet() re-reads the page text, so only build the few we return
+    if snippet_rows:
+        placeholders = ",".join("?" * len(snippet_rows))
+        snippets = dict(conn.execute(
+            f"""
+            SELECT rowid, snippet(page_text, 0, '[', ']', '...', 12)
+            FROM page_text
+            WHERE page_text MATCH ? AND rowid IN ({placeholders})
+            """,
+            (fts_query, *snippet_rows),
+        ).fetchall())
+        for rowid, (doc_id, page) in snippet_rows.items():
+            results[doc_id]["snippets"].append({"page": page, "text": snippets.get(rowid, "")})
+
+    for doc_id, result in results.items():
+        sha256, page_count = conn.execute(
+            "SELECT sha256, pages FROM documents WHERE id = ?", (doc_id,)
+        ).fetchone()
+        result["sha256"] = sha256
+        result["page_count"] = page_count
+        result["paths"] = [row[0] for row in conn.execute(
+            "SELECT path FROM paths WHERE doc_id = ? ORDER BY path", (doc_id,)
+        )]
+    return list(results.values())
+
+
+# ---------- Django views / upload hook ----------
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+# The indexing thread keeps one connection open
+_writer = threading.local()
+
+
+def index_path():
+    return getattr(settings, "SEARCH_INDEX_PATH", Path(settings.MEDIA_ROOT) / "search_index.sqlite3")
+
+
+def _index_in_background(path: str, name: str, sha256: str = None):
+    try:
+        if getattr(_writer, "conn", None) is None:
+            _writer.conn = connect(index_path())
+        index_pdf(_writer.conn, path, name, sha256, reader=_read_pages_isolated)
+    except Exception:
+        logger.exception("Indexing %s failed", name)
+
+
+def index_upload(path, uploaded_file=None):
+    """
+    Queue an uploaded PDF for indexing and return immediately. Uploads are
+    indexed one at a time, in arrival order, on a background thread.
+
+    When `uploaded_file` came through the content store its hash is reused
+    and the text is read from the (immutable) store object.
+    """
+    path = Path(path)
+    if path.suffix.lower() != ".pdf":
+        return
+    try:
+        name = path.relative_to(settings.MEDIA_ROOT).as_posix()
+    except ValueError:
+        name = str(path)
+    sha256 = getattr(uploaded_file, "sha256", None)
+    if sha256 is not None:
+        _executor.submit(_index_in_background, str(uploaded_file.store_path), name, sha256)
+    else:
+        _executor.submit(_index_in_background, str(path), name)
+
+
+def search_view(request):
+    """
+    GET /search/?q=<words>[&limit=N] -> JSON list of matching documents
+    with the pages (and a snippet of each page) where the words appear.
+    Staff only: the results show other people's uploads.
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden("Search is only available to staff users.")
+
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return HttpResponseBadRequest("Please provide a search query ('q').")
+    try:
+        limit = max(1, min(MAX_LIMIT, int(request.GET.get("limit", DEFAULT_LIMIT))))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+
+    t0 = time.perf_counter()
+    conn = connect(index_path())
+    try:
+        results = search(conn, query, limit=limit)
+    finally:
+        conn.close()
+    return JsonResponse({
+        "query": query,
+        "results": results,
+        "milliseconds": round((time.perf_counter() - t0) * 1000, 1),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text index of PDF files.")
+    parser.add_argument("--db", default="search_index.sqlite3", help="Index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_index = sub.add_parser("index", help="Add PDFs (files or folders) to the index")
+    p_index.add_argument("paths", nargs="+")
+    p_search = sub.add_parser("search", help="Search the index")
+    p_search.add_argument("query")
+    p_search.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "index":
+        for arg in args.paths:
+            arg = Path(arg)
+            pdfs = sorted(arg.rglob("*.pdf")) if arg.is_dir() else [arg]
+            for pdf in pdfs:
+                try:
+                    extracted = index_pdf(conn, pdf)
+                except Exception as e:
+                    print(f"Failed: {pdf} ({e})")
+                    continue
+                print(f"{'Indexed' if extracted else 'Already indexed'}: {pdf}")
+    else:
+        for result in search(conn, args.query, limit=args.limit):
+            pages = ", ".join(str(p) for p in result["pages"])
+            print(f"{'; '.join(result['paths'])}  (pages {pages})")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
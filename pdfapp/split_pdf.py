@@ -0,0 +1,266 @@
+# python -m pdfapp.split_pdf Files\Final_Thesis.pdf "1-2,3-4"
+
+
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import fitz  # PyMuPDF
+import math
+import multiprocessing
+import os
+import argparse
+
+from .metrics import phase, record_pages
+from .pdf_writer import save_pdf
+
+
+def parse_split_spec(spec: str, num_pages: int):
+    """
+    Parse user split string into list of (start, end) page ranges.
+
+    Modes:
+
+    1) Just page numbers (no '-'):
+       e.g. "5"            -> cutpoints [5]       -> [1-5], [6-last]
+            "2,4,10"       -> cutpoints [2,4,10]  -> [1-2], [3-4], [5-10], [11-last]
+
+    2) Explicit ranges (contains '-'):
+       e.g. "1-2,3-4"      -> explicit [1-2],[3-4] + remainder [5-last]
+    """
+    spec = spec.strip()
+    if not spec:
+        return [(1, num_pages)]
+
+    # If there is no '-' anywhere, treat it as cutpoints list
+    if "-" not in spec:
+        cutpoints = []
+        for token in spec.split(","):
+            token = token.strip()
+            if not token:
+                continue
+            p = int(token)
+            if p < 1 or p >= num_pages:
+                raise ValueError(f"Cutpoint {p} out of range 1..{num_pages-1}")
+            cutpoints.append(p)
+
+        cutpoints = sorted(set(cutpoints))
+        ranges = []
+        start = 1
+        for cp in cutpoints:
+            ranges.append((start, cp))
+            start = cp + 1
+        if start <= num_pages:
+            ranges.append((start, num_pages))
+        return ranges
+
+    # Else: treat as explicit ranges like "1-2,3-4"
+    ranges = []
+    last_end = 0
+    for token in spec.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        if "-" not in token:
+            # single page as range p-p
+            start = end = int(token)
+        else:
+            s, e = token.split("-", 1)
+            start = int(s.strip())
+            end = int(e.strip())
+
+        if start < 1 or end > num_pages or start > end:
+            raise ValueError(f"Invalid range '{token}' for PDF with {num_pages} pages.")
+        ranges.append((start, end))
+        last_end = max(last_end, end)
+
+    ranges = sorted(ranges, key=lambda x: x[0])
+
+    # Add remainder after last explicit range, if any
+    if last_end < num_pages:
+        ranges.append((last_end + 1, num_pages))
+
+    return ranges
+
+
+# Below this many pages, starting worker processes costs more than it saves.
+PARALLEL_MIN_PAGES = 50
+
+# How often the parallel path looks at the cancel token
+CANCEL_POLL_SECONDS = 0.25
+
+# Pool workers: set when the split is cancelled (see _init_worker)
+_stop_event = None
+
+
+def _write_part(doc, start: int, end: int, out_path: str, optimize: bool = True,
+                profile=None, stop=None):
+    """
+    Write pages start..end (1-based, inclusive) of `doc` to out_path.
+
+    With optimize, each part only keeps what its own pages use: content
+    streams are cleaned (which also drops resources the page never
+    references), fonts are subset to the glyphs used, and the file is
+    saved with the given output profile (default: garbage collection +
+    deflate). Without it, parts are written with the 'fast' profile
+    unless another one is given.
+
+    `stop()` is asked before each page is cleaned; when it returns True
+    the part is abandoned unwritten and False is returned.
+    """
+    new_doc = fitz.open()
+    # PyMuPDF pages are 0-based
+    new_doc.insert_pdf(doc, from_page=start - 1, to_page=end - 1)
+    if optimize:
+        for page in new_doc:
+            if stop is not None and stop():
+                new_doc.close()
+                return False
+            page.clean_contents()
+        new_doc.subset_fonts()
+    elif profile is None:
+        profile = "fast"
+    save_pdf(new_doc, out_path, profile)
+    new_doc.close()
+    return True
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _write_parts_worker(input_path: str, jobs, optimize: bool, profile=None):
+    """
+    Process-pool entry point: open the source once, write a batch of parts.
+    """
+    doc = fitz.open(input_path)
+    try:
+        stop = _stop_event.is_set if _stop_event is not None else None
+        for start, end, out_path in jobs:
+            if stop is not None and stop():
+                break
+            if not _write_part(doc, start, end, out_path, optimize, profile, stop):
+                break
+            print(f"  -> Created: {out_path}")
+    finally:
+        doc.close()
+
+
+def _write_parts_parallel(input_path: str, jobs, optimize: bool, profile, workers: int,
+                          cancel=None):
+    """
+    Write the parts on a pool of `workers` processes. Once `cancel` is
+    cancelled, queued batches are dropped and running ones stop before
+    their next part.
+    """
+    # A few batches per worker: balances uneven part sizes without
+    # re-opening the source for every single part.
+    per_task = math.ceil(len(jobs) / (workers * 4))
+    batches = [jobs[i:i + per_task] for i in range(0, len(jobs), per_task)]
+    stop_event = multiprocessing.Event() if cancel is not None else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(stop_event,)) as pool:
+        pending = {pool.submit(_write_parts_worker, input_path, b, optimize, profile)
+                   for b in batches}
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED,
+                                     timeout=CANCEL_POLL_SECONDS if cancel is not None else None)
+            if cancel is not None and cancel.cancelled:
+                stop_event.set()
+                for future in pending:
+                    future.cancel()
+                return
+            for future in finished:
+                future.result()
+
+
+def split_pdf(input_path: str, split_spec: str, output_dir: str = None,
+              optimize: bool = True, workers: int = 1, profile=None, cancel=None):
+    """
+    Split a PDF into parts described by split_spec.
+
+    optimize: size-optimize every part (see _write_part), so the parts
+              together stay close to the original size.
+    workers:  processes writing parts in parallel.
+    profile:  output profile for every part, see pdf_writer.PROFILES.
+    cancel:   optional token (pdfapp.progress.CancelToken), looked at
+              before each part; cancel.check() raises once it is
+              cancelled. A split that fails or is cancelled removes the
+              parts it wrote.
+    """
+    with phase("open"):
+        doc = fitz.open(input_path)
+    if doc.needs_pass:
+        doc.close()
+        raise ValueError("PDF is password protected. Unlock it first.")
+    num_pages = doc.page_count
+    record_pages("split_pdf", num_pages)
+
+    ranges = parse_split_spec(split_spec, num_pages)
+    print(f"Total pages: {num_pages}")
+    print("Splitting into ranges:", ranges)
+
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(input_path)) or "."
+    os.makedirs(output_dir, exist_ok=True)
+
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+
+    jobs = []
+    for idx, (start, end) in enumerate(ranges, start=1):
+        out_name = f"{base_name}_part{idx}_{start}-{end}.pdf"
+        jobs.append((start, end, os.path.join(output_dir, out_name)))
+
+    workers = max(1, min(workers, len(jobs)))
+    try:
+        if workers == 1 or num_pages < PARALLEL_MIN_PAGES:
+            try:
+                for start, end, out_path in jobs:
+                    if cancel is not None:
+                        cancel.check()
+                    with phase("save"):
+                        _write_part(doc, start, end, out_path, optimize, profile,
+                                    stop=(lambda: cancel.cancelled) if cancel is not None else None)
+                    if cancel is not None:
+                        cancel.check()
+                    print(f"  -> Created: {out_path}")
+            finally:
+                doc.close()
+        else:
+            doc.close()
+            with phase("save"):
+                _write_parts_parallel(input_path, jobs, optimize, profile, workers, cancel)
+            if cancel is not None:
+                cancel.check()
+    except BaseException:
+        for _start, _end, out_path in jobs:
+            if os.path.exists(out_path):
+                os.remove(out_path)
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Split a PDF into multiple PDFs based on page ranges / cutpoints."
+    )
+    parser.add_argument("input", help="Input PDF file path")
+    parser.add_argument("spec", help="Split spec, e.g. '5' or '1-2,3-4'")
+    parser.add_argument(
+        "-o", "--output-dir",
+        help="Directory to save split PDFs (default: same as input)"
+    )
+    parser.add_argument(
+        "--no-optimize", action="store_true",
+        help="Skip per-part cleanup / font subsetting (faster, larger parts)"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=os.cpu_count() or 1,
+        help="Parallel processes writing parts (default: CPU count)"
+    )
+    args = parser.parse_args()
+
+    split_pdf(args.input, args.spec, args.output_dir,
+              optimize=not args.no_optimize, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,758 @@
+// ===== Page-level PDF edits in the browser =====
+// Extract, remove, split and merge only move pages between files, so for
+// small PDFs the page does them itself instead of uploading to the server.
+//
+// A PdfDocument reads the cross-reference table / stream (and object
+// streams), walks the page tree, and writes new files that contain only
+// the objects the chosen pages reach. Page specs use the same grammar and
+// error messages as parse_extract_spec / parse_remove_spec /
+// parse_split_spec on the server.
+//
+// Anything this reader doesn't handle (encryption, unusual filters,
+// damaged cross-references) throws PdfError: the caller then sends the
+// file to the server, where MuPDF repairs what it can.
+
+(function (global) {
+  'use strict';
+
+  class PdfError extends Error {}
+  class EncryptedPdfError extends PdfError {}
+  // Invalid page spec (the server would answer the same)
+  class SpecError extends Error {}
+
+  class Name { constructor(raw) { this.raw = raw; } }      // raw text, with '/'
+  class Str { constructor(raw) { this.raw = raw; } }       // raw text, with delimiters
+  class Ref {
+    constructor(num, gen) { this.num = num; this.gen = gen; }
+    get key() { return this.num + ' ' + this.gen; }
+  }
+  class Stream { constructor(dict, data) { this.dict = dict; this.data = data; } }
+
+  const WHITESPACE = new Set([0, 9, 10, 12, 13, 32]);
+  const DELIMITERS = new Set(Array.from('()<>[]{}/%', c => c.charCodeAt(0)));
+  const INHERITABLE = ['Resources', 'MediaBox', 'CropBox', 'Rotate'];
+
+  function latin1(bytes, start, end) {
+    let s = '';
+    for (let i = start; i < end; i += 0x8000) {
+      s += String.fromCharCode.apply(null, bytes.subarray(i, Math.min(end, i + 0x8000)));
+    }
+    return s;
+  }
+
+  function latin1Bytes(s) {
+    const out = new Uint8Array(s.length);
+    for (let i = 0; i < s.length; i++) out[i] = s.charCodeAt(i) & 0xff;
+    return out;
+  }
+
+  function indexOf(bytes, word, from, to = bytes.length) {
+    const first = word.charCodeAt(0);
+    outer: for (let i = from; i <= to - word.length; i++) {
+      if (bytes[i] !== first) continue;
+      for (let j = 1; j < word.length; j++) {
+        if (bytes[i + j] !== word.charCodeAt(j)) continue outer;
+      }
+      return i;
+    }
+    return -1;
+  }
+
+  class Parser {
+    constructor(bytes, pos) {
+      this.bytes = bytes;
+      this.pos = pos;
+    }
+
+    skipWs() {
+      const b = this.bytes;
+      while (this.pos < b.length) {
+        const c = b[this.pos];
+        if (WHITESPACE.has(c)) {
+          this.pos++;
+        } else if (c === 37) {  // % comment
+          while (this.pos < b.length && b[this.pos] !== 10 && b[this.pos] !== 13) this.pos++;
+        } else {
+          break;
+        }
+      }
+    }
+
+    startsWith(word) {
+      return indexOf(this.bytes, word, this.pos, this.pos + word.length) === this.pos;
+    }
+
+    token() {
+      const b = this.bytes;
+      const start = this.pos;
+      while (this.pos < b.length && !WHITESPACE.has(b[this.pos]) && !DELIMITERS.has(b[this.pos])) {
+        this.pos++;
+      }
+      return latin1(b, start, this.pos);
+    }
+
+    int() {
+      this.skipWs();
+      const t = this.token();
+      if (!/^[+-]?\d+$/.test(t)) throw new PdfError('Expected an integer at offset ' + this.pos);
+      return parseInt(t, 10);
+    }
+
+    keyword(word) {
+      this.skipWs();
+      if (this.token() !== word) throw new PdfError(`Expected '${word}' at offset ${this.pos}`);
+    }
+
+    parse() {
+      this.skipWs();
+      const b = this.bytes;
+      if (this.pos >= b.length) throw new PdfError('Unexpected end of file');
+      const c = b[this.pos];
+
+      if (c === 47) {  // /Name
+        const start = this.pos++;
+        this.token();
+        return new Name(latin1(b, start, this.pos));
+      }
+      if (c === 40) {  // (literal string)
+        const start = this.pos++;
+        let depth = 1;
+        while (this.pos < b.length && depth) {
+          const ch = b[this.pos++];
+          if (ch === 92) this.pos++;
+          else if (ch === 40) depth++;
+          else if (ch === 41) depth--;
+        }
+        return new Str(latin1(b, start, this.pos));
+      }
+      if (c === 60 && b[this.pos + 1] === 60) {  // << dict >>
+        this.pos += 2;
+        const dict = new Map();
+        for (;;) {
+          this.skipWs();
+          if (b[this.pos] === 62 && b[this.pos + 1] === 62) {
+            this.pos += 2;
+            return dict;
+          }
+          const key = this.parse();
+          if (!(key instanceof Name)) throw new PdfError('Dictionary key is not a name');
+          dict.set(key.raw.slice(1), this.parse());
+        }
+      }
+      if (c === 60) {  // <hex string>
+        const end = indexOf(b, '>', this.pos);
+        if (end < 0) throw new PdfError('Unterminated hex string');
+        const start = this.pos;
+        this.pos = end + 1;
+        return new Str(latin1(b, start, this.pos));
+      }
+      if (c === 91) {  // [ array ]
+        this.pos++;
+        const items = [];
+        for (;;) {
+          this.skipWs();
+          if (b[this.pos] === 93) {
+            this.pos++;
+            return items;
+          }
+          items.push(this.parse());
+        }
+      }
+
+      const t = this.token();
+      if (/^[+-]?\d+$/.test(t)) {
+        // "num gen R" is a reference
+        const save = this.pos;
+        this.skipWs();
+        const gen = this.token();
+        if (/^\d+$/.test(gen)) {
+          this.skipWs();
+          if (this.token() === 'R') return new Ref(parseInt(t, 10), parseInt(gen, 10));
+        }
+        this.pos = save;
+        return parseInt(t, 10);
+      }
+      if (/^[+-]?(\d+\.?\d*|\.\d+)$/.test(t)) return parseFloat(t);
+      if (t === 'true') return true;
+      if (t === 'false') return false;
+      if (t === 'null') return null;
+      throw new PdfError(`Unexpected token '${t || String.fromCharCode(c)}' at offset ${this.pos}`);
+    }
+  }
+
+  async function inflate(data) {
+    const stream = new Blob([data]).stream().pipeThrough(new DecompressionStream('deflate'));
+    return new Uint8Array(await new Response(stream).arrayBuffer());
+  }
+
+  function unpredict(data, params) {
+    const predictor = params && params.get('Predictor') || 1;
+    if (predictor < 10) {
+      if (predictor !== 1) throw new PdfError('Unsupported predictor ' + predictor);
+      return data;
+    }
+    const colors = params.get('Colors') || 1;
+    const bpc = params.get('BitsPerComponent') || 8;
+    const columns = params.get('Columns') || 1;
+    const bpp = Math.max(1, Math.ceil(colors * bpc / 8));
+    const rowLength = Math.ceil(colors * bpc * columns / 8);
+    const rows = Math.floor(data.length / (rowLength + 1));
+    const out = new Uint8Array(rows * rowLength);
+    for (let r = 0; r < rows; r++) {
+      const type = data[r * (rowLength + 1)];
+      const src = r * (rowLength + 1) + 1;
+      const dst = r * rowLength;
+      for (let i = 0; i < rowLength; i++) {
+        const left = i >= bpp ? out[dst + i - bpp] : 0;
+        const up = r > 0 ? out[dst + i - rowLength] : 0;
+        const upLeft = r > 0 && i >= bpp ? out[dst + i - rowLength - bpp] : 0;
+        let v = data[src + i];
+        if (type === 1) v += left;
+        else if (type === 2) v += up;
+        else if (type === 3) v += (left + up) >> 1;
+        else if (type === 4) {
+          const p = left + up - upLeft;
+          const pa = Math.abs(p - left), pb = Math.abs(p - up), pc = Math.abs(p - upLeft);
+          v += pa <= pb && pa <= pc ? left : pb <= pc ? up : upLeft;
+        }
+        out[dst + i] = v & 0xff;
+      }
+    }
+    return out;
+  }
+
+  class PdfDocument {
+    constructor(bytes) {
+      this.bytes = bytes;
+      this.xref = new Map();      // num -> {type: 1, offset} | {type: 2, stream, index}
+      this.cache = new Map();     // num -> parsed object
+      this.objectStreams = new Map();  // stream num -> {parser data, offsets}
+      this.trailer = null;
+      this.pages = [];            // [{ref, inherited}]
+      this.pageKeys = new Set();
+      this.treeKeys = new Set();
+    }
+
+    static async open(bytes) {
+      const doc = new PdfDocument(bytes);
+      await doc._readXref();
+      if (doc.trailer.has('Encrypt')) throw new EncryptedPdfError('PDF is password protected.');
+      await doc._readObjectStreams();
+      doc._readPages();
+      return doc;
+    }
+
+    get pageCount() {
+      return this.pages.length;
+    }
+
+    async _readXref() {
+      const b = this.bytes;
+      const tail = Math.max(0, b.length - 2048);
+      let at = -1;
+      for (let i = indexOf(b, 'startxref', tail); i >= 0; i = indexOf(b, 'startxref', i + 1)) at = i;
+      if (at < 0) throw new PdfError('No startxref');
+      const p = new Parser(b, at + 9);
+      let offset = p.int();
+
+      const seen = new Set();
+      while (offset !== undefined && offset !== null && !seen.has(offset)) {
+        seen.add(offset);
+        const section = new Parser(b, offset);
+        section.skipWs();
+        let trailer;
+        if (section.startsWith('xref')) {
+          trailer = this._readXrefTable(section);
+          const hybrid = trailer.get('XRefStm');
+          if (Number.isInteger(hybrid)) await this._readXrefStream(hybrid);
+        } else {
+          trailer = await this._readXrefStream(offset);
+        }
+        if (!this.trailer) this.trailer = trailer;
+        offset = trailer.get('Prev');
+      }
+      if (!this.trailer || !this.trailer.has('Root')) throw new PdfError('No trailer');
+    }
+
+    _readXrefTable(p) {
+      p.pos += 4;
+      for (;;) {
+        p.skipWs();
+        if (p.startsWith('trailer')) break;
+        const first = p.int();
+        const count = p.int();
+        for (let i = 0; i < count; i++) {
+          const offset = p.int();
+          p.int();
+          p.skipWs();
+          const kind = p.token();
+          // Newest section wins; free entries are skipped, so hybrid
+          // files find their compressed objects in the XRefStm
+          if (kind === 'n' && !this.xref.has(first + i)) {
+            this.xref.set(first + i, { type: 1, offset });
+          } else if (kind !== 'n' && kind !== 'f') {
+            throw new PdfError('Bad xref entry');
+          }
+        }
+      }
+      p.pos += 7;
+      return p.parse();
+    }
+
+    async _readXrefStream(offset) {
+      const stream = this._parseIndirect(offset).obj;
+      if (!(stream instanceof Stream)) throw new PdfError('Bad xref stream');
+      const dict = stream.dict;
+      const data = await this._decode(stream);
+      const widths = dict.get('W');
+      const size = dict.get('Size');
+      const index = dict.get('Index') || [0, size];
+      const rowLength = widths.reduce((a, w) => a + w, 0);
+      let pos = 0;
+      const field = (width, fallback) => {
+        if (!width) return fallback;
+        let v = 0;
+        for (let i = 0; i < width; i++) v = v * 256 + data[pos++];
+        return v;
+      };
+      for (let s = 0; s < index.length; s += 2) {
+        for (let i = 0; i < index[s + 1]; i++) {
+          if (pos + rowLength > data.length) throw new PdfError('Short xref stream');
+          const type = field(widths[0], 1);
+          const a = field(widths[1], 0);
+          const c = field(widths[2], 0);
+          const num = index[s] + i;
+          if (this.xref.has(num) || type === 0) continue;
+          if (type === 1) this.xref.set(num, { type: 1, offset: a });
+          else if (type === 2) this.xref.set(num, { type: 2, stream: a, index: c });
+        }
+      }
+      return dict;
+    }
+
+    async _readObjectStreams() {
+      const containers = new Set();
+      for (const entry of this.xref.values()) {
+        if (entry.type === 2) containers.add(entry.stream);
+      }
+      for (const num of containers) {
+        const stream = this.get(new Ref(num, 0));
+        if (!(stream instanceof Stream)) throw new PdfError('Bad object stream ' + num);
+        const data = await this._decode(stream);
+        const header = new Parser(data, 0);
+        const offsets = [];
+        for (let i = 0; i < stream.dict.get('N'); i++) {
+          offsets.push([header.int(), header.int()]);
+        }
+        this.objectStreams.set(num, { data, first: stream.dict.get('First'), offsets });
+      }
+    }
+
+    async _decode(stream) {
+      let filters = this.resolve(stream.dict.get('Filter'));
+      let params = this.resolve(stream.dict.get('DecodeParms'));
+      if (!filters) return stream.data;
+      if (!Array.isArray(filters)) filters = [filters];
+      if (!Array.isArray(params)) params = [params];
+      let data = stream.data;
+      for (let i = 0; i < filters.length; i++) {
+        if (filters[i].raw !== '/FlateDecode') throw new PdfError('Unsupported filter ' + filters[i].raw);
+        data = unpredict(await inflate(data), this.resolve(params[i]));
+      }
+      return data;
+    }
+
+    _parseIndirect(offset) {
+      const b = this.bytes;
+      const p = new Parser(b, offset);
+      const num = p.int();
+      const gen = p.int();
+      p.keyword('obj');
+      const obj = p.parse();
+      p.skipWs();
+      if (!(obj instanceof Map) || !p.startsWith('stream')) return { num, gen, obj };
+
+      p.pos += 6;
+      if (b[p.pos] === 13) p.pos++;
+      if (b[p.pos] === 10) p.pos++;
+      const start = p.pos;
+      let end = start + (this.resolve(obj.get('Length')) || 0);
+      const check = new Parser(b, end);
+      check.skipWs();
+      if (!check.startsWith('endstream')) {
+        // Wrong /Length: the data ends before the endstream keyword
+        end = indexOf(b, 'endstream', start);
+        if (end < 0) throw new PdfError('Unterminated stream');
+        if (b[end - 1] === 10) end--;
+        if (b[end - 1] === 13) end--;
+      }
+      return { num, gen, obj: new Stream(obj, b.subarray(start, end)) };
+    }
+
+    get(ref) {
+      if (this.cache.has(ref.num)) return this.cache.get(ref.num);
+      const entry = this.xref.get(ref.num);
+      let obj = null;
+      if (entry && entry.type === 1) {
+        const parsed = this._parseIndirect(entry.offset);
+        if (parsed.num !== ref.num) throw new PdfError('Xref points at the wrong object ' + ref.num);
+        obj = parsed.obj;
+      } else if (entry && entry.type === 2) {
+        const container = this.objectStreams.get(entry.stream);
+        const pair = container.offsets[entry.index];
+        if (!pair || pair[0] !== ref.num) throw new PdfError('Bad object stream index ' + ref.num);
+        obj = new Parser(container.data, container.first + pair[1]).parse();
+      }
+      this.cache.set(ref.num, obj);
+      return obj;
+    }
+
+    resolve(value) {
+      for (let depth = 0; value instanceof Ref; depth++) {
+        if (depth > 32) throw new PdfError('Reference loop');
+        value = this.get(value);
+      }
+      return value;
+    }
+
+    _readPages() {
+      const root = this.resolve(this.trailer.get('Root'));
+      if (!(root instanceof Map)) throw new PdfError('No document catalog');
+      this.rootKey = this.trailer.get('Root').key;
+
+      const walk = (ref, inherited, depth) => {
+        if (!(ref instanceof Ref) || depth > 64) throw new PdfError('Bad page tree');
+        if (this.pageKeys.has(ref.key) || this.treeKeys.has(ref.key)) throw new PdfError('Page tree loop');
+        const node = this.resolve(ref);
+        if (!(node instanceof Map)) throw new PdfError('Bad page tree node');
+        const kids = this.resolve(node.get('Kids'));
+        if (Array.isArray(kids)) {
+          this.treeKeys.add(ref.key);
+          const next = Object.assign({}, inherited);
+          for (const key of INHERITABLE) {
+            if (node.has(key)) next[key] = node.get(key);
+          }
+          for (const kid of kids) walk(kid, next, depth + 1);
+        } else {
+          this.pageKeys.add(ref.key);
+          this.pages.push({ ref, inherited });
+        }
+      };
+      walk(root.get('Pages'), {}, 0);
+    }
+  }
+
+  function formatNumber(v) {
+    if (Number.isInteger(v)) return String(v);
+    return v.toFixed(6).replace(/0+$/, '').replace(/\.$/, '');
+  }
+
+  function serialize(v) {
+    if (v === null || v === undefined) return 'null';
+    if (typeof v === 'boolean') return String(v);
+    if (typeof v === 'number') return formatNumber(v);
+    if (v instanceof Name || v instanceof Str) return v.raw;
+    if (v instanceof Ref) return v.num + ' ' + v.gen + ' R';
+    if (Array.isArray(v)) return '[' + v.map(serialize).join(' ') + ']';
+    if (v instanceof Map) {
+      let s = '<<';
+      for (const [key, value] of v) s += '/' + key + ' ' + serialize(value);
+      return s + '>>';
+    }
+    throw new PdfError('Cannot write ' + typeof v);
+  }
+
+  // Write a new PDF with the given pages ([{doc, index}], in order).
+  function buildPdf(selection) {
+    const CATALOG = 1, PAGES = 2;
+    let next = 3;
+    const maps = new Map();     // doc -> Map(old key -> new num)
+    const pageNums = new Map(); // doc -> Map(page key -> new num)
+    const queue = [];
+    const kids = [];
+
+    for (const { doc, index } of selection) {
+      if (!pageNums.has(doc)) {
+        pageNums.set(doc, new Map());
+        maps.set(doc, new Map());
+      }
+      const num = next++;
+      pageNums.get(doc).set(doc.pages[index].ref.key, num);
+      kids.push(new Ref(num, 0));
+    }
+
+    const mapValue = (doc, v) => {
+      if (v instanceof Ref) {
+        const pages = pageNums.get(doc);
+        if (doc.pageKeys.has(v.key)) return pages.has(v.key) ? new Ref(pages.get(v.key), 0) : null;
+        if (doc.treeKeys.has(v.key)) return new Ref(PAGES, 0);
+        if (v.key === doc.rootKey) return null;
+        const map = maps.get(doc);
+        if (!map.has(v.key)) {
+          map.set(v.key, next++);
+          queue.push([doc, v]);
+        }
+        return new Ref(map.get(v.key), 0);
+      }
+      if (Array.isArray(v)) return v.map(item => mapValue(doc, item));
+      if (v instanceof Map) {
+        const out = new Map();
+        for (const [key, value] of v) out.set(key, mapValue(doc, value));
+        return out;
+      }
+      return v;
+    };
+
+    const parts = [];
+    const offsets = [];
+    let length = 0;
+    const push = (part) => {
+      const bytes = typeof part === 'string' ? latin1Bytes(part) : part;
+      parts.push(bytes);
+      length += bytes.length;
+    };
+    const writeObject = (num, value) => {
+      offsets[num] = length;
+      if (value instanceof Stream) {
+        const dict = new Map(value.dict);
+        dict.set('Length', value.data.length);
+        push(`${num} 0 obj\n${serialize(dict)}\nstream\n`);
+        push(value.data);
+        push('\nendstream\nendobj\n');
+      } else {
+        push(`${num} 0 obj\n${serialize(value)}\nendobj\n`);
+      }
+    };
+
+    push('%PDF-1.7\n%\xe2\xe3\xcf\xd3\n');
+    writeObject(CATALOG, new Map([['Type', new Name('/Catalog')], ['Pages', new Ref(PAGES, 0)]]));
+    writeObject(PAGES, new Map([['Type', new Name('/Pages')], ['Kids', kids], ['Count', kids.length]]));
+
+    selection.forEach(({ doc, index }, i) => {
+      const page = doc.pages[index];
+      const dict = mapValue(doc, doc.resolve(page.ref));
+      for (const key of INHERITABLE) {
+        if (!dict.has(key) && page.inherited[key] !== undefined) {
+          dict.set(key, mapValue(doc, page.inherited[key]));
+        }
+      }
+      dict.set('Parent', new Ref(PAGES, 0));
+      const annots = dict.get('Annots');
+      if (Array.isArray(annots)) dict.set('Annots', annots.filter(a => a !== null));
+      writeObject(kids[i].num, dict);
+    });
+
+    while (queue.length) {
+      const [doc, ref] = queue.shift();
+      const num = maps.get(doc).get(ref.key);
+      const obj = doc.get(ref);
+      writeObject(num, obj instanceof Stream
+        ? new Stream(mapValue(doc, obj.dict), obj.data)
+        : mapValue(doc, obj));
+    }
+
+    const xrefAt = length;
+    let xref = `xref\n0 ${next}\n0000000000 65535 f\r\n`;
+    for (let num = 1; num < next; num++) {
+      xref += String(offsets[num]).padStart(10, '0') + ' 00000 n\r\n';
+    }
+    push(xref);
+    push(`trailer\n<</Size ${next}/Root ${CATALOG} 0 R>>\nstartxref\n${xrefAt}\n%%EOF\n`);
+
+    const out = new Uint8Array(length);
+    let pos = 0;
+    for (const part of parts) {
+      out.set(part, pos);
+      pos += part.length;
+    }
+    return out;
+  }
+
+  // ----- Page specs (same rules as the server) -----
+
+  function pyInt(text) {
+    const t = text.trim();
+    if (!/^[+-]?\d+(_\d+)*$/.test(t)) {
+      throw new SpecError(`invalid literal for int() with base 10: '${text}'`);
+    }
+    return parseInt(t.replace(/_/g, ''), 10);
+  }
+
+  function parseRanges(spec, numPages, label) {
+    const pages = new Set();
+    for (let token of spec.split(',')) {
+      token = token.trim();
+      if (!token) continue;
+      let start, end;
+      if (token.includes('-')) {
+        const cut = token.indexOf('-');
+        start = pyInt(token.slice(0, cut));
+        end = pyInt(token.slice(cut + 1));
+      } else {
+        start = end = pyInt(token);
+      }
+      if (start < 1 || end > numPages || start > end) {
+        throw new SpecError(`Invalid ${label} '${token}' for PDF with ${numPages} pages.`);
+      }
+      for (let p = start; p <= end; p++) pages.add(p - 1);
+    }
+    return Array.from(pages).sort((a, b) => a - b);
+  }
+
+  function parseExtractSpec(spec, numPages) {
+    spec = spec.trim();
+    if (!spec) throw new SpecError('No page specification given.');
+    return parseRanges(spec, numPages, 'range');
+  }
+
+  function parseRemoveSpec(spec, numPages) {
+    spec = spec.trim();
+    if (!spec) return [];
+    return parseRanges(spec, numPages, 'page / range');
+  }
+
+  function parseSplitSpec(spec, numPages) {
+    spec = spec.trim();
+    if (!spec) return [[1, numPages]];
+
+    if (!spec.includes('-')) {
+      const cutpoints = new Set();
+      for (let token of spec.split(',')) {
+        token = token.trim();
+        if (!token) continue;
+        const p = pyInt(token);
+        if (p < 1 || p >= numPages) throw new SpecError(`Cutpoint ${p} out of range 1..${numPages - 1}`);
+        cutpoints.add(p);
+      }
+      const ranges = [];
+      let start = 1;
+      for (const cp of Array.from(cutpoints).sort((a, b) => a - b)) {
+        ranges.push([start, cp]);
+        start = cp + 1;
+      }
+      if (start <= numPages) ranges.push([start, numPages]);
+      return ranges;
+    }
+
+    const ranges = [];
+    let lastEnd = 0;
+    for (let token of spec.split(',')) {
+      token = token.trim();
+      if (!token) continue;
+      let start, end;
+      if (!token.includes('-')) {
+        start = end = pyInt(token);
+      } else {
+        const cut = token.indexOf('-');
+        start = pyInt(token.slice(0, cut));
+        end = pyInt(token.slice(cut + 1));
+      }
+      if (start < 1 || end > numPages || start > end) {
+        throw new SpecError(`Invalid range '${token}' for PDF with ${numPages} pages.`);
+      }
+      ranges.push([start, end]);
+      lastEnd = Math.max(lastEnd, end);
+    }
+    ranges.sort((a, b) => a[0] - b[0]);
+    if (lastEnd < numPages) ranges.push([lastEnd + 1, numPages]);
+    return ranges;
+  }
+
+  // ----- Operations -----
+
+  function extract(doc, spec) {
+    const keep = parseExtractSpec(spec, doc.pageCount);
+    if (!keep.length) throw new SpecError('No valid pages to extract.');
+    return buildPdf(keep.map(index => ({ doc, index })));
+  }
+
+  function remove(doc, spec) {
+    const drop = new Set(parseRemoveSpec(spec, doc.pageCount));
+    const keep = [];
+    for (let i = 0; i < doc.pageCount; i++) {
+      if (!drop.has(i)) keep.push(i);
+    }
+    if (!keep.length) throw new SpecError('Remove spec would delete all pages. Refusing to create empty PDF.');
+    return buildPdf(keep.map(index => ({ doc, index })));
+  }
+
+  // Returns [{name, bytes}], named like split_pdf's parts
+  function split(doc, spec, baseName) {
+    return parseSplitSpec(spec, doc.pageCount).map(([start, end], i) => {
+      const selection = [];
+      for (let p = start; p <= end; p++) selection.push({ doc, index: p - 1 });
+      return { name: `${baseName}_part${i + 1}_${start}-${end}.pdf`, bytes: buildPdf(selection) };
+    });
+  }
+
+  function merge(docs) {
+    const selection = [];
+    for (const doc of docs) {
+      for (let index = 0; index < doc.pageCount; index++) selection.push({ doc, index });
+    }
+    return buildPdf(selection);
+  }
+
+  // ----- Stored (uncompressed) ZIP, like the server's split download -----
+
+  const CRC_TABLE = new Uint32Array(256).map((_, n) => {
+    let c = n;
+    for (let k = 0; k < 8; k++) c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+    return c >>> 0;
+  });
+
+  function crc32(bytes) {
+    let c = 0xffffffff;
+    for (let i = 0; i < bytes.length; i++) c = CRC_TABLE[(c ^ bytes[i]) & 0xff] ^ (c >>> 8);
+    return (c ^ 0xffffffff) >>> 0;
+  }
+
+  function zip(entries) {
+    const now = new Date();
+    const time = (now.getHours() << 11) | (now.getMinutes() << 5) | (now.getSeconds() >> 1);
+    const date = ((now.getFullYear() - 1980) << 9) | ((now.getMonth() + 1) << 5) | now.getDate();
+    const encoder = new TextEncoder();
+    const locals = [];
+    const centrals = [];
+    let offset = 0;
+
+    for (const { name, bytes } of entries) {
+      const fileName = encoder.encode(name);
+      const crc = crc32(bytes);
+      const header = (size, central) => {
+        const h = new DataView(new ArrayBuffer(central ? 46 : 30));
+        let p = 0;
+        const u16 = v => { h.setUint16(p, v, true); p += 2; };
+        const u32 = v => { h.setUint32(p, v, true); p += 4; };
+        u32(central ? 0x02014b50 : 0x04034b50);
+        if (central) u16(20);
+        u16(20); u16(0x0800); u16(0); u16(time); u16(date);
+        u32(crc); u32(size); u32(size);
+        u16(fileName.length); u16(0);
+        if (central) { u16(0); u16(0); u16(0); u32(0); u32(offset); }
+        return new Uint8Array(h.buffer);
+      };
+      centrals.push(header(bytes.length, true), fileName);
+      const local = header(bytes.length, false);
+      locals.push(local, fileName, bytes);
+      offset += local.length + fileName.length + bytes.length;
+    }
+
+    const centralSize = centrals.reduce((a, part) => a + part.length, 0);
+    const end = new DataView(new ArrayBuffer(22));
+    end.setUint32(0, 0x06054b50, true);
+    end.setUint16(8, entries.length, true);
+    end.setUint16(10, entries.length, true);
+    end.setUint32(12, centralSize, true);
+    end.setUint32(16, offset, true);
+    return new Blob([...locals, ...centrals, new Uint8Array(end.buffer)], { type: 'application/zip' });
+  }
+
+  global.PdfPages = {
+    PdfDocument, PdfError, EncryptedPdfError, SpecError,
+    open: bytes => PdfDocument.open(bytes),
+    parseExtractSpec, parseRemoveSpec, parseSplitSpec,
+    extract, remove, split, merge, zip,
+    supported: typeof DecompressionStream === 'function',
+  };
+})(typeof window !== 'undefined' ? window : globalThis);
@@ -0,0 +1,234 @@
+// ===== Filter logic (unchanged) =====
+const pills = document.querySelectorAll('.pill');
+const cards = document.querySelectorAll('.tool-card');
+
+pills.forEach(pill => {
+  pill.addEventListener('click', () => {
+    const filter = pill.dataset.filter;
+
+    pills.forEach(p => p.classList.remove('active'));
+    pill.classList.add('active');
+
+    cards.forEach(card => {
+      const categories = card.dataset.category.split(',').map(c => c.trim().toLowerCase());
+      if (filter === 'all' || categories.includes(filter)) {
+        card.style.display = 'flex';
+      } else {
+        card.style.display = 'none';
+      }
+    });
+  });
+});
+
+// ===== Modal logic for PDF to Word, Merge PDF, page tools & images to PDF =====
+
+const modalCards = {
+  pdfToWordCard: 'modalWord',
+  mergePdfCard: 'modalMerge',
+  removePagesCard: 'modalRemove',
+  extractPagesCard: 'modalExtract',
+  splitPdfCard: 'modalSplit',
+  imagesToPdfCard: 'modalImages',
+};
+
+Object.entries(modalCards).forEach(([cardId, modalId]) => {
+  document.getElementById(cardId).addEventListener('click', () => {
+    document.getElementById(modalId).style.display = 'flex';
+  });
+});
+
+function closeModal(id) {
+  document.getElementById(id).style.display = 'none';
+  resetModal(id);
+}
+
+function resetModal(id) {
+  const modal = document.querySelector('#' + id + ' .modal');
+  if (!modal) return;
+  const loader = modal.querySelector('.loader');
+  const download = modal.querySelector('.download-section');
+  const progress = modal.querySelector('.progress');
+  if (loader) loader.style.display = 'none';
+  if (download) download.style.display = 'none';
+  if (progress) progress.style.display = 'none';
+}
+
+// ===== Live progress for long-running conversions =====
+// Forms with data-progress are sent with fetch() plus a random job_id;
+// the server streams progress for that job on /progress/<job_id>/.
+// The Cancel button, or closing the tab, cancels the job on the server.
+
+// Jobs the server is still working on
+const activeJobs = new Set();
+
+function cancelJob(jobId) {
+  navigator.sendBeacon('/progress/' + jobId + '/cancel/');
+}
+
+window.addEventListener('pagehide', () => activeJobs.forEach(cancelJob));
+
+function newJobId() {
+  const bytes = new Uint8Array(16);
+  crypto.getRandomValues(bytes);
+  return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+}
+
+function formatEta(seconds) {
+  if (seconds < 60) return Math.max(1, Math.round(seconds)) + 's';
+  return Math.round(seconds / 60) + ' min';
+}
+
+function saveBlob(blob, name) {
+  const url = URL.createObjectURL(blob);
+  const link = document.createElement('a');
+  link.href = url;
+  link.download = name;
+  link.click();
+  // The download starts after click() returns; revoking the URL right away
+  // can cancel it (Firefox, Safari), so give the browser time to fetch it
+  setTimeout(() => URL.revokeObjectURL(url), 60000);
+}
+
+function downloadName(response, fallback) {
+  const header = response.headers.get('Content-Disposition') || '';
+  const encoded = header.match(/filename\*=utf-8''([^;]+)/i);
+  if (encoded) return decodeURIComponent(encoded[1]);
+  const plain = header.match(/filename="?([^";]+)"?/i);
+  return plain ? plain[1] : fallback;
+}
+
+document.querySelectorAll('form[data-progress]').forEach(form => {
+  form.addEventListener('submit', async (event) => {
+    event.preventDefault();
+
+    const unit = form.dataset.progress;
+    const box = form.closest('.modal').querySelector('.progress');
+    const fill = box.querySelector('.progress-fill');
+    const text = box.querySelector('.progress-text');
+    const button = form.querySelector('button[type=submit]');
+    const cancel = box.querySelector('.progress-cancel');
+    const controller = new AbortController();
+
+    const jobId = newJobId();
+    const data = new FormData(form);
+    data.append('job_id', jobId);
+
+    box.style.display = 'block';
+    fill.style.width = '0%';
+    text.textContent = 'Uploading…';
+    button.disabled = true;
+    activeJobs.add(jobId);
+    if (cancel) {
+      cancel.style.display = 'inline-block';
+      cancel.onclick = () => {
+        cancelJob(jobId);
+        controller.abort();
+      };
+    }
+
+    const events = new EventSource('/progress/' + jobId + '/');
+    events.onmessage = (e) => {
+      const state = JSON.parse(e.data);
+      if (state.total) {
+        fill.style.width = Math.round(100 * state.done / state.total) + '%';
+        let line = `Processed ${state.done} of ${state.total} ${unit}`;
+        if (state.eta_seconds !== null) line += ` · about ${formatEta(state.eta_seconds)} left`;
+        text.textContent = line;
+      }
+      if (['done', 'error', 'cancelled'].includes(state.status)) events.close();
+    };
+
+    try {
+      // With shared (S3) storage the answer is a presigned URL to
+      // download the result from, instead of the file itself
+      const response = await fetch(form.action, {
+        method: 'POST', body: data, signal: controller.signal,
+        headers: { 'X-Download-Handoff': '1' },
+      });
+      if (!response.ok) throw new Error(await response.text());
+
+      if ((response.headers.get('Content-Type') || '').startsWith('application/json')) {
+        const handoff = await response.json();
+        const link = document.createElement('a');
+        link.href = handoff.download_url;
+        link.download = handoff.filename;
+        link.click();
+      } else {
+        saveBlob(await response.blob(), downloadName(response, 'download'));
+      }
+
+      fill.style.width = '100%';
+      text.textContent = '✅ Done! Your download has started.';
+    } catch (err) {
+      text.textContent = err.name === 'AbortError'
+        ? 'Cancelled.'
+        : '❌ ' + (err.message || 'Something went wrong.');
+    } finally {
+      activeJobs.delete(jobId);
+      events.close();
+      button.disabled = false;
+      if (cancel) cancel.style.display = 'none';
+    }
+  });
+});
+
+// ===== Page tools in the browser (pdfpages.js) =====
+// Extract / remove / split of one small PDF, and merges of small PDFs,
+// are done here: nothing is uploaded. Bigger files, several files for a
+// single-file tool, and PDFs pdfpages.js can't read (encrypted, damaged)
+// are posted to the server as before.
+
+const CLIENT_MAX_BYTES = 10 * 1024 * 1024;
+
+function runPageTool(tool, docs, form, file) {
+  const dot = file.name.lastIndexOf('.');
+  const stem = dot > 0 ? file.name.slice(0, dot) : file.name;
+  const ext = dot > 0 ? file.name.slice(dot) : '.pdf';
+  const pdf = bytes => new Blob([bytes], { type: 'application/pdf' });
+  const spec = name => form.elements[name].value;
+
+  switch (tool) {
+    case 'merge':
+      return [pdf(PdfPages.merge(docs)), 'merged_output.pdf'];
+    case 'extract':
+      return [pdf(PdfPages.extract(docs[0], spec('pages_spec'))), `${stem}_extracted${ext}`];
+    case 'remove':
+      return [pdf(PdfPages.remove(docs[0], spec('remove_spec'))), `${stem}_removed${ext}`];
+    case 'split':
+      return [PdfPages.zip(PdfPages.split(docs[0], spec('split_spec'), stem)), `${stem}_split_parts.zip`];
+  }
+}
+
+document.querySelectorAll('form[data-client]').forEach(form => {
+  form.addEventListener('submit', async (event) => {
+    const tool = form.dataset.client;
+    const files = Array.from(form.querySelector('input[type=file]').files);
+    const size = files.reduce((total, file) => total + file.size, 0);
+    const count = tool === 'merge' ? files.length >= 2 : files.length === 1;
+    if (!PdfPages.supported || !count || size > CLIENT_MAX_BYTES) return;  // server
+
+    event.preventDefault();
+    const box = form.closest('.modal').querySelector('.progress');
+    const text = box.querySelector('.progress-text');
+    box.style.display = 'block';
+    text.textContent = 'Working…';
+
+    try {
+      const docs = [];
+      for (const file of files) {
+        docs.push(await PdfPages.open(new Uint8Array(await file.arrayBuffer())));
+      }
+      const [blob, name] = runPageTool(tool, docs, form, files[0]);
+      saveBlob(blob, name);
+      text.textContent = '✅ Done! Your download has started.';
+    } catch (err) {
+      if (err instanceof PdfPages.SpecError) {
+        text.textContent = '❌ ' + err.message;
+        return;
+      }
+      // Not a PDF we can edit here: let the server do it
+      text.textContent = 'Uploading…';
+      HTMLFormElement.prototype.submit.call(form);
+    }
+  });
+});
@@ -0,0 +1,182 @@
+"""
+Build and serve the frontend's static files (pdfapp/static/).
+
+The build step is Django's collectstatic, with STORAGES["staticfiles"] set
+to PrecompressedManifestStaticFilesStorage:
+
+    python manage.py collectstatic --noinput
+
+writes to STATIC_ROOT
+  - every file under a fingerprinted name (toolverse.3f2a9c1b04d7.css,
+    from ManifestStaticFilesStorage; {% static %} links to it),
+  - pdfapp's CSS and JS minified (JS only when rjsmin is installed),
+  - next to each text file, a gzip (.gz) and, when the brotli package is
+    installed, a brotli (.br) copy, compressed once at maximum level.
+
+`serve()` answers STATIC_URL requests when DEBUG is off (with DEBUG on,
+runserver serves the unbuilt files from the apps). It sends the .br or
+.gz copy the client accepts, and caches fingerprinted files for a year
+as immutable: a changed file gets a new name, so it is never revalidated.
+"""
+
+import gzip
+import logging
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # .br copies unavailable
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # JS is copied unminified
+    rjsmin = None
+
+
+logger = logging.getLogger(__name__)
+
+# Files that get .gz / .br copies; everything else (images, fonts) is
+# already compressed
+PRECOMPRESS_SUFFIXES = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+
+# Content-Encoding -> suffix of the precompressed copy, best first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# Unfingerprinted names can change content: revalidate after a minute
+SHORT_CACHE = "public, max-age=60"
+
+_warned_no_brotli = False
+
+
+def minify_css(css: str) -> str:
+    """
+    Drop comments and the whitespace around braces, semicolons, commas and
+    child combinators. Whitespace around ':' is kept ('a :hover' is not
+    'a:hover').
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_js(js: str) -> str:
+    if rjsmin is None:
+        return js
+    return rjsmin.jsmin(js)
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+# Only our own sources are minified; other apps' files (admin) are
+# collected as they ship
+MINIFY_PREFIXES = ("pdfapp/",)
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that minifies CSS / JS as it saves them and
+    writes .gz / .br copies of text files next to them.
+
+    The fingerprint is taken from the source file, so it changes exactly
+    when the source does.
+    """
+
+    def _save(self, name, content):
+        suffix = os.path.splitext(name)[1].lower()
+        if name == self.manifest_name or (suffix not in MINIFIERS
+                                          and suffix not in PRECOMPRESS_SUFFIXES):
+            return super()._save(name, content)
+
+        content.seek(0)
+        data = content.read()
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if suffix in MINIFIERS and name.startswith(MINIFY_PREFIXES):
+            data = MINIFIERS[suffix](data.decode("utf-8")).encode("utf-8")
+
+        name = super()._save(name, ContentFile(data))
+        if suffix in PRECOMPRESS_SUFFIXES:
+            self._save_compressed(name, data)
+        return name
+
+    def _save_compressed(self, name, data: bytes):
+        global _warned_no_brotli
+        compressed = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed[".br"] = brotli.compress(data, quality=11)
+        elif not _warned_no_brotli:
+            logger.warning("brotli is not installed: static files get .gz copies only.")
+            _warned_no_brotli = True
+
+        for suffix, body in compressed.items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            # Not worth a copy if it isn't smaller (tiny files)
+            if len(body) < len(data):
+                super()._save(name + suffix, ContentFile(body))
+
+
+def _accepted_encodings(header: str) -> set:
+    """
+    Content-codings an Accept-Encoding header allows (q=0 means refused).
+    """
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = re.search(r"q\s*=\s*([0-9.]+)", params)
+        if coding and (q is None or float(q.group(1)) > 0):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _is_fingerprinted(path: str) -> bool:
+    hashed_files = getattr(staticfiles_storage, "hashed_files", None) or {}
+    return path in hashed_files.values()
+
+
+def serve(request, path):
+    """
+    Serve a file from STATIC_ROOT (the collectstatic output), using the
+    precompressed copy the client accepts.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path.")
+    if not os.path.isfile(full_path) or full_path.endswith((".gz", ".br")):
+        raise Http404(f"'{path}' does not exist.")
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    mtime = os.stat(full_path).st_mtime
+    if not was_modified_since(request.headers.get("If-Modified-Since"), mtime):
+        return HttpResponseNotModified()
+
+    file_path, encoding = full_path, None
+    accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    for coding, suffix in ENCODINGS:
+        if coding in accepted and os.path.isfile(full_path + suffix):
+            file_path, encoding = full_path + suffix, coding
+            break
+
+    response = FileResponse(open(file_path, "rb"),
+                            content_type=content_type or "application/octet-stream")
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Last-Modified"] = http_date(mtime)
+    response["Cache-Control"] = IMMUTABLE_CACHE if _is_fingerprinted(path) else SHORT_CACHE
+    return response
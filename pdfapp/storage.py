@@ -0,0 +1,427 @@
+"""
+Shared storage for uploads and outputs, so several app nodes can run
+behind one load balancer.
+
+The storage is Django's STORAGES["default"]:
+
+  - django.core.files.storage.FileSystemStorage (the default): MEDIA_ROOT
+    on local disk, or on a volume every node mounts.
+  - pdfapp.storage.S3Storage: a bucket on any S3-compatible service (AWS
+    S3, MinIO, Ceph, ...). In development, point `endpoint_url` at a
+    local stand-in, e.g. `minio server /tmp/s3`:
+
+        STORAGES["default"] = {
+            "BACKEND": "pdfapp.storage.S3Storage",
+            "OPTIONS": {"bucket": "toolverse", "endpoint_url": "http://127.0.0.1:9000"},
+        }
+
+    Credentials and region come from OPTIONS or the usual
+    AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY / AWS_DEFAULT_REGION
+    variables. No SDK is needed: requests are signed here (AWS Signature
+    Version 4, path-style URLs).
+
+The tools keep working on local files (PyMuPDF and pdf2docx need them).
+Views copy each upload to uploads/<sha256>.pdf in the background
+(`store_upload`), run the tool into the node's outputs folder, and
+hand the result to `output_response()`. That stores it under
+outputs/<random>/<name> and answers with
+  - a redirect to a presigned URL when the storage is S3Storage, so the
+    download goes straight to the bucket and any node can serve it. A
+    fetch() that sends `X-Download-Handoff: 1` gets that URL as JSON
+    instead (a cross-origin redirect would need CORS);
+  - otherwise the file, streamed from the storage.
+On local disk, files that are already under MEDIA_ROOT are used where
+they are: nothing is copied. Batch ZIPs and extracted text are streamed
+while they are produced and are not stored.
+
+S3Storage streams both ways: a read returns the object while it is being
+received, and files larger than MULTIPART_THRESHOLD are uploaded in parts
+of PART_SIZE, so at most one part is held in memory. Objects are never
+expired here; give the bucket a lifecycle rule for uploads/ and outputs/.
+Signing and multipart uploads are tested against the AWS examples and a
+fake S3 server in tests/test_storage.py.
+
+Only files are shared between nodes. Job progress and cancels
+(pdfapp.progress) live in a SQLite database that the workers of one node
+share, not the other nodes: /progress/<job_id>/ and its cancel/ must
+reach the node that runs the job. Use sticky sessions on the load
+balancer, or route /progress/ by job id to the node that took the upload.
+"""
+
+import datetime
+import hashlib
+import hmac
+import logging
+import mimetypes
+import os
+import re
+import threading
+import uuid
+from http.client import HTTPConnection, HTTPSConnection
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+from xml.sax.saxutils import escape
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage, default_storage
+from django.http import FileResponse, HttpResponseRedirect, JsonResponse
+from django.utils.deconstruct import deconstructible
+from django.utils.http import content_disposition_header
+
+
+logger = logging.getLogger(__name__)
+
+# Larger files are uploaded in parts (S3 parts are at least 5 MB, except
+# the last)
+MULTIPART_THRESHOLD = 64 * 1024 * 1024
+PART_SIZE = 16 * 1024 * 1024
+
+# Lifetime of presigned download URLs
+URL_EXPIRES_SECONDS = 3600
+
+# Bytes per socket write when a body is streamed from a file
+_BLOCK_SIZE = 1024 * 1024
+
+# Payload hash for bodies that are streamed rather than hashed first
+_UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+_ERROR_RE = re.compile(rb"<Code>(.*?)</Code>.*?<Message>(.*?)</Message>", re.S)
+_UPLOAD_ID_RE = re.compile(rb"<UploadId>(.*?)</UploadId>")
+
+
+class S3Error(OSError):
+    """
+    An S3 request failed; `status` is the HTTP status, `code` the S3 error
+    code (e.g. 'NoSuchKey').
+    """
+
+    def __init__(self, status: int, code: str, message: str = ""):
+        super().__init__(f"S3 request failed: {status} {code} {message}".rstrip())
+        self.status = status
+        self.code = code
+
+
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _error(status: int, body: bytes) -> S3Error:
+    match = _ERROR_RE.search(body or b"")
+    if match:
+        return S3Error(status, match.group(1).decode(), match.group(2).decode())
+    return S3Error(status, {403: "AccessDenied", 404: "NoSuchKey"}.get(status, "Error"))
+
+
+class _S3File(File):
+    """
+    An object being read: the HTTP response, read as it arrives.
+    """
+
+    def __init__(self, name, response, conn):
+        super().__init__(response, name)
+        self.size = int(response.getheader("Content-Length", 0))
+        self._conn = conn
+
+    def close(self):
+        super().close()
+        self._conn.close()
+
+
+@deconstructible
+class S3Storage(Storage):
+    """
+    Django storage on an S3-compatible bucket.
+
+    Files opened from it are read-only streams; names map to keys under
+    `prefix`. Saving overwrites: names are never altered to make them
+    unique, as S3 itself does.
+    """
+
+    def __init__(self, bucket=None, endpoint_url=None, region=None, access_key=None,
+                 secret_key=None, prefix="", url_expires=URL_EXPIRES_SECONDS, timeout=60):
+        self.bucket = bucket or os.environ.get("TOOLVERSE_S3_BUCKET")
+        if not self.bucket:
+            raise ImproperlyConfigured("S3Storage needs a bucket.")
+        self.region = region or os.environ.get("AWS_DEFAULT_REGION") or "us-east-1"
+        self.endpoint_url = (endpoint_url or os.environ.get("AWS_ENDPOINT_URL")
+                             or f"https://s3.{self.region}.amazonaws.com")
+        self.access_key = access_key or os.environ.get("AWS_ACCESS_KEY_ID", "")
+        self.secret_key = secret_key or os.environ.get("AWS_SECRET_ACCESS_KEY", "")
+        self.prefix = prefix
+        self.url_expires = url_expires
+        self.timeout = timeout
+
+        parts = urlsplit(self.endpoint_url)
+        self._secure = parts.scheme == "https"
+        self._host = parts.netloc
+        self._base_path = parts.path.rstrip("/")
+
+    # ----- Signature Version 4 -----
+
+    def _object_path(self, name: str = "") -> str:
+        path = f"{self._base_path}/{self.bucket}"
+        if name:
+            path += "/" + self.prefix + name
+        return _uri_encode(path, safe="-_.~/")
+
+    @staticmethod
+    def _canonical_query(query: dict) -> str:
+        return "&".join(sorted(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in query.items()))
+
+    def _signature(self, method, path, query, headers, payload_hash, amz_date):
+        """
+        (scope, signed header names, signature) of a request; `headers`
+        are the lower-case headers to sign.
+        """
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        signed = ";".join(sorted(headers))
+        canonical = "\n".join([
+            method,
+            path,
+            self._canonical_query(query),
+            "".join(f"{k}:{' '.join(str(headers[k]).split())}\n" for k in sorted(headers)),
+            signed,
+            payload_hash,
+        ])
+        to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical.encode("utf-8")).hexdigest(),
+        ])
+        key = _hmac(("AWS4" + self.secret_key).encode("utf-8"), amz_date[:8])
+        for part in (self.region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        return scope, signed, hmac.new(key, to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def _request(self, method, name="", query=None, headers=None, body=b"", now=None):
+        """
+        Send a signed request; returns (response, connection) with the body
+        unread. Raises S3Error for error statuses.
+
+        bytes bodies are signed with their hash; file bodies are streamed
+        unsigned (headers must then give their Content-Length).
+        """
+        query = query or {}
+        headers = {k.lower(): str(v) for k, v in (headers or {}).items()}
+        payload_hash = (hashlib.sha256(body).hexdigest() if isinstance(body, bytes)
+                        else _UNSIGNED_PAYLOAD)
+        amz_date = (now or datetime.datetime.now(datetime.timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+        headers.update({"host": self._host, "x-amz-date": amz_date,
+                        "x-amz-content-sha256": payload_hash})
+
+        path = self._object_path(name)
+        scope, signed, signature = self._signature(method, path, query, headers, payload_hash,
+                                                   amz_date)
+        headers["authorization"] = (f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                                    f"SignedHeaders={signed}, Signature={signature}")
+
+        conn_class = HTTPSConnection if self._secure else HTTPConnection
+        conn = conn_class(self._host, timeout=self.timeout, blocksize=_BLOCK_SIZE)
+        target = path + ("?" + self._canonical_query(query) if query else "")
+        try:
+            conn.request(method, target, body=body, headers=headers)
+            response = conn.getresponse()
+            if response.status >= 300:
+                raise _error(response.status, response.read())
+        except BaseException:
+            conn.close()
+            raise
+        return response, conn
+
+    def _call(self, method, name="", query=None, headers=None, body=b""):
+        """
+        _request(), reading the whole response: (response, body bytes).
+        """
+        response, conn = self._request(method, name, query, headers, body)
+        try:
+            return response, response.read()
+        finally:
+            conn.close()
+
+    def presigned_url(self, name: str, filename: str = None, expires: int = None, now=None) -> str:
+        """
+        URL anyone can GET `name` from for `expires` seconds, without
+        credentials. With `filename`, the download is an attachment of
+        that name.
+        """
+        amz_date = (now or datetime.datetime.now(datetime.timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires or self.url_expires),
+            "X-Amz-SignedHeaders": "host",
+        }
+        if filename:
+            query["response-content-disposition"] = content_disposition_header(True, filename)
+        path = self._object_path(name)
+        _, _, signature = self._signature("GET", path, query, {"host": self._host},
+                                          _UNSIGNED_PAYLOAD, amz_date)
+        query["X-Amz-Signature"] = signature
+        scheme = "https" if self._secure else "http"
+        return f"{scheme}://{self._host}{path}?{self._canonical_query(query)}"
+
+    # ----- Storage API -----
+
+    def _open(self, name, mode="rb"):
+        if any(c in mode for c in "wa+"):
+            raise ValueError("S3Storage files are read-only; use save().")
+        response, conn = self._request("GET", name)
+        return _S3File(name, response, conn)
+
+    def _save(self, name, content):
+        if hasattr(content, "seek"):
+            content.seek(0)
+        headers = {"Content-Type": mimetypes.guess_type(name)[0] or "application/octet-stream"}
+        if content.size is not None and content.size < MULTIPART_THRESHOLD:
+            headers["Content-Length"] = content.size
+            self._call("PUT", name, headers=headers, body=content)
+        else:
+            self._save_multipart(name, content, headers)
+        return name
+
+    def _save_multipart(self, name, content, headers):
+        _, data = self._call("POST", name, query={"uploads": ""}, headers=headers)
+        match = _UPLOAD_ID_RE.search(data)
+        if not match:
+            raise S3Error(500, "InvalidResponse", "No UploadId in CreateMultipartUpload.")
+        upload_id = match.group(1).decode()
+        try:
+            parts = []
+            while True:
+                chunk = content.read(PART_SIZE)
+                if not chunk and parts:
+                    break
+                response, _ = self._call("PUT", name, body=chunk, query={
+                    "partNumber": str(len(parts) + 1), "uploadId": upload_id})
+                parts.append(response.getheader("ETag"))
+                if len(chunk) < PART_SIZE:
+                    break
+            body = "<CompleteMultipartUpload>" + "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{escape(etag)}</ETag></Part>"
+                for number, etag in enumerate(parts, 1)) + "</CompleteMultipartUpload>"
+            response, data = self._call("POST", name, query={"uploadId": upload_id},
+                                        body=body.encode("utf-8"))
+            # An error can also come as a 200 with an <Error> body
+            if b"<Error>" in data:
+                raise _error(500, data)
+        except BaseException:
+            try:
+                self._call("DELETE", name, query={"uploadId": upload_id})
+            except OSError:
+                pass
+            raise
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def exists(self, name):
+        try:
+            self._call("HEAD", name)
+        except S3Error as e:
+            if e.status == 404:
+                return False
+            raise
+        return True
+
+    def delete(self, name):
+        self._call("DELETE", name)
+
+    def size(self, name):
+        response, _ = self._call("HEAD", name)
+        return int(response.getheader("Content-Length", 0))
+
+    def url(self, name):
+        return self.presigned_url(name)
+
+
+def _file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _name_in_storage(storage, path):
+    """
+    Name of local `path` in `storage` if it is already there (a file under
+    a FileSystemStorage's location), else None.
+    """
+    if not isinstance(storage, FileSystemStorage):
+        return None
+    try:
+        return Path(path).resolve().relative_to(Path(storage.location).resolve()).as_posix()
+    except ValueError:
+        return None
+
+
+def _store_upload(path: str, sha256: str = None) -> str:
+    storage = default_storage
+    name = _name_in_storage(storage, path)
+    if name is not None:
+        return name
+    name = f"uploads/{sha256 or _file_sha256(path)}{Path(path).suffix.lower()}"
+    if not storage.exists(name):
+        with open(path, "rb") as f:
+            storage.save(name, File(f))
+    return name
+
+
+def store_upload(path, uploaded_file=None):
+    """
+    Copy an upload saved at local `path` to the shared storage, as
+    uploads/<sha256><suffix> (uploads seen before are not sent again), in
+    a background thread. Nothing to do when the storage is the local disk
+    the upload is already on.
+    """
+    if _name_in_storage(default_storage, path) is not None:
+        return
+    # `path` is removed with its request's folder; the content store
+    # object stays
+    source = getattr(uploaded_file, "store_path", path)
+
+    def run():
+        try:
+            _store_upload(str(source), getattr(uploaded_file, "sha256", None))
+        except Exception:
+            logger.exception("Storing upload %s failed", path)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def save_output(path) -> str:
+    """
+    Put a tool's output file in the shared storage and return its name.
+    Files elsewhere than the storage's own folder are moved there, under
+    outputs/<random>/<file name>.
+    """
+    storage = default_storage
+    name = _name_in_storage(storage, path)
+    if name is None:
+        with open(path, "rb") as f:
+            name = storage.save(f"outputs/{uuid.uuid4().hex}/{Path(path).name}", File(f))
+        os.remove(path)
+    return name
+
+
+def output_response(request, path, filename: str):
+    """
+    Download response for a tool's output file at local `path` (saved to
+    the shared storage first, see save_output): a presigned-URL handoff
+    for S3Storage, the file streamed from the storage otherwise.
+    """
+    name = save_output(path)
+    storage = default_storage
+    if isinstance(storage, S3Storage):
+        url = storage.presigned_url(name, filename=filename)
+        if request.headers.get("X-Download-Handoff"):
+            return JsonResponse({"download_url": url, "filename": filename})
+        return HttpResponseRedirect(url)
+    return FileResponse(storage.open(name, "rb"), as_attachment=True, filename=filename)
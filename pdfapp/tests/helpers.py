@@ -0,0 +1,52 @@
+"""
+Shared pieces of the pdfapp tests.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from django.test import SimpleTestCase, override_settings
+
+
+def make_pdf(path, pages: int = 3, text: str = "Page {n}"):
+    """
+    Write a small text PDF, one line of `text` per page ({n} = page
+    number), and return its path.
+    """
+    doc = fitz.open()
+    for n in range(1, pages + 1):
+        doc.new_page().insert_text((72, 72), text.format(n=n))
+    doc.save(path)
+    doc.close()
+    return Path(path)
+
+
+def page_texts(source):
+    """
+    Text of every page of a PDF file path or bytes.
+    """
+    doc = fitz.open(source) if not isinstance(source, bytes) else fitz.open("pdf", source)
+    with doc:
+        return [page.get_text().strip() for page in doc]
+
+
+class TempMediaTestCase(SimpleTestCase):
+    """
+    Runs with MEDIA_ROOT, the content store, the search index and the job
+    database in a temporary folder (self.media), removed afterwards.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(
+            MEDIA_ROOT=self.media,
+            CONTENT_STORE_ROOT=self.media / "store",
+            SEARCH_INDEX_PATH=self.media / "search_index.sqlite3",
+            PROGRESS_DB_PATH=self.media / "progress.sqlite3",
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
@@ -0,0 +1,31 @@
+// Command-line driver for pdfpages.js, used by test_pdfpages.py:
+//
+//     node pdfpages_cli.js <op> <spec> <output folder> <input.pdf>...
+//
+// op is extract, remove, split or merge. The results are written to the
+// output folder (one file, or the split parts) and a JSON line is printed:
+// {"outputs": [names]} or {"error": class name, "message": ...}.
+
+const fs = require('fs');
+const path = require('path');
+
+require(path.join(__dirname, '..', 'static', 'pdfapp', 'pdfpages.js'));
+const P = globalThis.PdfPages;
+
+(async () => {
+  const [op, spec, outDir, ...inputs] = process.argv.slice(2);
+  try {
+    const docs = [];
+    for (const input of inputs) docs.push(await P.open(new Uint8Array(fs.readFileSync(input))));
+
+    let results;
+    if (op === 'merge') results = [{ name: 'merged_output.pdf', bytes: P.merge(docs) }];
+    else if (op === 'split') results = P.split(docs[0], spec, 'part');
+    else results = [{ name: op + '.pdf', bytes: P[op](docs[0], spec) }];
+
+    for (const { name, bytes } of results) fs.writeFileSync(path.join(outDir, name), bytes);
+    console.log(JSON.stringify({ outputs: results.map(r => r.name) }));
+  } catch (e) {
+    console.log(JSON.stringify({ error: e.constructor.name, message: e.message }));
+  }
+})();
@@ -0,0 +1,57 @@
+"""
+Batch requests: several files posted to one tool come back as a ZIP with
+a manifest.json of what happened to each.
+"""
+
+import io
+import json
+import zipfile
+
+from django.urls import reverse
+
+from pdfapp.batch import GENERIC_ERROR, MANIFEST_NAME
+
+from .helpers import TempMediaTestCase, make_pdf, page_texts
+
+
+class BatchTests(TempMediaTestCase):
+
+    def post_batch(self, name, paths, **fields):
+        files = [open(path, "rb") for path in paths]
+        for f in files:
+            self.addCleanup(f.close)
+        response = self.client.post(reverse(name), {"pdf_files": files, **fields})
+        self.assertEqual(response.status_code, 200)
+        body = b"".join(response.streaming_content)
+        response.close()
+        return zipfile.ZipFile(io.BytesIO(body))
+
+    def test_manifest(self):
+        good = make_pdf(self.media / "good.pdf")
+        bad = self.media / "bad.pdf"
+        bad.write_bytes(b"%PDF-1.4\nnot really a PDF\n%%EOF\n")
+
+        with self.assertLogs("pdfapp.batch", "ERROR") as logs:
+            archive = self.post_batch("remove_pages", [good, bad], remove_spec="1")
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+
+        self.assertEqual((manifest["succeeded"], manifest["failed"]), (1, 1))
+        by_file = {entry["file"]: entry for entry in manifest["files"]}
+        self.assertEqual(by_file["good.pdf"],
+                         {"file": "good.pdf", "status": "ok", "outputs": ["good_removed.pdf"]})
+        self.assertEqual(page_texts(archive.read("good_removed.pdf")), ["Page 2", "Page 3"])
+        # The details are logged, not sent to the client
+        self.assertEqual(by_file["bad.pdf"], {"file": "bad.pdf", "status": "error",
+                                              "error": GENERIC_ERROR})
+        self.assertIn("bad.pdf", logs.output[0])
+        self.assertNotIn(str(self.media), archive.read(MANIFEST_NAME).decode())
+
+    def test_inputs_stay_in_the_batch_folder(self):
+        paths = [make_pdf(self.media / f"in{n}.pdf", text=f"File {n}, page {{n}}") for n in (1, 2)]
+        archive = self.post_batch("extract_pages", paths, pages_spec="2")
+
+        self.assertEqual(page_texts(archive.read("in1_extracted.pdf")), ["File 1, page 2"])
+        self.assertEqual(page_texts(archive.read("in2_extracted.pdf")), ["File 2, page 2"])
+        # Nothing left in the shared folders for another request to overwrite
+        self.assertEqual(list((self.media / "uploads").iterdir()), [])
+        self.assertEqual(list((self.media / "outputs").iterdir()), [])
@@ -0,0 +1,158 @@
+"""
+Scan recoding in compress_pdf_lossy: recoded images are valid gray
+images, without the decode entries of the image they replace, and never
+make the output larger than the scan it replaced. analyze_compression
+predicts the output size of each level without writing anything.
+"""
+
+import os
+
+import fitz  # PyMuPDF
+from django.test import SimpleTestCase
+
+from pdfapp import compress_pdf_lossy
+
+from .helpers import TempMediaTestCase
+
+
+def _image_doc(width, height, samples):
+    """
+    A one-page document with an RGB image; returns (doc, image xref).
+    """
+    doc = fitz.open()
+    page = doc.new_page()
+    pixmap = fitz.Pixmap(fitz.csRGB, width, height, samples, False)
+    xref = page.insert_image(page.rect, pixmap=pixmap)
+    return doc, xref
+
+
+class ReplaceImageStreamTests(SimpleTestCase):
+
+    def test_decode_entries_are_removed(self):
+        doc, xref = _image_doc(4, 2, bytes(range(24)))
+        self.addCleanup(doc.close)
+        doc.xref_set_key(xref, "DecodeParms", "<</Predictor 15 /Columns 4>>")
+        doc.xref_set_key(xref, "Decode", "[1 0 1 0 1 0]")
+
+        gray = bytes([0, 40, 80, 120, 160, 200, 240, 255])
+        compress_pdf_lossy._replace_image_stream(doc, xref, gray, 8)
+
+        keys = doc.xref_get_keys(xref)
+        self.assertNotIn("DecodeParms", keys)
+        self.assertNotIn("Decode", keys)
+        self.assertNotIn("null", doc.xref_object(xref))
+        self.assertEqual(doc.xref_get_key(xref, "ColorSpace"), ("name", "/DeviceGray"))
+
+        reopened = fitz.open("pdf", doc.tobytes())
+        self.addCleanup(reopened.close)
+        pixmap = fitz.Pixmap(reopened, xref)
+        self.assertEqual((pixmap.n, pixmap.samples), (1, gray))
+
+    def test_recoded_scan(self):
+        if compress_pdf_lossy.np is None:
+            self.skipTest("Scans are only recoded with NumPy")
+        # A near-gray "scan": paper with gray bands, in RGB
+        width = height = 900
+        row = bytes(v for x in range(width) for v in [255 - (x // 30) * 8] * 3)
+        doc, xref = _image_doc(width, height, row * height)
+        self.addCleanup(doc.close)
+        doc.xref_set_key(xref, "Decode", "[0 1 0 1 0 1]")
+
+        recoded = compress_pdf_lossy._recode_scans(doc, bitonal=False)
+
+        self.assertEqual(recoded, {"gray": 1, "bitonal": 0})
+        self.assertNotIn("Decode", doc.xref_get_keys(xref))
+        self.assertNotIn("null", doc.xref_object(xref))
+        self.assertEqual(fitz.Pixmap(doc, xref).n, 1)
+
+
+def _gray_photo_jpeg(width=1000, height=800):
+    """
+    A near-gray RGB photo (smooth shading plus grain) as JPEG bytes.
+    """
+    np = compress_pdf_lossy.np
+    rng = np.random.default_rng(1)
+    y, x = np.mgrid[0:height, 0:width]
+    gray = 128 + 60 * np.sin(x / 37) * np.cos(y / 53) + rng.normal(0, 18, (height, width))
+    pixels = np.repeat(gray.clip(0, 255).astype(np.uint8)[..., None], 3, axis=2)
+    pixmap = fitz.Pixmap(fitz.csRGB, width, height, pixels.tobytes(), False)
+    return pixmap.tobytes("jpg", jpg_quality=85)
+
+
+class RecodedScanSizeTests(TempMediaTestCase):
+
+    def test_gray_jpeg_never_grows(self):
+        if compress_pdf_lossy.np is None:
+            self.skipTest("Scans are only recoded with NumPy")
+        source = self.media / "photo.pdf"
+        with fitz.open() as doc:
+            page = doc.new_page(width=1000 * 72 / 150, height=800 * 72 / 150)  # 150 dpi
+            page.insert_image(page.rect, stream=_gray_photo_jpeg())
+            doc.save(source)
+
+        for level in (0, 10, 50):
+            with self.subTest(level=level):
+                output = self.media / f"out_{level}.pdf"
+                compress_pdf_lossy.compress_pdf_lossy_with_level(str(source), str(output),
+                                                                 level=level)
+                self.assertLessEqual(os.path.getsize(output), os.path.getsize(source))
+                with fitz.open(output) as doc:
+                    self.assertEqual(len(doc[0].get_images()), 1)
+
+
+def _color_photo_jpeg(width, height, seed):
+    """
+    A colourful photo (smooth shading plus grain) as a high-quality JPEG.
+    """
+    np = compress_pdf_lossy.np
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    channels = np.stack([128 + 90 * np.sin(x / 41),
+                         128 + 90 * np.cos(y / 29),
+                         128 + 60 * np.sin((x + y) / 67)], axis=2)
+    pixels = (channels + rng.normal(0, 14, (height, width, 3))).clip(0, 255).astype(np.uint8)
+    pixmap = fitz.Pixmap(fitz.csRGB, width, height, pixels.tobytes(), False)
+    return pixmap.tobytes("jpg", jpg_quality=95)
+
+
+class AnalyzeCompressionTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        if compress_pdf_lossy.np is None:
+            self.skipTest("The test photos are made with NumPy")
+        # Two 300 dpi photos with a caption each
+        self.source = self.media / "photos.pdf"
+        with fitz.open() as doc:
+            for n in range(2):
+                page = doc.new_page(width=1200 * 72 / 300, height=900 * 72 / 300)
+                page.insert_image(page.rect, stream=_color_photo_jpeg(1200, 900, seed=n))
+                page.insert_text((20, 20), f"Photo {n + 1}")
+            doc.save(self.source)
+
+    def test_inventory(self):
+        result = compress_pdf_lossy.analyze_compression(str(self.source), levels=(50,))
+        self.assertEqual(result["pages"], 2)
+        self.assertEqual(result["file_bytes"], os.path.getsize(self.source))
+        self.assertEqual([(img["kind"], round(img["dpi"])) for img in result["images"]],
+                         [("color", 300), ("color", 300)])
+        self.assertGreater(result["image_bytes"], 0.9 * result["file_bytes"])
+        # A dry run: nothing is written next to the source
+        self.assertEqual([p.name for p in self.media.iterdir()], ["photos.pdf"])
+
+    def test_prediction_close_to_output(self):
+        levels = (0, 50, 100)
+        result = compress_pdf_lossy.analyze_compression(str(self.source), levels=levels)
+        self.assertEqual([row["level"] for row in result["levels"]], list(levels))
+        estimates = [row["estimated_bytes"] for row in result["levels"]]
+        self.assertEqual(estimates, sorted(estimates, reverse=True))
+
+        for row in result["levels"]:
+            with self.subTest(level=row["level"]):
+                output = self.media / f"out_{row['level']}.pdf"
+                compress_pdf_lossy.compress_pdf_lossy_with_level(str(self.source), str(output),
+                                                                 level=row["level"])
+                actual = os.path.getsize(output)
+                self.assertLess(abs(row["estimated_bytes"] - actual), 0.2 * actual)
+                saving = 100 * (1 - row["estimated_bytes"] / result["file_bytes"])
+                self.assertAlmostEqual(row["estimated_saving_percent"], saving, places=0)
@@ -0,0 +1,73 @@
+"""
+The content-store upload handler: PDFs stream into the store, anything
+else is answered with a 400 and bodies over UPLOAD_MAX_BODY_BYTES with a
+413, without leaving anything in the store.
+"""
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.test import override_settings
+from django.urls import reverse
+
+from pdfapp.content_store import ContentStoreUploadHandler, UploadRejected, store_root
+
+from .helpers import TempMediaTestCase
+
+
+class UploadHandlerTests(TempMediaTestCase):
+
+    def post(self, name, data):
+        upload = SimpleUploadedFile(name, data, content_type="application/pdf")
+        return self.client.post(reverse("remove_pages"), {"pdf_files": upload, "remove_spec": "1"})
+
+    def stored_files(self):
+        return [p for p in store_root().rglob("*") if p.is_file()]
+
+    def stream(self, handler, chunks):
+        """
+        Feed `chunks` to `handler` as one 'pdf_files' file; returns what
+        file_complete() returns.
+        """
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file("pdf_files", "input.pdf", "application/pdf", None)
+        received = 0
+        for chunk in chunks:
+            handler.receive_data_chunk(chunk, received)
+            received += len(chunk)
+        return handler.file_complete(received)
+
+    def test_not_a_pdf_is_a_400(self):
+        response = self.post("notes.pdf", b"Just some notes, not a PDF.\n" * 100)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content, b"'notes.pdf' is not a PDF file.")
+        self.assertEqual(self.stored_files(), [])
+
+    def test_header_after_the_first_kb_is_a_400(self):
+        response = self.post("late.pdf", b" " * 1024 + b"%PDF-1.7\n")
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(UPLOAD_MAX_BODY_BYTES=1024 * 1024)
+    def test_too_large_is_a_413(self):
+        response = self.post("big.pdf", b"%PDF-1.7\n" + b"0" * (2 * 1024 * 1024))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.content, b"Upload is larger than 1 MB.")
+        self.assertEqual(self.stored_files(), [])
+
+    def test_too_large_while_streaming(self):
+        # No usable Content-Length: the handler counts the bytes
+        handler = ContentStoreUploadHandler(max_body=64 * 1024)
+        chunks = [b"%PDF-1.7\n" + b"0" * (32 * 1024)] + [b"0" * (32 * 1024)] * 2
+        with self.assertRaises(UploadRejected) as raised:
+            self.stream(handler, chunks)
+        self.assertEqual(raised.exception.status, 413)
+        self.assertEqual(self.stored_files(), [])
+
+    def test_duplicate(self):
+        data = [b"%PDF-1.7\n", b"same content\n%%EOF\n"]
+        first = self.stream(ContentStoreUploadHandler(), data)
+        second = self.stream(ContentStoreUploadHandler(), data)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        self.assertEqual((first.duplicate, second.duplicate), (False, True))
+        self.assertEqual(first.store_path, second.store_path)
+        self.assertEqual(self.stored_files(), [first.store_path])
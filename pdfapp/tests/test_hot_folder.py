@@ -0,0 +1,131 @@
+"""
+Hot-folder journal: content that was processed is skipped when it is
+dropped in again, content that failed is tried again, and a worker that
+dies does not stop the daemon.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from pdfapp import hot_folder
+from pdfapp.hot_folder import FAILED_DIR, PROCESSED_DIR, Journal, load_config, run
+
+from .helpers import make_pdf
+
+
+_run_pipeline = hot_folder.run_pipeline
+
+
+def _dying_pipeline(source, output_dir, pipeline):
+    """
+    run_pipeline(), except that a file named die.pdf kills the worker.
+    """
+    if Path(source).name == "die.pdf":
+        os._exit(1)
+    return _run_pipeline(source, output_dir, pipeline)
+
+
+class HotFolderTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def test_journal_counts_done_only(self):
+        path = self.tmp / "journal.jsonl"
+        journal = Journal(path)
+        journal.record({"folder": "f", "sha256": "a", "status": "failed"})
+        journal.record({"folder": "f", "sha256": "b", "status": "done"})
+        self.assertNotIn(("f", "a"), journal)
+        self.assertIn(("f", "b"), journal)
+        journal.record({"folder": "f", "sha256": "a", "status": "done"})
+        journal.close()
+
+        reopened = Journal(path)
+        self.addCleanup(reopened.close)
+        self.assertIn(("f", "a"), reopened)
+        self.assertEqual(len(reopened), 2)
+
+    def drop_and_run(self, config, name, source):
+        """
+        Copy `source` into the watched folder and run the daemon until it
+        has been filed away; returns the journal entries.
+        """
+        watch = self.tmp / "in"
+        shutil.copyfile(source, watch / name)
+        deadline = time.monotonic() + 60
+        with self.assertLogs("toolverse.hot_folder", "INFO"):
+            run(config, stop=lambda: not (watch / name).exists() or time.monotonic() > deadline)
+        self.assertFalse((watch / name).exists())
+        lines = (self.tmp / "journal.jsonl").read_text(encoding="utf-8").splitlines()
+        return [json.loads(line) for line in lines]
+
+    def test_failed_content_is_retried(self):
+        config_path = self.tmp / "hot_folders.json"
+        config_path.write_text(json.dumps({
+            "poll_seconds": 0.05, "settle_seconds": 0, "workers": 1,
+            "journal": "journal.jsonl",
+            "folders": [{"name": "remove", "watch": "in", "output": "out",
+                         "pipeline": [{"tool": "remove", "pages": "1"}]}],
+        }), encoding="utf-8")
+        config = load_config(config_path)
+        (self.tmp / "in").mkdir()
+        bad = self.tmp / "bad.pdf"
+        bad.write_bytes(b"%PDF-1.4\nnot really a PDF\n%%EOF\n")
+        good = make_pdf(self.tmp / "good.pdf")
+
+        entries = self.drop_and_run(config, "a.pdf", bad)
+        entries = self.drop_and_run(config, "b.pdf", bad)
+        self.assertEqual([e["status"] for e in entries], ["failed", "failed"])
+        self.assertEqual(sorted(p.name for p in (self.tmp / "in" / FAILED_DIR).iterdir()),
+                         ["a.pdf", "b.pdf"])
+
+        entries = self.drop_and_run(config, "c.pdf", good)
+        entries = self.drop_and_run(config, "d.pdf", good)
+        # d.pdf has the content of c.pdf: skipped, not journaled again
+        self.assertEqual([e["status"] for e in entries], ["failed", "failed", "done"])
+        self.assertEqual(sorted(p.name for p in (self.tmp / "in" / PROCESSED_DIR).iterdir()),
+                         ["c.pdf", "d.pdf"])
+        self.assertEqual([p.name for p in (self.tmp / "out").iterdir()], ["c.pdf"])
+
+    def test_dead_worker_replaced(self):
+        config_path = self.tmp / "hot_folders.json"
+        config_path.write_text(json.dumps({
+            "poll_seconds": 0.05, "settle_seconds": 0, "workers": 1,
+            "journal": "journal.jsonl",
+            "folders": [{"name": "remove", "watch": "in", "output": "out",
+                         "pipeline": [{"tool": "remove", "pages": "1"}]}],
+        }), encoding="utf-8")
+        config = load_config(config_path)
+        watch = self.tmp / "in"
+        watch.mkdir()
+        good = make_pdf(self.tmp / "good.pdf")
+        shutil.copyfile(good, watch / "die.pdf")
+        deadline = time.monotonic() + 60
+
+        def stop():
+            # Once die.pdf has been filed away, drop a file for the new pool
+            if (watch / "die.pdf").exists():
+                return time.monotonic() > deadline
+            if not (watch / PROCESSED_DIR / "good.pdf").exists() and not (watch / "good.pdf").exists():
+                shutil.copyfile(good, watch / "good.pdf")
+            return not (watch / "good.pdf").exists() or time.monotonic() > deadline
+
+        with mock.patch.object(hot_folder, "run_pipeline", _dying_pipeline), \
+                self.assertLogs("toolverse.hot_folder", "INFO") as logs:
+            run(config, stop=stop)
+
+        lines = (self.tmp / "journal.jsonl").read_text(encoding="utf-8").splitlines()
+        entries = [json.loads(line) for line in lines]
+        self.assertEqual([(Path(e["source"]).name, e["status"]) for e in entries],
+                         [("die.pdf", "failed"), ("good.pdf", "done")])
+        self.assertTrue(entries[0]["error"].startswith("BrokenProcessPool"))
+        self.assertTrue(any("starting a new pool" in line for line in logs.output))
+        self.assertTrue((watch / FAILED_DIR / "die.pdf").exists())
@@ -0,0 +1,63 @@
+"""
+pdfapp.isolation: each limit stops a call with ToolFailed and leaves the
+pool working, and children are replaced once worn out.
+"""
+
+import os
+import time
+from functools import partial
+
+from django.test import SimpleTestCase
+
+from pdfapp.isolation import MB, IsolatedPool, ToolLimitExceeded, ToolTimedOut
+
+
+class IsolatedPoolTests(SimpleTestCase):
+
+    def pool(self, **options):
+        limits = {"workers": 1, "memory_limit_mb": 0, "cpu_limit_seconds": 0, "timeout": 60}
+        pool = IsolatedPool(**{**limits, **options})
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def test_result(self):
+        self.assertEqual(self.pool().run(sorted, [3, 1, 2]), [1, 2, 3])
+
+    def test_tool_errors_are_raised_as_they_are(self):
+        with self.assertRaises(ValueError):
+            self.pool().run(int, "not a number")
+
+    def test_timeout(self):
+        pool = self.pool()
+        with self.assertRaisesMessage(ToolTimedOut, "longer than 0.5 seconds"):
+            pool.run(time.sleep, 30, timeout=0.5)
+        self.assertEqual(pool.run(abs, -1), 1)
+
+    def test_memory_limit(self):
+        pool = self.pool(memory_limit_mb=1024)
+        with self.assertRaisesMessage(ToolLimitExceeded, "more than 1024 MB"):
+            pool.run(bytearray, 2048 * MB)
+        self.assertEqual(pool.run(abs, -1), 1)
+
+    def test_cpu_limit(self):
+        pool = self.pool(cpu_limit_seconds=1)
+        with self.assertRaisesMessage(ToolLimitExceeded, "more than 1 seconds of CPU time"):
+            pool.run(partial(sum, range(10 ** 12)))
+        self.assertEqual(pool.run(abs, -1), 1)
+
+    def test_children_are_reused(self):
+        pool = self.pool()
+        self.assertEqual(pool.run(os.getpid), pool.run(os.getpid))
+
+    def test_max_calls_per_child(self):
+        pool = self.pool(max_calls_per_child=2)
+        pids = [pool.run(os.getpid) for _ in range(4)]
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertEqual(pids[2], pids[3])
+
+    def test_max_child_rss(self):
+        if not os.path.exists("/proc/self/statm"):
+            self.skipTest("No /proc to read the child's memory from")
+        pool = self.pool(max_child_rss_mb=1)
+        self.assertNotEqual(pool.run(os.getpid), pool.run(os.getpid))
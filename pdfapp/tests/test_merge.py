@@ -0,0 +1,81 @@
+"""
+merge_pdf_list: identical objects from different inputs are shared, up to
+whole trees of references, while pages and annotations stay distinct.
+"""
+
+import os
+
+import fitz  # PyMuPDF
+
+from pdfapp.merge_pdf import dedupe_objects, merge_pdf_list
+
+from .helpers import TempMediaTestCase, page_texts
+
+IMAGE_SIDE = 200
+
+
+def make_form_pdf(path, text, image):
+    """
+    One page: `text`, a note annotation and `image` (a pixmap with alpha,
+    so the image dict references its soft mask).
+    """
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), text)
+    page.insert_image(fitz.Rect(72, 100, 272, 300), pixmap=image)
+    page.add_text_annot((72, 400), "Checked")
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def image_xrefs(doc):
+    return [[item[0] for item in page.get_images()] for page in doc]
+
+
+class MergeDedupeTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Noise does not compress: each copy of the image is easy to see
+        image = fitz.Pixmap(fitz.csRGB, IMAGE_SIDE, IMAGE_SIDE,
+                            os.urandom(IMAGE_SIDE ** 2 * 4), 1)
+        self.inputs = [make_form_pdf(self.media / f"form{n}.pdf", f"Form {n}", image)
+                       for n in (1, 2, 3)]
+
+    def test_identical_trees_shared(self):
+        merged = fitz.open()
+        for path in self.inputs:
+            with fitz.open(path) as src:
+                merged.insert_pdf(src)
+        with merged:
+            before = image_xrefs(merged)
+            self.assertEqual(len({xrefs[0] for xrefs in before}), 3)
+            # The soft masks are identical first; that makes the images
+            # identical on the next pass
+            self.assertGreaterEqual(dedupe_objects(merged), 4)
+            after = image_xrefs(merged)
+            self.assertEqual(len({xrefs[0] for xrefs in after}), 1)
+
+    def test_merged_size_close_to_one_input(self):
+        output = self.media / "merged.pdf"
+        merge_pdf_list(self.inputs, output)
+        self.assertEqual(page_texts(output), ["Form 1", "Form 2", "Form 3"])
+        self.assertLess(output.stat().st_size, self.inputs[0].stat().st_size * 1.2)
+
+        plain = self.media / "plain.pdf"
+        merge_pdf_list(self.inputs, plain, dedupe=False, profile="fast")
+        self.assertGreater(plain.stat().st_size, self.inputs[0].stat().st_size * 2.5)
+
+    def test_pages_and_annotations_stay_distinct(self):
+        # Byte-identical inputs: still three pages, each with its own note
+        output = self.media / "merged.pdf"
+        merge_pdf_list([self.inputs[0]] * 3, output)
+        with fitz.open(output) as doc:
+            self.assertEqual(doc.page_count, 3)
+            annots = [[annot.xref for annot in page.annots()] for page in doc]
+            self.assertEqual([len(a) for a in annots], [1, 1, 1])
+            self.assertEqual(len({a[0] for a in annots}), 3)
+            for page in doc:
+                annot_page = doc.xref_get_key(page.first_annot.xref, "P")
+                self.assertEqual(annot_page, ("xref", f"{page.xref} 0 R"))
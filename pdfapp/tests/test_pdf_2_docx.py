@@ -0,0 +1,148 @@
+"""
+pdf_to_word_exact: the per-page layout cache is reused for unchanged
+pages only, and is pruned oldest first. Image-only pages become one
+picture each, a full-page JPEG passed through as it is.
+"""
+
+import os
+from unittest import mock
+
+import docx
+import fitz  # PyMuPDF
+
+from pdfapp import pdf_2_docx
+from pdfapp.pdf_2_docx import page_fingerprints, pdf_to_word_exact
+
+from .helpers import TempMediaTestCase, make_pdf
+
+
+def docx_text(path):
+    return [p.text for p in docx.Document(str(path)).paragraphs if p.text.strip()]
+
+
+def docx_images(path):
+    document = docx.Document(str(path))
+    return [part.blob for part in document.part.package.parts
+            if part.partname.startswith("/word/media/")]
+
+
+def scan_jpeg(width=595, height=842):
+    """
+    A JPEG with something on it, shaped like an A4 page (a 72 dpi scan):
+    placed on an A4 page it fills it exactly.
+    """
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(230)
+    pix.set_rect(fitz.IRect(40, 40, width - 40, 120), (20, 20, 120))
+    return pix.tobytes("jpg", jpg_quality=80)
+
+
+class PageCacheTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = self.media / "docx_cache"
+
+    def convert(self, pdf):
+        """
+        Convert with the cache; returns (paragraphs, pages parsed).
+        """
+        out = pdf.with_suffix(".docx")
+        with mock.patch.object(pdf_2_docx, "_cache_store", wraps=pdf_2_docx._cache_store) as store:
+            pdf_to_word_exact(pdf, out, cache_dir=self.cache)
+        return docx_text(out), store.call_count
+
+    def test_unchanged_pages_restored(self):
+        pdf = make_pdf(self.media / "thesis.pdf", pages=3, text="Chapter {n}")
+        text, parsed = self.convert(pdf)
+        self.assertEqual(text, ["Chapter 1", "Chapter 2", "Chapter 3"])
+        self.assertEqual(parsed, 3)
+        self.assertEqual(len(list(self.cache.glob("*.json.gz"))), 3)
+
+        # The same content again, under another name: nothing is parsed
+        again = self.media / "copy.pdf"
+        again.write_bytes(pdf.read_bytes())
+        self.assertEqual(self.convert(again), (text, 0))
+
+        # One page edited: only that page is parsed
+        with fitz.open(pdf) as doc:
+            doc[1].insert_text((72, 144), "Typo fixed")
+            doc.save(self.media / "edited.pdf")
+        text, parsed = self.convert(self.media / "edited.pdf")
+        self.assertEqual(parsed, 1)
+        self.assertEqual(text, ["Chapter 1", "Chapter 2", "Typo fixed", "Chapter 3"])
+
+    def test_fingerprints_follow_content(self):
+        with fitz.open(make_pdf(self.media / "a.pdf", pages=2, text="Same {n}")) as a, \
+                fitz.open(make_pdf(self.media / "b.pdf", pages=2, text="Same {n}")) as b:
+            self.assertEqual(page_fingerprints(a, {}), page_fingerprints(b, {}))
+            self.assertNotEqual(page_fingerprints(a, {}), page_fingerprints(a, {"zoom": 2}))
+            b[1].insert_text((72, 144), "Changed")
+            keys_a, keys_b = page_fingerprints(a, {}), page_fingerprints(b, {})
+        self.assertEqual(keys_a[0], keys_b[0])
+        self.assertNotEqual(keys_a[1], keys_b[1])
+
+    def test_prune_drops_oldest_first(self):
+        self.cache.mkdir()
+        for age, name in enumerate(["newest", "middle", "oldest"]):
+            path = self.cache / f"{name}.json.gz"
+            path.write_bytes(b"x" * 100)
+            mtime = 1_700_000_000 - age * 60
+            os.utime(path, (mtime, mtime))
+
+        pdf_2_docx._prune_cache(self.cache, max_bytes=250)
+        self.assertEqual(sorted(p.name for p in self.cache.iterdir()),
+                         ["middle.json.gz", "newest.json.gz"])
+        pdf_2_docx._prune_cache(self.cache, max_bytes=100)
+        self.assertEqual([p.name for p in self.cache.iterdir()], ["newest.json.gz"])
+
+
+class ImageOnlyPageTests(TempMediaTestCase):
+
+    def make_scan(self, path):
+        """
+        Page 1: a full-page JPEG (a scan). Page 2: text. Page 3: a small
+        picture next to nothing else, which is not a scan.
+        """
+        self.jpeg = scan_jpeg()
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=self.jpeg)
+        doc.new_page().insert_text((72, 72), "Typed page")
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(72, 72, 172, 212), stream=self.jpeg)
+        doc.save(path)
+        doc.close()
+        return path
+
+    def test_image_only_pages(self):
+        with fitz.open(self.make_scan(self.media / "scan.pdf")) as doc:
+            self.assertEqual(pdf_2_docx.image_only_pages(doc), [0])
+
+    def test_scan_jpeg_passed_through(self):
+        pdf = self.make_scan(self.media / "scan.pdf")
+        out = self.media / "scan.docx"
+        pictured = []
+        picture_page_layout = pdf_2_docx._picture_page_layout
+
+        def record(page):
+            pictured.append(page.number)
+            return picture_page_layout(page)
+
+        with mock.patch.object(pdf_2_docx, "_picture_page_layout", record):
+            pdf_to_word_exact(pdf, out)
+        self.assertEqual(pictured, [0])
+        self.assertIn("Typed page", docx_text(out))
+        self.assertIn(self.jpeg, docx_images(out))
+
+    def test_rotated_scan_rendered(self):
+        pdf = self.make_scan(self.media / "scan.pdf")
+        with fitz.open(pdf) as doc:
+            doc[0].set_rotation(90)
+            doc.save(self.media / "rotated.pdf")
+        with fitz.open(self.media / "rotated.pdf") as doc:
+            self.assertEqual(pdf_2_docx.image_only_pages(doc), [0])
+            image, width, height = pdf_2_docx._page_picture(doc[0])
+        self.assertNotEqual(image, self.jpeg)
+        self.assertGreater(width, height)
+        self.assertEqual(fitz.Pixmap(image).width, width)
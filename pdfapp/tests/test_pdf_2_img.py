@@ -0,0 +1,117 @@
+"""
+pdf_to_images: pages stay within the pixel budget, tiled rendering
+gives the same image as rendering the page in one piece, and each output
+format is written as asked. The view stores the images in the ZIP
+without deflating them again.
+"""
+
+import io
+import math
+import zipfile
+
+import fitz  # PyMuPDF
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+
+from pdfapp.pdf_2_img import fit_zoom_to_budget, pdf_to_images
+
+from .helpers import TempMediaTestCase, make_pdf
+
+
+class PixelBudgetTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pdf = make_pdf(self.media / "input.pdf", pages=2)
+        self.out = self.media / "images"
+
+    def test_fit_zoom_to_budget(self):
+        rect = fitz.Rect(0, 0, 600, 800)
+        self.assertEqual(fit_zoom_to_budget(rect, 2.0, 10_000_000), 2.0)
+        zoom = fit_zoom_to_budget(rect, 2.0, 480_000)
+        self.assertAlmostEqual(zoom, 1.0, places=2)
+        # Room is left for the render being rounded up to whole pixels
+        self.assertLessEqual(math.ceil(rect.width * zoom) * math.ceil(rect.height * zoom), 480_000)
+
+    def test_pages_downscaled_to_budget(self):
+        pdf_to_images(str(self.pdf), str(self.out), zoom=4.0, max_pixels=500_000)
+        for name in ("page_001.png", "page_002.png"):
+            pix = fitz.Pixmap(str(self.out / name))
+            self.assertLessEqual(pix.width * pix.height, 500_000)
+            self.assertGreater(pix.width * pix.height, 450_000)
+
+    def test_page_spec(self):
+        pdf_to_images(str(self.pdf), str(self.out), zoom=0.5, pages="2")
+        self.assertEqual([p.name for p in self.out.iterdir()], ["page_002.png"])
+
+    def test_tiled_matches_single_render(self):
+        # Small bands: the page is rendered in many pieces
+        pdf_to_images(str(self.pdf), str(self.out), zoom=1.5, pages="1",
+                      tiled=True, band_pixels=50_000)
+        tiled = fitz.Pixmap(str(self.out / "page_001.png"))
+
+        with fitz.open(self.pdf) as doc:
+            whole = doc[0].get_pixmap(matrix=fitz.Matrix(1.5, 1.5), alpha=False)
+        self.assertEqual((tiled.width, tiled.height, tiled.n), (whole.width, whole.height, whole.n))
+        self.assertEqual(tiled.samples, whole.samples)
+
+    def test_tiled_is_png_only(self):
+        with self.assertRaisesMessage(ValueError, "only supports PNG"):
+            pdf_to_images(str(self.pdf), str(self.out), tiled=True, image_format="jpg")
+
+
+class ImageFormatTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pdf = make_pdf(self.media / "input.pdf", pages=2)
+        self.out = self.media / "images"
+
+    def export(self, **options):
+        pdf_to_images(str(self.pdf), str(self.out), zoom=1.0, **options)
+        return sorted(p.name for p in self.out.iterdir())
+
+    def test_jpeg(self):
+        self.assertEqual(self.export(image_format="jpeg", quality=60),
+                         ["page_001.jpg", "page_002.jpg"])
+        with Image.open(self.out / "page_001.jpg") as image:
+            self.assertEqual((image.format, image.mode), ("JPEG", "RGB"))
+
+    def test_webp(self):
+        self.assertEqual(self.export(image_format="webp"), ["page_001.webp", "page_002.webp"])
+        with Image.open(self.out / "page_002.webp") as image:
+            self.assertEqual(image.format, "WEBP")
+
+    def test_grayscale(self):
+        self.export(image_format="jpg", grayscale=True)
+        with Image.open(self.out / "page_001.jpg") as image:
+            self.assertEqual(image.mode, "L")
+        self.export(grayscale=True, png_level=9)
+        with Image.open(self.out / "page_001.png") as image:
+            self.assertEqual(image.mode, "L")
+
+    def test_png_level(self):
+        # Level 0 stores the rows; the default deflates them
+        self.export(png_level=0)
+        stored = (self.out / "page_001.png").stat().st_size
+        self.export()
+        self.assertLess((self.out / "page_001.png").stat().st_size, stored / 10)
+        with Image.open(self.out / "page_001.png") as image:
+            image.load()
+
+    def test_unknown_format(self):
+        with self.assertRaisesMessage(ValueError, "Unsupported image format 'gif'"):
+            self.export(image_format="gif")
+
+    def test_view_stores_images_in_zip(self):
+        upload = SimpleUploadedFile("input.pdf", self.pdf.read_bytes(), content_type="application/pdf")
+        response = self.client.post(reverse("pdf_to_images"),
+                                    {"pdf_files": upload, "image_format": "jpg", "zoom": "1"})
+        self.assertEqual(response.status_code, 200)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        with zipfile.ZipFile(io.BytesIO(body)) as zf:
+            infos = zf.infolist()
+        self.assertEqual([i.filename for i in infos], ["page_001.jpg", "page_002.jpg"])
+        self.assertEqual({i.compress_type for i in infos}, {zipfile.ZIP_STORED})
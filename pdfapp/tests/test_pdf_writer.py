@@ -0,0 +1,150 @@
+"""
+pdf_writer.save_incremental(): the page tools' incremental updates must
+leave the input bytes as they were, append a valid update and pass
+qpdf's checks, for every xref layout.
+"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import fitz  # PyMuPDF
+from django.test import SimpleTestCase
+
+from pdfapp import pdf_writer
+from pdfapp.edit_pdf import edit_pdf
+from pdfapp.extract_pages import extract_pages
+from pdfapp.password_protect import password_protect
+from pdfapp.remove_pages import remove_pages
+
+from .helpers import page_texts
+
+try:
+    import pikepdf
+except ImportError:  # no qpdf to check with
+    pikepdf = None
+
+
+PAGES = 6
+
+
+def _write_fixtures(folder: Path):
+    """
+    The same PAGES-page document in every layout an update is appended
+    to. Returns {variant: path}.
+    """
+    doc = fitz.open()
+    for n in range(1, PAGES + 1):
+        doc.new_page().insert_text((72, 72), f"Page {n}")
+    variants = {
+        "xref_table": folder / "xref_table.pdf",
+        "object_streams": folder / "object_streams.pdf",
+        # Opens without a password; updated with MuPDF's own saveIncr()
+        "encrypted": folder / "encrypted.pdf",
+    }
+    doc.save(variants["xref_table"], deflate=True)
+    doc.save(variants["object_streams"], garbage=3, deflate=True, use_objstms=1)
+    doc.save(variants["encrypted"], encryption=fitz.PDF_ENCRYPT_AES_256,
+             owner_pw="owner", user_pw="")
+    doc.close()
+    variants["linearized"] = folder / "linearized.pdf"
+    with pikepdf.open(variants["xref_table"]) as pdf:
+        pdf.save(variants["linearized"], linearize=True)
+    return variants
+
+
+@unittest.skipUnless(pikepdf, "pikepdf (qpdf) is not installed")
+class SaveIncrementalTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = Path(tempfile.mkdtemp())
+        cls.variants = _write_fixtures(cls.tmp)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+        super().tearDownClass()
+
+    def output(self):
+        return Path(tempfile.mkdtemp(dir=self.tmp)) / "out.pdf"
+
+    def assert_valid_update(self, source: Path, output: Path, texts):
+        self.assertTrue(output.read_bytes().startswith(source.read_bytes()),
+                        "the input bytes were rewritten")
+        with pikepdf.open(output) as pdf:
+            self.assertEqual(pdf.check_pdf_syntax(), [])
+        with fitz.open(output) as doc:
+            self.assertFalse(doc.is_repaired)
+        self.assertEqual(page_texts(output), texts)
+
+    def test_remove_pages(self):
+        for variant, source in self.variants.items():
+            with self.subTest(variant):
+                output = self.output()
+                remove_pages(str(source), "2,5", str(output), incremental=True)
+                self.assert_valid_update(source, output, ["Page 1", "Page 3", "Page 4", "Page 6"])
+
+    def test_extract_pages(self):
+        for variant, source in self.variants.items():
+            with self.subTest(variant):
+                output = self.output()
+                extract_pages(str(source), "2-3", str(output), incremental=True)
+                self.assert_valid_update(source, output, ["Page 2", "Page 3"])
+
+    def test_edit_pdf(self):
+        for variant, source in self.variants.items():
+            with self.subTest(variant):
+                output = self.output()
+                edit_pdf(str(source), str(output), order="6,1-5", rotate=90, rotate_pages="1",
+                         metadata={"title": "Updated"})
+                self.assert_valid_update(source, output, [f"Page {n}" for n in (6, 1, 2, 3, 4, 5)])
+                with fitz.open(output) as doc:
+                    self.assertEqual(doc.metadata["title"], "Updated")
+                    self.assertEqual(doc[1].rotation, 90)
+
+    def test_unchecked_pymupdf_uses_saveincr(self):
+        source = self.variants["object_streams"]
+        output = self.output()
+        with mock.patch.object(pdf_writer, "XREF_INTERNALS_VERSIONS", ((0,), (0,))), \
+                mock.patch.object(pdf_writer, "_warned_no_xref_internals", False), \
+                self.assertLogs("pdfapp.pdf_writer", "WARNING"):
+            remove_pages(str(source), "1", str(output), incremental=True)
+        self.assert_valid_update(source, output, [f"Page {n}" for n in range(2, PAGES + 1)])
+
+    def test_copy_for_update(self):
+        source = self.variants["xref_table"]
+        output = self.output()
+        method = pdf_writer.copy_for_update(source, output)
+        self.assertIn(method, ("reflink", "copy_file_range", "copy"))
+        self.assertEqual(output.read_bytes(), source.read_bytes())
+
+
+@unittest.skipUnless(pikepdf, "pikepdf (qpdf) is not installed")
+class LinearizedEncryptionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def test_user_password_only(self):
+        source = self.tmp / "in.pdf"
+        output = self.tmp / "out.pdf"
+        with fitz.open() as doc:
+            doc.new_page().insert_text((72, 72), "Secret page")
+            doc.save(source)
+        password_protect(str(source), str(output), user_pwd="secret", profile="web")
+
+        with self.assertRaises(pikepdf.PasswordError):
+            pikepdf.open(output)
+        with self.assertRaises(pikepdf.PasswordError):
+            pikepdf.open(output, password="")
+        with pikepdf.open(output, password="secret") as pdf:
+            self.assertTrue(pdf.is_linearized)
+            self.assertTrue(pdf.owner_password_matched)
+        with fitz.open(output) as doc:
+            self.assertTrue(doc.needs_pass)
+            self.assertTrue(doc.authenticate("secret"))
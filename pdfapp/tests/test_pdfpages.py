@@ -0,0 +1,138 @@
+"""
+pdfpages.js, the in-browser page tools, checked in Node against MuPDF:
+the pages it writes must have the text of the pages they were taken
+from, for classic xref tables, object streams and linearized files, and
+its page-spec errors must match the server's.
+"""
+
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from django.test import SimpleTestCase
+
+from pdfapp.extract_pages import parse_extract_spec
+from pdfapp.remove_pages import parse_remove_spec
+from pdfapp.split_pdf import parse_split_spec
+
+from .helpers import page_texts
+
+try:
+    import pikepdf
+except ImportError:  # no linearized variant
+    pikepdf = None
+
+
+CLI = Path(__file__).with_name("pdfpages_cli.js")
+NODE = shutil.which("node")
+
+PAGES = 6
+
+
+def _write_fixtures(folder: Path):
+    """
+    The same PAGES-page document saved in every layout pdfpages.js reads.
+    Returns {variant: path}.
+    """
+    doc = fitz.open()
+    for n in range(1, PAGES + 1):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {n} of the fixture")
+    variants = {
+        "xref_table": folder / "xref_table.pdf",
+        "object_streams": folder / "object_streams.pdf",
+    }
+    doc.save(variants["xref_table"], deflate=True)
+    doc.save(variants["object_streams"], garbage=3, deflate=True, use_objstms=1)
+    doc.save(folder / "encrypted.pdf", encryption=fitz.PDF_ENCRYPT_AES_256,
+             owner_pw="owner", user_pw="user")
+    doc.close()
+    if pikepdf is not None:
+        variants["linearized"] = folder / "linearized.pdf"
+        with pikepdf.open(variants["xref_table"]) as pdf:
+            pdf.save(variants["linearized"], linearize=True)
+    return variants
+
+
+@unittest.skipUnless(NODE, "Node.js is not installed")
+class PdfPagesTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = Path(tempfile.mkdtemp())
+        cls.variants = _write_fixtures(cls.tmp)
+        cls.pages = page_texts(cls.variants["xref_table"])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+        super().tearDownClass()
+
+    def run_js(self, op, spec, *inputs):
+        """
+        Run one pdfpages.js operation; returns (result JSON, output folder).
+        """
+        out = Path(tempfile.mkdtemp(dir=self.tmp))
+        completed = subprocess.run([NODE, str(CLI), op, spec, str(out), *map(str, inputs)],
+                                   capture_output=True, text=True, timeout=60)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        return json.loads(completed.stdout), out
+
+    def test_extract(self):
+        for variant, path in self.variants.items():
+            with self.subTest(variant):
+                result, out = self.run_js("extract", "2-3,1", path)
+                self.assertEqual(result, {"outputs": ["extract.pdf"]})
+                self.assertEqual(page_texts(out / "extract.pdf"), self.pages[:3])
+
+    def test_remove(self):
+        for variant, path in self.variants.items():
+            with self.subTest(variant):
+                result, out = self.run_js("remove", "1,3-4", path)
+                self.assertEqual(result, {"outputs": ["remove.pdf"]})
+                self.assertEqual(page_texts(out / "remove.pdf"), [self.pages[1]] + self.pages[4:])
+
+    def test_split(self):
+        for variant, path in self.variants.items():
+            with self.subTest(variant):
+                result, out = self.run_js("split", "2,4", path)
+                names = ["part_part1_1-2.pdf", "part_part2_3-4.pdf", f"part_part3_5-{PAGES}.pdf"]
+                self.assertEqual(result, {"outputs": names})
+                self.assertEqual([text for name in names for text in page_texts(out / name)],
+                                 self.pages)
+
+    def test_merge_mixed_layouts(self):
+        inputs = list(self.variants.values())
+        result, out = self.run_js("merge", "", *inputs)
+        self.assertEqual(result, {"outputs": ["merged_output.pdf"]})
+        self.assertEqual(page_texts(out / "merged_output.pdf"), self.pages * len(inputs))
+
+    def test_encrypted_is_left_to_the_server(self):
+        result, _ = self.run_js("extract", "1", self.tmp / "encrypted.pdf")
+        self.assertEqual(result["error"], "EncryptedPdfError")
+
+    def test_damaged_is_left_to_the_server(self):
+        junk = self.tmp / "junk.pdf"
+        junk.write_bytes(b"%PDF-1.4\ngarbage\n%%EOF\n")
+        result, _ = self.run_js("extract", "1", junk)
+        self.assertEqual(result["error"], "PdfError")
+
+    def test_spec_errors_match_the_server(self):
+        path = self.variants["xref_table"]
+        cases = [
+            ("extract", parse_extract_spec, ["0", "2-1", "9", "a", " "]),
+            ("remove", parse_remove_spec, ["0", "3-9", "x"]),
+            ("split", parse_split_spec, ["6", "0", "2-9"]),
+        ]
+        for op, parse, specs in cases:
+            for spec in specs:
+                with self.subTest(op=op, spec=spec):
+                    with self.assertRaises(ValueError) as server:
+                        parse(spec, PAGES)
+                    result, _ = self.run_js(op, spec, path)
+                    self.assertEqual(result, {"error": "SpecError", "message": str(server.exception)})
@@ -0,0 +1,79 @@
+"""
+pdfapp.progress: job state is shared through the job database, so the
+progress stream and the cancel of a job may reach another worker than
+the one running it.
+"""
+
+import json
+import secrets
+from unittest import mock
+
+from django.urls import reverse
+
+from pdfapp import compress_pdf_lossy, progress
+
+from .helpers import TempMediaTestCase, make_pdf
+
+
+class ProgressTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.job_id = secrets.token_hex(16)
+
+    def events(self, response):
+        body = b"".join(response.streaming_content).decode()
+        response.close()
+        return [json.loads(line[len("data: "):]) for line in body.splitlines()
+                if line.startswith("data: ")]
+
+    def test_stream_reads_the_shared_state(self):
+        with progress.track(self.job_id) as report:
+            report(2, 4)
+        # A new handle on the job, as in another worker
+        response = self.client.get(reverse("progress", args=[self.job_id]))
+        [state] = self.events(response)
+        self.assertEqual((state["status"], state["done"], state["total"]), ("done", 4, 4))
+
+    def test_cancel_from_another_worker(self):
+        with mock.patch.object(progress, "CANCEL_POLL_SECONDS", 0):
+            token = progress.cancel_token(self.job_id)
+            self.assertFalse(token.cancelled)
+            response = self.client.post(reverse("cancel_job", args=[self.job_id]))
+            self.assertEqual(response.status_code, 202)
+            with self.assertRaises(progress.Cancelled):
+                token.check()
+
+    def test_failure_is_recorded(self):
+        with self.assertRaises(ValueError):
+            with progress.track(self.job_id):
+                raise ValueError("No valid pages to extract.")
+        state = progress.get_job(self.job_id).snapshot()
+        self.assertEqual((state["status"], state["message"]),
+                         ("error", "No valid pages to extract."))
+
+    def test_invalid_job_id(self):
+        self.assertIsNone(progress.cancel_token("not-a-job"))
+        self.assertEqual(self.client.get("/progress/not-a-job/").status_code, 400)
+
+
+class CompressCancelTests(TempMediaTestCase):
+
+    def test_cancel_between_pages(self):
+        if compress_pdf_lossy.np is None:
+            self.skipTest("Scans are only recoded (page by page) with NumPy")
+        source = make_pdf(self.media / "in.pdf", pages=5)
+        output = self.media / "out.pdf"
+        token = progress.CancelToken()
+        reported = []
+
+        def report(done, total, bytes_written=0):
+            reported.append(done)
+            if done == 2:
+                token.cancel()
+
+        with self.assertRaises(progress.Cancelled):
+            compress_pdf_lossy.compress_pdf_lossy_with_level(
+                str(source), str(output), progress=report, cancel=token)
+        self.assertEqual(reported, [0, 1, 2])
+        self.assertFalse(output.exists())
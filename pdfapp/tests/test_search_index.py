@@ -0,0 +1,79 @@
+"""
+Indexing: the text is read before the index is written to, so other
+writers are never blocked while a document is being read, and uploads
+are read in an isolated child.
+"""
+
+import sqlite3
+from unittest import mock
+
+from pdfapp import isolation, search_index
+
+from .helpers import TempMediaTestCase, make_pdf
+
+
+class IndexPdfTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = self.media / "index.sqlite3"
+        self.conn = search_index.connect(self.db)
+        self.addCleanup(self.conn.close)
+
+    def test_index_and_search(self):
+        pdf = make_pdf(self.media / "report.pdf", pages=3, text="Quarterly report page {n}")
+        self.assertTrue(search_index.index_pdf(self.conn, pdf, "report.pdf"))
+        self.assertFalse(search_index.index_pdf(self.conn, pdf, "copy.pdf"))
+
+        [result] = search_index.search(self.conn, "quarterly")
+        self.assertEqual(result["paths"], ["copy.pdf", "report.pdf"])
+        self.assertEqual(result["page_count"], 3)
+        self.assertEqual(sorted(result["pages"]), [1, 2, 3])
+
+    def test_other_writers_not_blocked_while_reading(self):
+        pdf = make_pdf(self.media / "long.pdf", pages=3)
+        other = sqlite3.connect(str(self.db), timeout=0)
+        self.addCleanup(other.close)
+        writes = []
+        real_iter_page_text = search_index.iter_page_text
+
+        def slow_pages(path, sort=False):
+            for page in real_iter_page_text(path, sort=sort):
+                # Another worker writes while this document is being read;
+                # with timeout=0 it fails at once if a write is pending
+                with other:
+                    other.execute(
+                        "INSERT OR REPLACE INTO paths (path, doc_id) VALUES (?, 0)", ("other.pdf",)
+                    )
+                writes.append(page[0])
+                yield page
+
+        with mock.patch.object(search_index, "iter_page_text", slow_pages):
+            self.assertTrue(search_index.index_pdf(self.conn, pdf, "long.pdf"))
+        self.assertEqual(writes, [1, 2, 3])
+        self.assertEqual(len(search_index.search(self.conn, "page")), 1)
+
+    def test_unreadable_pdf_recorded_without_pages(self):
+        broken = self.media / "broken.pdf"
+        broken.write_bytes(b"%PDF-1.7\nnot really a PDF\n")
+        self.assertTrue(search_index.index_pdf(self.conn, broken, "broken.pdf"))
+        pages, = self.conn.execute("SELECT pages FROM documents").fetchone()
+        self.assertEqual(pages, 0)
+
+    def test_uploads_read_in_isolated_child(self):
+        pdf = make_pdf(self.media / "upload.pdf", pages=2, text="Isolated page {n}")
+        reader = search_index._read_pages_isolated
+        self.assertTrue(search_index.index_pdf(self.conn, pdf, "upload.pdf", reader=reader))
+        [result] = search_index.search(self.conn, "isolated")
+        self.assertEqual(sorted(result["pages"]), [1, 2])
+
+    def test_upload_over_a_limit_recorded_without_pages(self):
+        pdf = make_pdf(self.media / "upload.pdf", pages=2)
+        timed_out = isolation.ToolTimedOut("The tool ran longer than 900 seconds.")
+        with mock.patch.object(isolation, "run", side_effect=timed_out):
+            self.assertTrue(search_index.index_pdf(
+                self.conn, pdf, "upload.pdf", reader=search_index._read_pages_isolated,
+            ))
+        pages, = self.conn.execute("SELECT pages FROM documents").fetchone()
+        self.assertEqual(pages, 0)
+        self.assertEqual(search_index.search(self.conn, "page"), [])
@@ -0,0 +1,64 @@
+"""
+split_pdf: with optimize, each part keeps only the resources its own
+pages use, so the parts together stay close to the source size.
+"""
+
+import os
+
+import fitz  # PyMuPDF
+
+from pdfapp.split_pdf import split_pdf
+
+from .helpers import TempMediaTestCase, page_texts
+
+IMAGE_SIDE = 300
+
+
+def make_shared_resources_pdf(path, pages: int = 4):
+    """
+    A PDF whose pages all share one /Resources dictionary holding a large
+    image that only page 1 draws (the way some producers write them).
+    """
+    doc = fitz.open()
+    for n in range(1, pages + 1):
+        doc.new_page().insert_text((72, 72), f"Page {n}")
+    noise = fitz.Pixmap(fitz.csRGB, IMAGE_SIDE, IMAGE_SIDE, os.urandom(IMAGE_SIDE ** 2 * 3), 0)
+    doc[0].insert_image(fitz.Rect(72, 100, 372, 400), pixmap=noise)
+
+    kind, value = doc.xref_get_key(doc[0].xref, "Resources")
+    resources = doc.get_new_xref()
+    doc.update_object(resources, value if kind == "dict" else doc.xref_object(int(value.split()[0])))
+    for page in doc:
+        doc.xref_set_key(page.xref, "Resources", f"{resources} 0 R")
+    doc.save(path)
+    doc.close()
+    return path
+
+
+class SplitSizeTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pdf = make_shared_resources_pdf(self.media / "shared.pdf")
+        self.image_bytes = IMAGE_SIDE ** 2 * 3
+
+    def split(self, optimize):
+        out = self.media / ("optimized" if optimize else "plain")
+        split_pdf(str(self.pdf), "1,2,3", str(out), optimize=optimize)
+        return sorted(out.iterdir())
+
+    def test_parts_keep_only_their_resources(self):
+        parts = self.split(optimize=True)
+        self.assertEqual([p.name for p in parts],
+                         [f"shared_part{i}_{i}-{i}.pdf" for i in range(1, 5)])
+        self.assertEqual([page_texts(p) for p in parts],
+                         [["Page 1"], ["Page 2"], ["Page 3"], ["Page 4"]])
+        sizes = [p.stat().st_size for p in parts]
+        self.assertGreater(sizes[0], self.image_bytes)
+        for size in sizes[1:]:
+            self.assertLess(size, self.image_bytes / 20)
+        self.assertLess(sum(sizes), self.pdf.stat().st_size * 1.2)
+
+    def test_without_optimize_every_part_carries_the_image(self):
+        for part in self.split(optimize=False):
+            self.assertGreater(part.stat().st_size, self.image_bytes)
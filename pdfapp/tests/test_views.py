@@ -0,0 +1,196 @@
+"""
+The tool views, posted to through the URLconf like the homepage does.
+"""
+
+import json
+from types import SimpleNamespace
+
+import fitz  # PyMuPDF
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from pdfapp import metrics, search_index
+
+from .helpers import TempMediaTestCase, make_pdf, page_texts
+
+
+class PageToolViewTests(TempMediaTestCase):
+
+    def post(self, name, pages=3, **fields):
+        pdf = make_pdf(self.media / "input.pdf", pages)
+        with open(pdf, "rb") as f:
+            response = self.client.post(reverse(name), {"pdf_files": f, **fields})
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_page_tools_are_routed(self):
+        for name, path in (("remove_pages", "/remove-pages/"),
+                           ("extract_pages", "/extract-pages/"),
+                           ("split_pdf", "/split-pdf/")):
+            with self.subTest(name):
+                self.assertEqual(reverse(name), path)
+                self.assertEqual(self.client.get(path).status_code, 400)
+
+    def test_remove_pages(self):
+        response, body = self.post("remove_pages", remove_spec="2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(page_texts(body), ["Page 1", "Page 3"])
+
+    def test_extract_pages(self):
+        response, body = self.post("extract_pages", pages_spec="2-3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(page_texts(body), ["Page 2", "Page 3"])
+
+    def test_bad_spec_is_a_400(self):
+        response, body = self.post("remove_pages", remove_spec="9")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"Invalid page / range '9'", body)
+
+
+class ImagesToPdfViewTests(TempMediaTestCase):
+
+    def images(self, *formats):
+        files = []
+        for n, fmt in enumerate(formats, 1):
+            pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 40 * n, 30), False)
+            pixmap.clear_with(200)
+            path = self.media / f"image{n}.{fmt}"
+            path.write_bytes(pixmap.tobytes(fmt))
+            files.append(open(path, "rb"))
+            self.addCleanup(files[-1].close)
+        return files
+
+    def test_images_to_pdf(self):
+        files = self.images("jpeg", "png")
+        self.assertEqual(reverse("images_to_pdf"), "/images-to-pdf/")
+        response = self.client.post(reverse("images_to_pdf"),
+                                    {"image_files": files, "page_size": "a4", "margin": "10"})
+        self.assertEqual(response.status_code, 200)
+        body = b"".join(response.streaming_content)
+        response.close()
+        with fitz.open("pdf", body) as doc:
+            self.assertEqual(doc.page_count, 2)
+            self.assertEqual([len(page.get_images()) for page in doc], [1, 1])
+
+    def test_unknown_page_size_is_a_400(self):
+        response = self.client.post(reverse("images_to_pdf"),
+                                    {"image_files": self.images("png"), "page_size": "b99"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content, b"Unknown page size 'b99'.")
+
+    # The manifest storage needs collectstatic, the plain one does not
+    @override_settings(STORAGES={
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    })
+    def test_homepage_form(self):
+        response = self.client.get(reverse("home"))
+        self.assertContains(response, 'action="/images-to-pdf/"')
+
+
+class RequestFolderTests(TempMediaTestCase):
+    """
+    Requests for files with the same name don't share inputs or outputs.
+    """
+
+    def upload(self, text, name="same.pdf"):
+        path = make_pdf(self.media / f"{text}.pdf", text=f"{text} {{n}}")
+        return SimpleUploadedFile(name, path.read_bytes(), "application/pdf")
+
+    def test_tools_are_routed(self):
+        for name in ("compress_pdf", "pdf_to_images", "extract_text",
+                     "password_protect", "unlock_pdf"):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse(name)).status_code, 400)
+
+    def test_same_name_outputs(self):
+        first = self.client.post(reverse("remove_pages"),
+                                 {"pdf_files": self.upload("First"), "remove_spec": "1"})
+        second = self.client.post(reverse("remove_pages"),
+                                  {"pdf_files": self.upload("Second"), "remove_spec": "3"})
+        # The first download is read after the second request has run
+        self.assertEqual(page_texts(b"".join(first.streaming_content)), ["First 2", "First 3"])
+        self.assertEqual(page_texts(b"".join(second.streaming_content)), ["Second 1", "Second 2"])
+        first.close()
+        second.close()
+
+    def test_merge_same_names(self):
+        response = self.client.post(reverse("merge_pdf"),
+                                    {"pdf_files": [self.upload("A"), self.upload("B")]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(page_texts(b"".join(response.streaming_content)),
+                         ["A 1", "A 2", "A 3", "B 1", "B 2", "B 3"])
+        response.close()
+
+    def request_folders(self):
+        return sorted(p.relative_to(self.media).as_posix()
+                      for p in self.media.glob("*/request_*"))
+
+    def test_folders_removed_when_closed(self):
+        response = self.client.post(reverse("remove_pages"),
+                                    {"pdf_files": self.upload("First"), "remove_spec": "1"})
+        self.assertEqual(len(self.request_folders()), 2)  # uploads/ and outputs/
+        b"".join(response.streaming_content)
+        response.close()
+        self.assertEqual(self.request_folders(), [])
+
+    def test_folders_removed_after_errors(self):
+        response = self.client.post(reverse("remove_pages"),
+                                    {"pdf_files": self.upload("First"), "remove_spec": "9"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.request_folders(), [])
+
+    def test_extract_text_has_no_outputs_folder(self):
+        response = self.client.post(reverse("extract_text"), {"pdf_files": self.upload("Text")})
+        self.assertEqual([p.split("/")[0] for p in self.request_folders()], ["uploads"])
+        self.assertIn(b"Text 1", b"".join(response.streaming_content))
+        response.close()
+        self.assertEqual(self.request_folders(), [])
+
+
+class SearchAccessTests(TempMediaTestCase):
+
+    def test_staff_only(self):
+        url = reverse("search") + "?q=invoice"
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        request = RequestFactory().get(url)
+        request.user = SimpleNamespace(is_staff=True, is_authenticated=True)
+        response = search_index.search_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["results"], [])
+
+
+class MetricsAccessTests(TempMediaTestCase):
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_staff_only(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        request = RequestFactory().get(reverse("metrics"))
+        request.user = SimpleNamespace(is_staff=True, is_authenticated=True)
+        response = metrics.metrics_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"toolverse_", response.content)
+
+    def test_allowed_ips(self):
+        with override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"]):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+            response = self.client.get(reverse("metrics"), REMOTE_ADDR="10.0.0.5")
+            self.assertEqual(response.status_code, 200)
+
+
+class ResponseBytesTests(TempMediaTestCase):
+
+    def test_streamed_bytes_counted(self):
+        upload = SimpleUploadedFile("text.pdf", make_pdf(self.media / "text.pdf").read_bytes(),
+                                    content_type="application/pdf")
+        response = self.client.post(reverse("extract_text"), {"pdf_files": upload})
+        self.assertFalse(response.has_header("Content-Length"))
+        body = b"".join(response.streaming_content)
+        response.close()
+        self.assertIn(b"Page 3", body)
+        self.assertEqual(response.wsgi_request.toolverse_timing.bytes_out, len(body))
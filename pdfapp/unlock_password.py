@@ -1,12 +1,12 @@
 '''
 1. single file -> auto name
-    python unlock_pdf_fitz.py Files/Final_Thesis_locked.pdf "yourPassword123"
+    python -m pdfapp.unlock_password Files/Final_Thesis_locked.pdf "yourPassword123"
 
 2. single file -> custom output path
-    python unlock_pdf_fitz.py Files/Final_Thesis_locked.pdf "yourPassword123" -o "Files/Final_Thesis_unlocked.pdf"
+    python -m pdfapp.unlock_password Files/Final_Thesis_locked.pdf "yourPassword123" -o "Files/Final_Thesis_unlocked.pdf"
 
 3. batch: unlock all PDFs in a folder to output folder (must supply output dir)
-    python unlock_pdf_fitz.py "LockedPDFs" "commonPassword" -o "UnlockedPDFs"
+    python -m pdfapp.unlock_password "LockedPDFs" "commonPassword" -o "UnlockedPDFs"
 
 '''
 # PyMuPDF >= 1.23
@@ -15,12 +15,17 @@ import fitz
 import os
 import argparse
 
-def unlock_pdf(input_path: str, password: str, output_path: str = None):
+from .metrics import phase, record_pages
+from .pdf_writer import save_pdf
+
+def unlock_pdf(input_path: str, password: str, output_path: str = None, profile=None):
     """
     Open a password-protected PDF with the provided password and
     save an unlocked copy (works with modern PyMuPDF).
+    profile: output profile, see pdf_writer.PROFILES (None = default).
     """
-    doc = fitz.open(input_path)
+    with phase("open"):
+        doc = fitz.open(input_path)
 
     # Try unlocking with password
     if doc.needs_pass:
@@ -35,8 +40,11 @@ def unlock_pdf(input_path: str, password: str, output_path: str = None):
         base_name, ext = os.path.splitext(os.path.basename(input_path))
         output_path = os.path.join(base_dir, f"{base_name}_unlocked{ext or '.pdf'}")
 
+    record_pages("unlock_pdf", doc.page_count)
+
     # Save without encryption
-    doc.save(output_path, encryption=fitz.PDF_ENCRYPT_NONE)
+    with phase("save"):
+        save_pdf(doc, output_path, profile, encryption=fitz.PDF_ENCRYPT_NONE)
     doc.close()
 
     print(f"✅ Unlocked PDF created: {output_path}")
@@ -1,15 +1,144 @@
-from django.shortcuts import render
-
-# Create your views here.
-
+from functools import partial
 from pathlib import Path
+import zipfile
+import os
+import shutil
+import tempfile
 
 from django.conf import settings
-from django.http import FileResponse, HttpResponseBadRequest
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 
 from .pdf_2_docx import pdf_to_word_exact
-from .merge_pdf import merge_pdfs
+from .merge_pdf import merge_pdf_list
+from .compress_pdf_lossy import analyze_compression, compress_pdf_lossy_with_level
+from .extract_pages import extract_pages
+from .extract_text import PAGE_SEPARATOR, extract_text, iter_page_text
+from .images_to_pdf import images_to_pdf, page_size_points
+from .password_protect import password_protect
+from .pdf_2_img import DEFAULT_MAX_PIXELS, TILED_MAX_PIXELS, pdf_to_images
+from .remove_pages import remove_pages
+from .split_pdf import split_pdf
+from .unlock_password import unlock_pdf
+from .metrics import phase, record_bytes_in
+from .pdf_writer import get_profile
+from .batch import MAX_BATCH_FILES, Batch
+from . import content_store, isolation, progress, search_index, storage
+
+
+# Processes used to render + encode pages for PDF → images
+IMAGE_RENDER_WORKERS = min(4, os.cpu_count() or 1)
+
+# Processes used to write (and size-optimize) split parts
+SPLIT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Most PDFs accepted by one merge request
+MAX_MERGE_FILES = 200
+
+
+def _get_upload_output_dirs():
+    """
+    Helper: returns (uploads_dir, outputs_dir) as Path objects: this
+    node's working folders. What other nodes need goes through the
+    shared storage (pdfapp.storage).
+    """
+    with phase("prepare_dirs"):
+        uploads_dir = Path(settings.MEDIA_ROOT) / "uploads"
+        outputs_dir = Path(settings.MEDIA_ROOT) / "outputs"
+        uploads_dir.mkdir(parents=True, exist_ok=True)
+        outputs_dir.mkdir(parents=True, exist_ok=True)
+    return uploads_dir, outputs_dir
+
+
+def _get_request_dirs(request, outputs=True):
+    """
+    Helper: returns (uploads_dir, outputs_dir) for one request: new
+    folders inside the node's uploads and outputs folders, so concurrent
+    requests never replace each other's inputs or outputs (nor download
+    each other's results) when their files have the same name.
+    outputs_dir is None with `outputs` False.
+    RequestFoldersMiddleware removes both once the response is closed.
+    """
+    uploads_root, outputs_root = _get_upload_output_dirs()
+    with phase("prepare_dirs"):
+        uploads_dir = Path(tempfile.mkdtemp(prefix="request_", dir=uploads_root))
+        folders = [uploads_dir]
+        outputs_dir = None
+        if outputs:
+            outputs_dir = outputs_root / uploads_dir.name
+            outputs_dir.mkdir()
+            folders.append(outputs_dir)
+    getattr(request, "toolverse_folders", []).extend(folders)
+    return uploads_dir, outputs_dir
+
+
+def _docx_cache_dir():
+    """
+    Helper: folder for the per-page PDF → DOCX layout cache.
+    """
+    return Path(settings.MEDIA_ROOT) / "docx_cache"
+
+
+def _get_uploaded_files(request):
+    """
+    Helper: returns the uploaded 'pdf_files'.
+    ContentStoreUploadMiddleware has usually parsed the body already;
+    otherwise Django parses (and spools) it here, on first access to
+    request.FILES.
+    """
+    with phase("upload_spool"):
+        return request.FILES.getlist("pdf_files")
+
+
+def _save_upload(uploaded_file, uploads_dir, name=None):
+    """
+    Helper: put an uploaded file into uploads_dir (as `name`, default the
+    upload's name), return its Path.
+    Uploads already in the content store are hard-linked, not copied.
+    PDFs are queued for the full-text search index (search_index) and
+    copied to the shared storage (storage.store_upload).
+    """
+    input_path = uploads_dir / (name or uploaded_file.name)
+    with phase("disk_write"):
+        content_store.save_upload(uploaded_file, input_path)
+    record_bytes_in(uploaded_file.size)
+    search_index.index_upload(input_path, uploaded_file)
+    storage.store_upload(input_path, uploaded_file)
+    return input_path
+
+
+def _get_output_profile(request):
+    """
+    Helper: the optional 'output_profile' POST field (a pdf_writer profile
+    name such as 'web'), or None for the default.
+    Raises ValueError for unknown names.
+    """
+    profile = request.POST.get("output_profile", "").strip() or None
+    get_profile(profile)
+    return profile
+
+
+def _batch_response(request, uploaded_files, zip_name, make_job):
+    """
+    Helper: run a tool on every uploaded file (see batch.Batch) and stream
+    the results back as one ZIP, with a manifest of per-file errors.
+    make_job(input_path, base, out_dir) returns (output, call): the file or
+    folder the tool writes in out_dir, and the tool call as a partial.
+    `base` is the file's Path(name), unique within the batch.
+    The uploads are saved in the batch's own folder: the calls only run
+    while the ZIP is streamed, after this view has returned.
+    """
+    if len(uploaded_files) > MAX_BATCH_FILES:
+        return HttpResponseBadRequest(f"Please upload at most {MAX_BATCH_FILES} PDF files.")
+
+    _, outputs_dir = _get_upload_output_dirs()
+    batch = Batch(outputs_dir)
+    for uploaded_file in uploaded_files:
+        name = batch.unique_name(uploaded_file.name)
+        input_path = _save_upload(uploaded_file, batch.inputs_dir, name=name)
+        output, call = make_job(str(input_path), Path(name), batch.outputs_dir)
+        batch.add(name, output, call)
+    return batch.response(zip_name, job_id=request.POST.get("job_id"))
 
 
 def home(request):
@@ -19,84 +148,644 @@ def home(request):
     return render(request, "index.html")
 
 
+# ---------- Existing tools ----------
+
 def pdf_to_word_view(request):
     """
     Handle PDF → Word conversion.
     - Expects file input with name 'pdf_files'.
-    - Uses your pdf_to_word_exact() to convert first uploaded PDF.
+    - Uses your pdf_to_word_exact() to convert the uploaded PDF.
     - Returns the generated DOCX as a download.
+    - Several PDFs (up to MAX_BATCH_FILES) are converted concurrently and
+      returned as one ZIP, with a manifest listing files that failed.
     """
     if request.method != "POST":
-        return HttpResponseBadRequest("Only POST method is allowed.")
+        return HttpResponseBadRequest("Only POST allowed.")
 
-    uploaded_files = request.FILES.getlist("pdf_files")
+    uploaded_files = _get_uploaded_files(request)
     if not uploaded_files:
         return HttpResponseBadRequest("Please upload at least one PDF file.")
 
-    # For now: use only the first file
+    if len(uploaded_files) > 1:
+        def docx_job(input_path, base, out_dir):
+            output_path = out_dir / base.with_suffix(".docx").name
+            return output_path, partial(pdf_to_word_exact, input_path, str(output_path),
+                                        cache_dir=_docx_cache_dir())
+        return _batch_response(request, uploaded_files, "word_documents.zip", docx_job)
+
     uploaded_file = uploaded_files[0]
 
-    uploads_dir = Path(settings.MEDIA_ROOT) / "uploads"
-    outputs_dir = Path(settings.MEDIA_ROOT) / "outputs"
-    uploads_dir.mkdir(parents=True, exist_ok=True)
-    outputs_dir.mkdir(parents=True, exist_ok=True)
+    uploads_dir, outputs_dir = _get_request_dirs(request)
 
-    # Save uploaded PDF to disk
-    input_path = uploads_dir / uploaded_file.name
-    with open(input_path, "wb+") as dest:
-        for chunk in uploaded_file.chunks():
-            dest.write(chunk)
+    input_path = _save_upload(uploaded_file, uploads_dir)
 
-    # Create output DOCX path
     output_name = Path(uploaded_file.name).with_suffix(".docx").name
     output_path = outputs_dir / output_name
 
-    # Call your converter function
-    pdf_to_word_exact(input_path, output_path)
+    job_id = request.POST.get("job_id")
+    with progress.track(job_id) as report:
+        isolation.run(pdf_to_word_exact, str(input_path), str(output_path), progress=report,
+                      cancel=progress.cancel_token(job_id), cache_dir=_docx_cache_dir())
 
-    # Return DOCX file as download
-    return FileResponse(
-        open(output_path, "rb"),
-        as_attachment=True,
-        filename=output_name,
-    )
+    return storage.output_response(request, output_path, output_name)
 
 
 def merge_pdf_view(request):
     """
     Handle PDF merge.
     - Expects file input with name 'pdf_files'.
-    - For now merges the first two uploaded PDFs.
-    - Uses your merge_pdfs() function.
+    - Merges all uploaded PDFs (up to MAX_MERGE_FILES), in upload order.
+    - Uses merge_pdf_list(), which shares identical fonts / images between
+      the inputs.
+    - Optional POST field 'output_profile' picks the pdf_writer save
+      profile (e.g. 'web' for a linearized file).
     """
     if request.method != "POST":
-        return HttpResponseBadRequest("Only POST method is allowed.")
+        return HttpResponseBadRequest("Only POST allowed.")
 
-    uploaded_files = request.FILES.getlist("pdf_files")
+    uploaded_files = _get_uploaded_files(request)
     if len(uploaded_files) < 2:
         return HttpResponseBadRequest("Please upload at least two PDF files.")
+    if len(uploaded_files) > MAX_MERGE_FILES:
+        return HttpResponseBadRequest(f"Please upload at most {MAX_MERGE_FILES} PDF files.")
 
-    uploads_dir = Path(settings.MEDIA_ROOT) / "uploads"
-    outputs_dir = Path(settings.MEDIA_ROOT) / "outputs"
-    uploads_dir.mkdir(parents=True, exist_ok=True)
-    outputs_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        profile = _get_output_profile(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
 
+    uploads_dir, outputs_dir = _get_request_dirs(request)
+
+    # Numbered names keep the upload order and can't collide
     saved_paths = []
-    # For now: only the first two files
-    for uploaded_file in uploaded_files[:2]:
-        save_path = uploads_dir / uploaded_file.name
-        with open(save_path, "wb+") as dest:
-            for chunk in uploaded_file.chunks():
-                dest.write(chunk)
-        saved_paths.append(save_path)
+    for index, uploaded_file in enumerate(uploaded_files):
+        saved_paths.append(_save_upload(uploaded_file, uploads_dir,
+                                        name=f"{index + 1:04d}_{uploaded_file.name}"))
 
     output_path = outputs_dir / "merged_output.pdf"
+    isolation.run(merge_pdf_list, [str(p) for p in saved_paths], str(output_path), profile=profile)
+
+    return storage.output_response(request, output_path, "merged_output.pdf")
+
+
+# ---------- New tools ----------
+
+def compress_pdf_view(request):
+    """
+    Compress a PDF using compress_pdf_lossy_with_level(...).
+    Several files are compressed concurrently and returned as one ZIP.
+    Extra POST fields:
+      - level (0-100, default 50)
+      - output_profile (optional, see pdf_writer.PROFILES; 'web' = linearized)
+      - analyze ('1' = don't compress; return JSON with the predicted
+        size at every level, see analyze_compression)
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST allowed.")
+
+    uploaded_files = _get_uploaded_files(request)
+    if not uploaded_files:
+        return HttpResponseBadRequest("Please upload a PDF file.")
+
+    level_str = request.POST.get("level", "50")
+    try:
+        level = int(level_str)
+    except ValueError:
+        level = 50
+
+    try:
+        profile = _get_output_profile(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
 
-    # Use your existing merge_pdfs(pdf1_path, pdf2_path, output_path)
-    merge_pdfs(str(saved_paths[0]), str(saved_paths[1]), str(output_path))
+    analyze = request.POST.get("analyze") in ("1", "true", "on")
 
-    return FileResponse(
-        open(output_path, "rb"),
-        as_attachment=True,
-        filename="merged_output.pdf",
+    if len(uploaded_files) > 1:
+        if analyze:
+            return HttpResponseBadRequest("Please analyze one PDF file at a time.")
+
+        def compress_job(input_path, base, out_dir):
+            output_path = out_dir / f"{base.stem}_compressed{base.suffix}"
+            return output_path, partial(compress_pdf_lossy_with_level, input_path, str(output_path),
+                                        level=level, profile=profile)
+        return _batch_response(request, uploaded_files, "compressed_pdfs.zip", compress_job)
+
+    uploaded_file = uploaded_files[0]
+
+    uploads_dir, outputs_dir = _get_request_dirs(request)
+
+    input_path = _save_upload(uploaded_file, uploads_dir)
+
+    if analyze:
+        return JsonResponse(isolation.run(analyze_compression, str(input_path)))
+
+    base = Path(uploaded_file.name)
+    output_name = f"{base.stem}_compressed{base.suffix}"
+    output_path = outputs_dir / output_name
+
+    job_id = request.POST.get("job_id")
+    with progress.track(job_id) as report:
+        isolation.run(compress_pdf_lossy_with_level, str(input_path), str(output_path),
+                      level=level, progress=report, profile=profile,
+                      cancel=progress.cancel_token(job_id))
+
+    return storage.output_response(request, output_path, output_name)
+
+
+def extract_pages_view(request):
+    """
+    Extract specific pages to a new PDF (one per uploaded file; several
+    files are returned as one ZIP).
+    Extra POST fields:
+      - pages_spec (e.g. '1-3,5')
+      - output_profile (optional, see pdf_writer.PROFILES)
+      - incremental (optional): delete the other pages from a copy of the
+        upload by an incremental update instead of rewriting it; ignored
+        when an output_profile is given
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST allowed.")
+
+    uploaded_files = _get_uploaded_files(request)
+    if not uploaded_files:
+        return HttpResponseBadRequest("Please upload a PDF file.")
+
+    pages_spec = request.POST.get("pages_spec", "").strip()
+    if not pages_spec:
+        return HttpResponseBadRequest("Please provide a pages specification.")
+
+    try:
+        profile = _get_output_profile(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    incremental = bool(request.POST.get("incremental"))
+
+    if len(uploaded_files) > 1:
+        def extract_job(input_path, base, out_dir):
+            output_path = out_dir / f"{base.stem}_extracted{base.suffix}"
+            return output_path, partial(extract_pages, input_path, pages_spec, str(output_path),
+                                        profile=profile, incremental=incremental)
+        return _batch_response(request, uploaded_files, "extracted_pages.zip", extract_job)
+
+    uploaded_file = uploaded_files[0]
+
+    uploads_dir, outputs_dir = _get_request_dirs(request)
+
+    input_path = _save_upload(uploaded_file, uploads_dir)
+
+    base = Path(uploaded_file.name)
+    output_name = f"{base.stem}_extracted{base.suffix}"
+    output_path = outputs_dir / output_name
+
+    try:
+        isolation.run(extract_pages, str(input_path), pages_spec, str(output_path),
+                      profile=profile, incremental=incremental)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    return storage.output_response(request, output_path, output_name)
+
+
+def remove_pages_view(request):
+    """
+    Remove specific pages from a PDF (several files are returned as one
+    ZIP).
+    Extra POST fields:
+      - remove_spec (e.g. '2,4-6')
+      - output_profile (optional, see pdf_writer.PROFILES)
+      - incremental (optional): append the change to a copy of the upload
+        instead of rewriting it (quick on large files, but the removed
+        pages' data stays in the file); ignored when an output_profile is
+        given
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST allowed.")
+
+    uploaded_files = _get_uploaded_files(request)
+    if not uploaded_files:
+        return HttpResponseBadRequest("Please upload a PDF file.")
+
+    remove_spec = request.POST.get("remove_spec", "").strip()
+    if not remove_spec:
+        return HttpResponseBadRequest("Please provide pages to remove.")
+
+    try:
+        profile = _get_output_profile(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    incremental = bool(request.POST.get("incremental"))
+
+    if len(uploaded_files) > 1:
+        def remove_job(input_path, base, out_dir):
+            output_path = out_dir / f"{base.stem}_removed{base.suffix}"
+            return output_path, partial(remove_pages, input_path, remove_spec, str(output_path),
+                                        profile=profile, incremental=incremental)
+        return _batch_response(request, uploaded_files, "removed_pages.zip", remove_job)
+
+    uploaded_file = uploaded_files[0]
+
+    uploads_dir, outputs_dir = _get_request_dirs(request)
+
+    input_path = _save_upload(uploaded_file, uploads_dir)
+
+    base = Path(uploaded_file.name)
+    output_name = f"{base.stem}_removed{base.suffix}"
+    output_path = outputs_dir / output_name
+
+    try:
+        isolation.run(remove_pages, str(input_path), remove_spec, str(output_path),
+                      profile=profile, incremental=incremental)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    return storage.output_response(request, output_path, output_name)
+
+
+def split_pdf_view(request):
+    """
+    Split a PDF into multiple PDFs and return them as a ZIP. With several
+    files, each one's parts go in a '<name>_parts/' folder of the ZIP.
+    Extra POST fields:
+      - split_spec (e.g. '5' or '1-2,3-4')
+      - output_profile (optional, see pdf_writer.PROFILES)
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST allowed.")
+
+    uploaded_files = _get_uploaded_files(request)
+    if not uploaded_files:
+        return HttpResponseBadRequest("Please upload a PDF file.")
+
+    split_spec = request.POST.get("split_spec", "").strip()
+    if not split_spec:
+        return HttpResponseBadRequest("Please provide a split specification.")
+
+    try:
+        profile = _get_output_profile(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    if len(uploaded_files) > 1:
+        # The batch runs files in parallel: one process per file
+        def split_job(input_path, base, out_dir):
+            parts_dir = out_dir / f"{base.stem}_parts"
+            parts_dir.mkdir()
+            return parts_dir, partial(split_pdf, input_path, split_spec, str(parts_dir),
+                                      profile=profile)
+        return _batch_response(request, uploaded_files, "split_parts.zip", split_job)
+
+    uploaded_file = uploaded_files[0]
+
+    uploads_dir, outputs_dir = _get_request_dirs(request)
+
+    input_path = _save_upload(uploaded_file, uploads_dir)
+
+    # Create a subfolder for individual parts
+    base = Path(uploaded_file.name)
+    parts_dir = outputs_dir / f"{base.stem}_parts"
+    parts_dir.mkdir()
+
+    # Run your split tool (it writes multiple PDFs into parts_dir)
+    try:
+        isolation.run(split_pdf, str(input_path), split_spec, str(parts_dir),
+                      workers=SPLIT_WORKERS, profile=profile,
+                      cancel=progress.cancel_token(request.POST.get("job_id")))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    # Zip all generated PDFs. The parts are saved with deflated streams,
+    # so they are stored rather than compressed a second time.
+    zip_name = f"{base.stem}_split_parts.zip"
+    zip_path = outputs_dir / zip_name
+    with phase("zip"), zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as zf:
+        for pdf_file in parts_dir.glob("*.pdf"):
+            zf.write(pdf_file, arcname=pdf_file.name)
+
+    return storage.output_response(request, zip_path, zip_name)
+
+
+def password_protect_view(request):
+    """
+    Apply password and restrictions (the same to every uploaded file;
+    several files are returned as one ZIP).
+    Extra POST fields:
+      - user_password
+      - owner_password (optional)
+      - no_print (checkbox)
+      - no_copy  (checkbox)
+      - no_annot (checkbox)
+      - output_profile (optional, see pdf_writer.PROFILES)
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST allowed.")
+
+    uploaded_files = _get_uploaded_files(request)
+    if not uploaded_files:
+        return HttpResponseBadRequest("Please upload a PDF file.")
+
+    user_pwd = request.POST.get("user_password") or None
+    owner_pwd = request.POST.get("owner_password") or None
+
+    if not user_pwd and not owner_pwd:
+        return HttpResponseBadRequest("Provide at least one password.")
+
+    try:
+        profile = _get_output_profile(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    no_print = bool(request.POST.get("no_print"))
+    no_copy = bool(request.POST.get("no_copy"))
+    no_annot = bool(request.POST.get("no_annot"))
+
+    if len(uploaded_files) > 1:
+        def protect_job(input_path, base, out_dir):
+            output_path = out_dir / f"{base.stem}_locked{base.suffix}"
+            return output_path, partial(password_protect, input_path, str(output_path),
+                                        user_pwd=user_pwd, owner_pwd=owner_pwd, no_print=no_print,
+                                        no_copy=no_copy, no_annot=no_annot, profile=profile)
+        return _batch_response(request, uploaded_files, "protected_pdfs.zip", protect_job)
+
+    uploaded_file = uploaded_files[0]
+
+    uploads_dir, outputs_dir = _get_request_dirs(request)
+
+    input_path = _save_upload(uploaded_file, uploads_dir)
+
+    base = Path(uploaded_file.name)
+    output_name = f"{base.stem}_locked{base.suffix}"
+    output_path = outputs_dir / output_name
+
+    isolation.run(
+        password_protect,
+        str(input_path),
+        str(output_path),
+        user_pwd=user_pwd,
+        owner_pwd=owner_pwd,
+        no_print=no_print,
+        no_copy=no_copy,
+        no_annot=no_annot,
+        profile=profile,
     )
+
+    return storage.output_response(request, output_path, output_name)
+
+
+def unlock_pdf_view(request):
+    """
+    Unlock a password-protected PDF. Several files are tried with the same
+    password and returned as one ZIP; the manifest lists those it didn't
+    open.
+    Extra POST fields:
+      - password
+      - output_profile (optional, see pdf_writer.PROFILES)
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST allowed.")
+
+    uploaded_files = _get_uploaded_files(request)
+    if not uploaded_files:
+        return HttpResponseBadRequest("Please upload a locked PDF file.")
+
+    password = request.POST.get("password", "").strip()
+    if not password:
+        return HttpResponseBadRequest("Please provide the PDF password.")
+
+    try:
+        profile = _get_output_profile(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    if len(uploaded_files) > 1:
+        def unlock_job(input_path, base, out_dir):
+            output_path = out_dir / f"{base.stem}_unlocked{base.suffix}"
+            return output_path, partial(unlock_pdf, input_path, password, str(output_path),
+                                        profile=profile)
+        return _batch_response(request, uploaded_files, "unlocked_pdfs.zip", unlock_job)
+
+    uploaded_file = uploaded_files[0]
+
+    uploads_dir, outputs_dir = _get_request_dirs(request)
+
+    input_path = _save_upload(uploaded_file, uploads_dir)
+
+    base = Path(uploaded_file.name)
+    output_name = f"{base.stem}_unlocked{base.suffix}"
+    output_path = outputs_dir / output_name
+
+    isolation.run(unlock_pdf, str(input_path), password, str(output_path), profile=profile)
+
+    return storage.output_response(request, output_path, output_name)
+
+
+def pdf_to_images_view(request):
+    """
+    Convert PDF pages to images, return all as ZIP. With several files,
+    each one's images go in a '<name>_pages/' folder of the ZIP.
+    Extra POST fields:
+      - zoom (float, e.g. '2.0')
+      - pages_spec (optional, e.g. '1-3,5'; empty = all pages)
+      - tiled (checkbox: render huge pages in bands at full resolution, PNG only)
+      - image_format ('png' | 'jpg' | 'webp', default 'png')
+      - quality (JPEG/WebP quality 1-100, default 85)
+      - grayscale (checkbox)
+      - png_level (PNG compression 0-9, optional)
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST allowed.")
+
+    uploaded_files = _get_uploaded_files(request)
+    if not uploaded_files:
+        return HttpResponseBadRequest("Please upload a PDF file.")
+
+    zoom_str = request.POST.get("zoom", "2.0")
+    try:
+        zoom = float(zoom_str)
+    except ValueError:
+        zoom = 2.0
+    if zoom <= 0:
+        zoom = 2.0
+
+    pages_spec = request.POST.get("pages_spec", "").strip() or None
+    image_format = request.POST.get("image_format", "png").strip().lower() or "png"
+    tiled = bool(request.POST.get("tiled")) and image_format == "png"
+    grayscale = bool(request.POST.get("grayscale"))
+
+    try:
+        quality = int(request.POST.get("quality", "85"))
+    except ValueError:
+        quality = 85
+
+    png_level_str = request.POST.get("png_level", "").strip()
+    try:
+        png_level = int(png_level_str) if png_level_str else None
+    except ValueError:
+        png_level = None
+
+    max_pixels = TILED_MAX_PIXELS if tiled else DEFAULT_MAX_PIXELS
+
+    if len(uploaded_files) > 1:
+        # The batch runs files in parallel: one process per file
+        def images_job(input_path, base, out_dir):
+            images_dir = out_dir / f"{base.stem}_pages"
+            images_dir.mkdir()
+            return images_dir, partial(pdf_to_images, input_path, output_folder=str(images_dir),
+                                       zoom=zoom, pages=pages_spec, max_pixels=max_pixels,
+                                       tiled=tiled, image_format=image_format, quality=quality,
+                                       grayscale=grayscale, png_level=png_level)
+        return _batch_response(request, uploaded_files, "pdf_images.zip", images_job)
+
+    uploaded_file = uploaded_files[0]
+
+    uploads_dir, outputs_dir = _get_request_dirs(request)
+
+    input_path = _save_upload(uploaded_file, uploads_dir)
+
+    base = Path(uploaded_file.name)
+    images_dir = outputs_dir / f"{base.stem}_pages"
+    images_dir.mkdir()
+
+    # This function writes one image per page into images_dir
+    job_id = request.POST.get("job_id")
+    try:
+        with progress.track(job_id) as report:
+            isolation.run(
+                pdf_to_images,
+                str(input_path),
+                output_folder=str(images_dir),
+                zoom=zoom,
+                pages=pages_spec,
+                max_pixels=max_pixels,
+                tiled=tiled,
+                image_format=image_format,
+                quality=quality,
+                grayscale=grayscale,
+                png_level=png_level,
+                workers=IMAGE_RENDER_WORKERS,
+                progress=report,
+                cancel=progress.cancel_token(job_id),
+            )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    # Zip all images. PNG/JPEG/WebP are already compressed, so deflating
+    # them again costs CPU for no gain: store them as-is.
+    zip_name = f"{base.stem}_images.zip"
+    zip_path = outputs_dir / zip_name
+    with phase("zip"), zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as zf:
+        for img_file in sorted(images_dir.glob("page_*.*")):
+            zf.write(img_file, arcname=img_file.name)
+
+    return storage.output_response(request, zip_path, zip_name)
+
+
+def images_to_pdf_view(request):
+    """
+    Combine uploaded images into one PDF, one page per image in upload
+    order (see images_to_pdf: JPEGs are embedded as they are).
+    - Expects file input with name 'image_files'.
+    Extra POST fields:
+      - page_size (optional, e.g. 'a4' or 'letter': every image is fitted
+        on a page of that size; empty = each page the size of its image)
+      - margin (border around each image in points, default 0)
+      - output_profile (optional, see pdf_writer.PROFILES)
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST allowed.")
+
+    with phase("upload_spool"):
+        uploaded_files = request.FILES.getlist("image_files")
+    if not uploaded_files:
+        return HttpResponseBadRequest("Please upload at least one image.")
+
+    page_size = request.POST.get("page_size", "").strip() or None
+    try:
+        margin = max(0.0, float(request.POST.get("margin", "0") or 0))
+    except ValueError:
+        margin = 0.0
+
+    try:
+        page_size_points(page_size)
+        profile = _get_output_profile(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    images_dir, outputs_dir = _get_request_dirs(request)
+
+    # Numbered names keep the upload order and can't collide
+    try:
+        image_paths = []
+        with phase("disk_write"):
+            for index, uploaded_file in enumerate(uploaded_files):
+                image_path = images_dir / f"{index + 1:04d}_{uploaded_file.name}"
+                with open(image_path, "wb") as out:
+                    for chunk in uploaded_file.chunks():
+                        out.write(chunk)
+                record_bytes_in(uploaded_file.size)
+                image_paths.append(str(image_path))
+
+        if len(uploaded_files) == 1:
+            output_name = f"{Path(uploaded_files[0].name).stem}.pdf"
+        else:
+            output_name = "images.pdf"
+        output_path = outputs_dir / output_name
+
+        job_id = request.POST.get("job_id")
+        try:
+            with progress.track(job_id) as report:
+                isolation.run(images_to_pdf, image_paths, str(output_path),
+                              page_size=page_size, margin=margin, profile=profile,
+                              progress=report, cancel=progress.cancel_token(job_id))
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+    finally:
+        shutil.rmtree(images_dir, ignore_errors=True)
+
+    return storage.output_response(request, output_path, output_name)
+
+
+def extract_text_view(request):
+    """
+    Extract the text of a PDF and stream it back as a UTF-8 .txt file,
+    one page at a time (pages separated by a form feed), so memory use
+    does not depend on the page count. Several files are returned as one
+    ZIP of .txt files.
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST allowed.")
+
+    uploaded_files = _get_uploaded_files(request)
+    if not uploaded_files:
+        return HttpResponseBadRequest("Please upload a PDF file.")
+
+    if len(uploaded_files) > 1:
+        def text_job(input_path, base, out_dir):
+            output_path = out_dir / f"{base.stem}.txt"
+            return output_path, partial(extract_text, input_path, str(output_path))
+        return _batch_response(request, uploaded_files, "extracted_text.zip", text_job)
+
+    uploaded_file = uploaded_files[0]
+
+    uploads_dir, _ = _get_request_dirs(request, outputs=False)
+
+    input_path = _save_upload(uploaded_file, uploads_dir)
+
+    pages = iter_page_text(str(input_path))
+    # Open the PDF now, so a file we can't read is a 400 and not a
+    # broken download
+    try:
+        first = next(pages, None)
+    except (RuntimeError, ValueError) as e:
+        return HttpResponseBadRequest(str(e))
+
+    def stream():
+        if first is None:
+            return
+        yield first[1].encode("utf-8")
+        for _, text in pages:
+            yield (PAGE_SEPARATOR + text).encode("utf-8")
+
+    txt_name = f"{Path(uploaded_file.name).stem}.txt"
+    response = StreamingHttpResponse(stream(), content_type="text/plain; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{txt_name}"'
+    return response